@@ -0,0 +1 @@
+# Benchmarks of the storage hot paths, see benchmarks/run.py
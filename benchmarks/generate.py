@@ -0,0 +1,127 @@
+# Synthetic Time_Keeper.xlsx generator for the benchmarks
+# Writes a history of Time rows in the exact schema logged by TaskTimer._log_data_to_excel() (engine.day_row())
+# and a Tasks sheet, with the openpyxl write-only mode so that even 1M rows are written without holding them in the memory
+# Run: python -m benchmarks.generate 10k [--tasks 100] [--out benchmarks/data/time_keeper_10k.xlsx]
+import argparse
+import datetime as dt
+import os
+import random
+
+from engine import humanize_time
+
+# number of rows for the size names, e.g., "10k"
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def parse_size(size) -> int:
+    """
+    :param size: "1k", "10k", "100k", "1m" or a number of rows
+    """
+    size = str(size).lower()
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def default_tasks_count(rows_count: int) -> int:
+    # a task per 100 rows, from 10 tasks for 1k rows to 10k tasks for 1M rows
+    return min(10_000, max(10, rows_count // 100))
+
+
+def task_rows(tasks_count: int, seed=7):
+    """
+    Yields the Tasks sheet rows as dicts, as added by TaskTimer._add_task_on_enter(), a fifth of them inactive
+    """
+    rng = random.Random(seed)
+    added_on = dt.datetime(2015, 1, 1, 9)
+    for number in range(tasks_count):
+        yield {"Task": f"Task {number:05d} {rng.choice(('Review', 'Study', 'Deploy', 'Email', 'Report'))}",
+               "Status": "" if rng.random() < 0.2 else "Active",
+               "Added_On": f"{added_on + dt.timedelta(hours=number):%d-%b-%Y T%I:%M %p}"}
+
+
+def time_rows(rows_count: int, tasks, end_date=None, seed=7):
+    """
+    Yields the Time sheet rows as dicts, ending today, oldest first
+    Rows per day are spread so that the history is ~8 rows a day, with a multi-day task now and then
+    :param tasks: list of the task names to pick from
+    """
+    rng = random.Random(seed)
+    rows_per_day = 8
+    end_date = end_date or dt.date.today()
+    day = end_date - dt.timedelta(days=(rows_count - 1) // rows_per_day)
+    start_minutes = 8 * 60
+    for number in range(rows_count):
+        if number and number % rows_per_day == 0:
+            day += dt.timedelta(days=1)
+            start_minutes = 8 * 60
+        work_minutes = rng.randint(5, 90)
+        pause_minutes = rng.choice((0, 0, 0, 5, 15))
+        total_minutes = work_minutes + pause_minutes
+        task_start = dt.datetime.combine(day, dt.time()) + dt.timedelta(minutes=start_minutes)
+        task_end = task_start + dt.timedelta(minutes=total_minutes)
+        start_minutes = min(start_minutes + total_minutes + rng.randint(0, 20), 23 * 60)
+        yield dict(Date=day,
+                   Task=rng.choice(tasks),
+                   Work_Duration=humanize_time(work_minutes),
+                   Notes=rng.choice(("", "", "Great progress!", "Follow up tomorrow")),
+                   Pause_Duration=humanize_time(pause_minutes),
+                   Start_Time=f"{task_start:%I:%M %p}",
+                   End_Time=f"{task_end:%I:%M %p}",
+                   Work_Minutes=work_minutes,
+                   Pause_Minutes=pause_minutes,
+                   Total_Minutes=total_minutes,
+                   Multi_day_Start=f"{day - dt.timedelta(days=1)}" if number % 500 == 499 else "None")
+
+
+def generate(excel_file, rows_count: int, tasks_count=None, seed=7) -> str:
+    """
+    Writes the workbook with the Tasks and Time sheets
+    :return: excel_file
+    """
+    from openpyxl import Workbook
+
+    tasks_count = tasks_count or default_tasks_count(rows_count)
+    os.makedirs(os.path.dirname(os.path.abspath(excel_file)), exist_ok=True)
+    wb = Workbook(write_only=True)
+
+    tasks_sheet = wb.create_sheet("Tasks")
+    tasks = []
+    for number, row in enumerate(task_rows(tasks_count, seed)):
+        if number == 0:
+            tasks_sheet.append(list(row.keys()))
+        tasks_sheet.append(list(row.values()))
+        tasks.append(row["Task"])
+
+    time_sheet = wb.create_sheet("Time")
+    for number, row in enumerate(time_rows(rows_count, tasks, seed=seed)):
+        if number == 0:
+            time_sheet.append(list(row.keys()))
+        time_sheet.append(list(row.values()))
+
+    wb.save(excel_file)
+    return excel_file
+
+
+def workbook_for(size, tasks_count=None) -> str:
+    """
+    Path of the generated workbook for the size, generated on the first use and reused after that
+    """
+    rows_count = parse_size(size)
+    tasks_count = tasks_count or default_tasks_count(rows_count)
+    excel_file = os.path.join(DATA_DIR, f"time_keeper_{rows_count}_rows_{tasks_count}_tasks.xlsx")
+    if not os.path.exists(excel_file):
+        print(f"Generating {excel_file} ...")
+        generate(excel_file, rows_count, tasks_count)
+    return excel_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic Time_Keeper.xlsx")
+    parser.add_argument("size", help="number of Time rows: 1k, 10k, 100k, 1m or a number")
+    parser.add_argument("--tasks", type=int, help="number of tasks (default a task per 100 rows, 10 to 10k)")
+    parser.add_argument("--out", help="Excel file to write (default under benchmarks/data/)")
+    args = parser.parse_args()
+    if args.out:
+        print(generate(args.out, parse_size(args.size), args.tasks))
+    else:
+        print(workbook_for(args.size, args.tasks))
@@ -0,0 +1,398 @@
+# Benchmarks of the storage hot paths of the app at realistic history sizes
+# Each operation runs the TaskTimer methods themselves (without the window) on a generated workbook (generate.py),
+# in a fresh process so that the peak RSS is of that operation alone
+# Reports the latency percentiles and the peak RSS per operation and size, and compares them with the saved baselines
+# Run: python -m benchmarks.run                          -> 1k and 10k rows, all operations
+#      python -m benchmarks.run --sizes 100k,1m --ops days_work_minutes_cold,task_list_cold
+#      python -m benchmarks.run --save                   -> saves the results as the baselines (benchmarks/baselines.json)
+#      python -m benchmarks.run --check                  -> exits with 1 if an operation is slower than its baseline
+#      python -m benchmarks.run --storage sqlite         -> same operations on the SQLite storage (storage.py)
+import argparse
+import datetime as dt
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.generate import default_tasks_count, parse_size, time_rows, workbook_for
+
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# an operation is a regression if its p50 is this many times its baseline p50
+REGRESSION_RATIO = 1.25
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process so far, None if it can't be read on this platform
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        # Windows, if psutil is installed
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _percentile(sorted_values, percent):
+    # nearest rank, so the value is one of the measured ones
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _bench_timer(excel_file, backend="excel"):
+    """
+    TaskTimer with only its storage and not the window
+    The storage methods are those of TaskTimer, so the benchmark runs the app's code
+    The excel_writer thread is not started, the Excel save is measured on its own by the excel_write operation
+    """
+    # imported here as main imports customtkinter, which only the worker processes need to load
+    from main import TaskTimer
+    from storage import open_storage
+    from task_index import TaskIndex
+
+    class BenchTimer:
+        _get_days_work_minutes = TaskTimer._get_days_work_minutes
+        _get_task_list = TaskTimer._get_task_list
+        _active_task_list = TaskTimer._active_task_list
+        _append_data_to_excel = TaskTimer._append_data_to_excel
+        _append_rows_to_excel = TaskTimer._append_rows_to_excel
+        _log_data_to_excel = TaskTimer._log_data_to_excel
+        _log_rows_to_excel = TaskTimer._log_rows_to_excel
+        _apply_task_status_changes = TaskTimer._apply_task_status_changes
+
+        def __init__(self) -> None:
+            # same as TaskTimer.__init__()
+            self.excel_file = excel_file
+            self.excel_tasks_sheet = "Tasks"
+            self.tasks_col_name = "Task"
+            self.excel_time_sheet = "Time"
+            self.task_active_status_symbol = "Active"
+            self.storage = open_storage(excel_file, backend)
+            self.current_date = dt.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            self.all_tasks_dict_list = None
+            self.task_index = TaskIndex()
+
+    return BenchTimer()
+
+
+def _remove_sidecars(excel_file) -> None:
+    # the day index and the columns saved next to the Excel file, for a cold start
+    base_name = os.path.splitext(excel_file)[0]
+    if os.path.exists(base_name + ".dayindex.json"):
+        os.remove(base_name + ".dayindex.json")
+    shutil.rmtree(base_name + ".columns", ignore_errors=True)
+
+
+class Operation:
+    """
+    An operation to be timed, setup() and before_each() are not timed
+    """
+    # storage backends the operation applies to
+    backends = ("excel", "sqlite")
+
+    def __init__(self, excel_file, backend="excel") -> None:
+        self.excel_file = excel_file
+        self.backend = backend
+        self.timer = None
+
+    def setup(self) -> None:
+        self.new_timer()
+
+    def new_timer(self) -> None:
+        # the storage of the last timer is closed, the database file can't be removed while it is open on Windows
+        self.teardown()
+        self.timer = _bench_timer(self.excel_file, self.backend)
+
+    def teardown(self) -> None:
+        if self.timer is not None:
+            self.timer.storage.close()
+
+    def before_each(self) -> None:
+        pass
+
+    def run(self) -> None:
+        raise NotImplementedError
+
+
+class LogRow(Operation):
+    """
+    _log_data_to_excel() on end of a task: journal append (fsync) + day index + columns, as the app does after startup
+    """
+    def setup(self) -> None:
+        super().setup()
+        self.timer._get_days_work_minutes()
+        self.rows = time_rows(1_000_000, ["Benchmark task"], seed=11)
+
+    def run(self) -> None:
+        assert self.timer._log_data_to_excel(next(self.rows))
+
+
+class ExcelWrite(Operation):
+    """
+    Write of a logged row from the journal, i.e., the load and save of the whole workbook done by the excel_writer thread
+    """
+    # with the SQLite storage the row is in the database once logged (log_row)
+    backends = ("excel",)
+
+    def setup(self) -> None:
+        super().setup()
+        self.timer._get_days_work_minutes()
+        self.rows = time_rows(1_000_000, ["Benchmark task"], seed=11)
+
+    def before_each(self) -> None:
+        self.timer._log_data_to_excel(next(self.rows))
+
+    def run(self) -> None:
+        assert self.timer.storage.flush()
+
+
+class DaysWorkMinutesCold(Operation):
+    """
+    _get_days_work_minutes() on the first start, without the day index and the columns saved next to the Excel file
+    (a new connection for the SQLite storage)
+    """
+    def before_each(self) -> None:
+        _remove_sidecars(self.excel_file)
+        self.new_timer()
+
+    def run(self) -> None:
+        self.timer._get_days_work_minutes()
+
+
+class DaysWorkMinutesWarm(Operation):
+    """
+    _get_days_work_minutes() on a start with the day index and the columns in sync with the Excel file
+    """
+    def setup(self) -> None:
+        super().setup()
+        self.timer._get_days_work_minutes()
+
+    def before_each(self) -> None:
+        self.new_timer()
+
+    def run(self) -> None:
+        self.timer._get_days_work_minutes()
+
+
+class TaskListCold(Operation):
+    """
+    _get_task_list() on the start, the Tasks sheet is parsed from the Excel file
+    """
+    def before_each(self) -> None:
+        self.new_timer()
+
+    def run(self) -> None:
+        self.timer._get_task_list()
+
+
+class TaskListWarm(Operation):
+    """
+    _get_task_list() after a task is added, the Tasks sheet is already parsed
+    """
+    def setup(self) -> None:
+        super().setup()
+        self.timer._get_task_list()
+
+    def run(self) -> None:
+        self.timer._get_task_list()
+
+
+class ManageTasksSave(Operation):
+    """
+    Save of the Manage Tasks window with one task checked/unchecked: the cells update (run on the excel_writer thread
+    by _save_task_status_changes() in the app) + _apply_task_status_changes() + _active_task_list()
+    """
+    def setup(self) -> None:
+        super().setup()
+        self.timer._get_task_list()
+        self.task_number = 0
+
+    def before_each(self) -> None:
+        task_item = self.timer.all_tasks_dict_list[self.task_number % len(self.timer.all_tasks_dict_list)]
+        self.task_number += 1
+        is_active = str(task_item.get("Status") or "").lower() == "active"
+        self.status_updates = {task_item["Task"]: {"Status": "" if is_active else "Active"}}
+
+    def run(self) -> None:
+        assert self.timer.storage.update_cells("Tasks", "Task", self.status_updates) is not None
+        self.timer._apply_task_status_changes(self.status_updates)
+        self.timer._active_task_list()
+
+
+OPERATIONS = {
+    "log_row": LogRow,
+    "excel_write": ExcelWrite,
+    "days_work_minutes_cold": DaysWorkMinutesCold,
+    "days_work_minutes_warm": DaysWorkMinutesWarm,
+    "task_list_cold": TaskListCold,
+    "task_list_warm": TaskListWarm,
+    "manage_tasks_save": ManageTasksSave,
+}
+
+
+def _run_operation(operation_name, excel_file, backend, repeats, budget_seconds, results) -> None:
+    """
+    Runs in a worker process: times the operation on a copy of the workbook and puts the result in the results queue
+    Stops after the repeats or once the budget_seconds are used up (after at least 3 runs), for the slow ones at 1M rows
+    With the SQLite storage, the database is created from the copy of the workbook in setup() (not timed)
+    """
+    rss_before = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_file = os.path.join(work_dir, "Time_Keeper.xlsx")
+        shutil.copy(excel_file, work_file)
+        operation = OPERATIONS[operation_name](work_file, backend)
+        operation.setup()
+
+        seconds = []
+        budget_start = time.perf_counter()
+        while len(seconds) < repeats:
+            operation.before_each()
+            start = time.perf_counter()
+            operation.run()
+            seconds.append(time.perf_counter() - start)
+            if len(seconds) >= 3 and time.perf_counter() - budget_start > budget_seconds:
+                break
+        operation.teardown()
+
+    seconds.sort()
+    rss_peak = _peak_rss_mb()
+    results.put({
+        "runs": len(seconds),
+        "p50_ms": _percentile(seconds, 50) * 1000,
+        "p90_ms": _percentile(seconds, 90) * 1000,
+        "p99_ms": _percentile(seconds, 99) * 1000,
+        "max_ms": seconds[-1] * 1000,
+        "peak_rss_mb": rss_peak,
+        "peak_rss_delta_mb": rss_peak - rss_before if rss_peak is not None and rss_before is not None else None,
+    })
+
+
+def run_benchmarks(sizes, operation_names, repeats=20, budget_seconds=30.0, backend="excel") -> dict:
+    """
+    :return: dict "operation@size" (or "operation@size/sqlite") -> result of _run_operation()
+    """
+    # spawn, so that each operation starts from a fresh interpreter (same on Windows and Linux) for its peak RSS
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for size in sizes:
+        excel_file = workbook_for(size)
+        for operation_name in operation_names:
+            if backend not in OPERATIONS[operation_name].backends:
+                continue
+            # the Excel storage keeps the keys of the baselines saved before the SQLite storage
+            key = f"{operation_name}@{size}" + (f"/{backend}" if backend != "excel" else "")
+            result_queue = context.Queue()
+            worker = context.Process(target=_run_operation,
+                                     args=(operation_name, excel_file, backend, repeats, budget_seconds, result_queue))
+            worker.start()
+            worker.join()
+            if worker.exitcode != 0:
+                print(f"{key}: failed (exit code {worker.exitcode})")
+                continue
+            results[key] = result_queue.get()
+            _print_result(key, results[key])
+    return results
+
+
+def _format_mb(value):
+    return f"{value:8.1f}" if value is not None else f"{'n/a':>8}"
+
+
+def _print_result(key, result, baseline=None) -> None:
+    line = (f"{key:<32}{result['runs']:>5}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}{_format_mb(result['peak_rss_mb'])}"
+            f"{_format_mb(result['peak_rss_delta_mb'])}")
+    if baseline:
+        line += f"{result['p50_ms'] / baseline['p50_ms']:>9.2f}x"
+    print(line)
+
+
+def _print_header() -> None:
+    print(f"{'operation@size':<32}{'runs':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'RSS MB':>8}{'+RSS MB':>8}{'vs base':>10}")
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES_FILE):
+        return {}
+    with open(BASELINES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results) -> None:
+    """
+    Merges the results into the baselines file, an operation@size not run this time keeps its old baseline
+    """
+    baselines = load_baselines()
+    baselines.setdefault("results", {}).update(results)
+    baselines["machine"] = {"platform": platform.platform(), "python": platform.python_version(),
+                            "processor": platform.processor()}
+    baselines["saved_on"] = f"{dt.datetime.now():%Y-%m-%d %H:%M}"
+    with open(BASELINES_FILE, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+
+def compare(results, baselines, ratio=REGRESSION_RATIO) -> list:
+    """
+    Prints the results against the baselines
+    :return: list of the operation@size slower than ratio times their baseline p50
+    """
+    regressions = []
+    print()
+    print(f"Against the baselines saved on {baselines.get('saved_on', '?')} ({baselines.get('machine', {}).get('platform', '?')})")
+    _print_header()
+    for key, result in results.items():
+        baseline = baselines.get("results", {}).get(key)
+        _print_result(key, result, baseline)
+        if baseline and result["p50_ms"] > ratio * baseline["p50_ms"]:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the storage hot paths")
+    parser.add_argument("--sizes", default="1k,10k", help="Time rows of the workbooks: 1k, 10k, 100k, 1m (comma separated)")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help=f"operations: {', '.join(OPERATIONS)}")
+    parser.add_argument("--repeats", type=int, default=20, help="runs per operation")
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds per operation, stops early after 3 runs")
+    parser.add_argument("--storage", default="excel", choices=("excel", "sqlite"), help="storage backend (storage.py)")
+    parser.add_argument("--save", action="store_true", help=f"save the results as the baselines ({BASELINES_FILE})")
+    parser.add_argument("--check", action="store_true", help=f"exit with 1 if a p50 is over {REGRESSION_RATIO}x its baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    operation_names = [name.strip() for name in args.ops.split(",") if name.strip()]
+    unknown = [name for name in operation_names if name not in OPERATIONS]
+    if unknown:
+        parser.error(f"unknown operation(s): {', '.join(unknown)}")
+
+    for size in sizes:
+        rows_count = parse_size(size)
+        print(f"{size}: {rows_count:,} Time rows, {default_tasks_count(rows_count):,} tasks")
+    _print_header()
+    results = run_benchmarks(sizes, operation_names, args.repeats, args.budget, args.storage)
+
+    baselines = load_baselines()
+    regressions = compare(results, baselines) if baselines else []
+    if regressions:
+        print(f"Slower than the baselines: {', '.join(regressions)}")
+
+    if args.save:
+        save_baselines(results)
+        print(f"Saved the baselines to {BASELINES_FILE}")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# Crash-safe checkpoint of the running/paused task
+# The timer state lives only in the memory of the app, so a crash (or a kill from the task manager) would lose the task
+# The state is kept in a small fixed-size file that is memory-mapped, so updating it is just a memory copy
+# The file has 2 slots that are written alternately, each with a sequence number and a checksum,
+# so a write torn by a crash never destroys the last good checkpoint
+# The app and cli.py share the checkpoint, so a task started in one is seen (and ended) by the other
+import datetime as dt
+import mmap
+import os
+import struct
+import zlib
+
+# magic, version, status, detached, sequence number, task_start_time, segment_start_time, work_seconds, work_seconds_logged,
+# new_day_pause_start, new_day_pause_seconds, multiday_start_date, heartbeat, task name, notes
+_RECORD_FORMAT = "<4sBBBxQddqqdq10sdH510sH2000s"
+_RECORD_SIZE = struct.calcsize(_RECORD_FORMAT)
+# record + crc32 of the record
+_SLOT_SIZE = _RECORD_SIZE + 4
+_MAGIC = b"TKCP"
+_VERSION = 1
+_TASK_SIZE = 510
+_NOTES_SIZE = 2000
+
+
+def _to_timestamp(value):
+    # 0 is used for None as the record is fixed-size
+    return value.timestamp() if value else 0.0
+
+
+def _from_timestamp(value):
+    return dt.datetime.fromtimestamp(value) if value else None
+
+
+def _encode_text(text, size):
+    """
+    Encodes the text to utf-8 and cuts it to size without breaking a multibyte character
+    """
+    data = (text or "").encode("utf-8")[:size]
+    return data.decode("utf-8", errors="ignore").encode("utf-8")
+
+
+class Checkpoint:
+    def __init__(self, checkpoint_file) -> None:
+        self.checkpoint_file = checkpoint_file
+        self.sequence = 0
+        self.file = None
+        self.mmap = None
+
+        try:
+            # create the file with both slots zeroed, if it does not exist
+            if not os.path.exists(checkpoint_file) or os.path.getsize(checkpoint_file) != 2 * _SLOT_SIZE:
+                with open(checkpoint_file, "wb") as f:
+                    f.write(b"\0" * (2 * _SLOT_SIZE))
+            self.file = open(checkpoint_file, "r+b")
+            self.mmap = mmap.mmap(self.file.fileno(), 2 * _SLOT_SIZE)
+        except (OSError, ValueError) as e:
+            # the app works without the checkpoint, only the crash recovery is lost
+            print(f"Error opening the checkpoint file: {e}")
+            self.close()
+            return
+
+        latest = self._read_latest_slot()
+        if latest:
+            self.sequence = latest[0]
+
+
+    def _read_slot(self, slot):
+        """
+        :return: tuple of the unpacked record or None if the slot is empty or torn (checksum mismatch)
+        """
+        data = self.mmap[slot * _SLOT_SIZE: (slot + 1) * _SLOT_SIZE]
+        record, crc = data[:_RECORD_SIZE], struct.unpack("<I", data[_RECORD_SIZE:])[0]
+        if zlib.crc32(record) != crc:
+            return None
+        values = struct.unpack(_RECORD_FORMAT, record)
+        if values[0] != _MAGIC or values[1] != _VERSION:
+            return None
+        # (sequence, values)
+        return values[4], values
+
+
+    def _read_latest_slot(self):
+        slots = [slot for slot in (self._read_slot(0), self._read_slot(1)) if slot]
+        return max(slots, key=lambda slot: slot[0]) if slots else None
+
+
+    def save(self, state: dict, flush=True) -> None:
+        """
+        Writes the state to the slot not holding the latest checkpoint
+        :param state: dict with the keys returned by load(), "detached" True if the task runs with no app watching it
+                      (saved by cli.py between its commands), so it is taken over as it is and not as a crashed task
+        :param flush: True to flush the checkpoint to the disk (on start/pause/resume)
+                      False just updates the mapped memory, which the OS writes to the disk in the background
+                      and survives an app crash, used for the periodic heartbeat
+        """
+        if self.mmap is None:
+            return
+
+        self.sequence += 1
+        task = _encode_text(state.get("current_task"), _TASK_SIZE)
+        notes = _encode_text(state.get("notes"), _NOTES_SIZE)
+        multiday_start_date = (state.get("multiday_start_date") or "").encode("ascii")[:10]
+        record = struct.pack(_RECORD_FORMAT, _MAGIC, _VERSION, state["status"], bool(state.get("detached")),
+                             self.sequence,
+                             _to_timestamp(state.get("task_start_time")),
+                             _to_timestamp(state.get("segment_start_time")),
+                             int(state.get("work_seconds") or 0),
+                             int(state.get("work_seconds_logged") or 0),
+                             _to_timestamp(state.get("new_day_pause_start")),
+                             int(state.get("new_day_pause_seconds") or 0),
+                             multiday_start_date,
+                             _to_timestamp(state.get("heartbeat") or dt.datetime.now()),
+                             len(task), task, len(notes), notes)
+
+        slot = self.sequence % 2
+        self.mmap[slot * _SLOT_SIZE: (slot + 1) * _SLOT_SIZE] = record + struct.pack("<I", zlib.crc32(record))
+        if flush:
+            self.mmap.flush()
+
+
+    def load(self):
+        """
+        :return: dict of the last saved state or None if there is no checkpoint
+        """
+        if self.mmap is None:
+            return None
+
+        latest = self._read_latest_slot()
+        if latest is None:
+            return None
+
+        (_, _, status, detached, _, task_start_time, segment_start_time, work_seconds, work_seconds_logged,
+         new_day_pause_start, new_day_pause_seconds, multiday_start_date, heartbeat,
+         task_length, task, notes_length, notes) = latest[1]
+        return {
+            "status": status,
+            "current_task": task[:task_length].decode("utf-8"),
+            "notes": notes[:notes_length].decode("utf-8"),
+            "task_start_time": _from_timestamp(task_start_time),
+            "segment_start_time": _from_timestamp(segment_start_time),
+            "work_seconds": work_seconds,
+            "work_seconds_logged": work_seconds_logged,
+            "new_day_pause_start": _from_timestamp(new_day_pause_start),
+            "new_day_pause_seconds": new_day_pause_seconds,
+            "multiday_start_date": multiday_start_date.rstrip(b"\0").decode("ascii") or None,
+            "heartbeat": _from_timestamp(heartbeat),
+            "detached": bool(detached),
+        }
+
+
+    def close(self) -> None:
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,349 @@
+# Command line Time Keeper, without the window, for scripts and SSH sessions
+# Runs the same timer engine as the app (engine.py), the task is kept between the commands in the app's checkpoint,
+# so a task started here is taken over by the app when it starts, and a task the app left (crash) is recovered here
+# and the rows are logged to the same storage as the app (storage.py), the Excel file through its journal or the database
+# Run: python cli.py start "Study Python" [--notes "..."]  -> starts a task (or resumes the paused task)
+#      python cli.py pause
+#      python cli.py end [--notes "..."]                     -> logs the task to Time_Keeper.xlsx
+#      python cli.py today                                   -> day's work by task
+#      python cli.py report [--from 2025-07-01] [--to 2025-07-31] [--by task|day|week|month] [--task "Study Python"]
+#      python cli.py export [--out Time_Keeper_export.xlsx]  -> whole history (all the archives) in one file, e.g., for Power BI
+#      python cli.py --storage sqlite today                  -> same as the app's --sqlite, the database is used by default once it exists
+# While the app is running on the same Excel file, start/pause/end are passed on to the app (instance.py),
+# today/report are answered by the app, and export is refused, as it would read the files the app is writing
+import argparse
+import datetime as dt
+import os
+import sys
+
+from checkpoint import Checkpoint
+from clock import SystemClock
+from engine import TimerEngine, TimerStatus, humanize_time
+from instance import EXCEL_FILE, QUERY_ACTIONS, SingleInstance
+from storage import BACKENDS, open_storage
+
+# same file (instance.EXCEL_FILE) and sheets as the app (TaskTimer)
+TASKS_SHEET = "Tasks"
+TIME_SHEET = "Time"
+TASKS_COL_NAME = "Task"
+TASK_ACTIVE_STATUS_SYMBOL = "Active"
+
+
+class TimeKeeperCLI:
+    def __init__(self, excel_file=EXCEL_FILE, backend=None) -> None:
+        self.excel_file = excel_file
+        base_name = os.path.splitext(excel_file)[0]
+        # the background writer is not started, the rows are written to the Excel file on end (Excel file as the store)
+        self.storage = open_storage(excel_file, backend, tasks_sheet=TASKS_SHEET, time_sheet=TIME_SHEET)
+        # the app's checkpoint, the task is saved as detached (see Checkpoint.save()) so the app takes it over as it is
+        self.checkpoint = Checkpoint(base_name + ".checkpoint")
+        self.clock = SystemClock()
+        self.notes = ""
+        self.engine = TimerEngine(clock=self.clock, log_rows=self._log_rows, get_notes=lambda: self.notes)
+
+        state = self.checkpoint.load()
+        if state is not None and state["detached"]:
+            # saved by the last command
+            if self.engine.restore(state):
+                self.notes = state["notes"]
+        elif self.engine.recover(state):
+            # the app crashed (or was killed) with a task, paused at its last heartbeat, same as the app's recovery
+            self.notes = state["notes"]
+            print(f"Recovered '{self.engine.current_task}' from the app, paused at {state['heartbeat']:%I:%M %p}")
+
+
+    def _log_rows(self, rows) -> bool:
+        """
+        Logs the rows of the task to the storage, all or nothing, same as TaskTimer._log_rows_to_excel()
+        """
+        return self.storage.append_rows([(TIME_SHEET, row) for row in rows])
+
+
+    def _save(self) -> None:
+        state = self.engine.to_state()
+        state["notes"] = self.notes
+        state["detached"] = True
+        self.checkpoint.save(state)
+
+
+    def _catch_up_days(self) -> bool:
+        """
+        The CLI does not run between the commands, so nobody checks for a new day at midnight like the app does
+        The engine replays the day changes since the task started at each midnight, so a task running for days
+        is split per day
+        :return: False if logging a day failed
+        """
+        return self.engine.on_new_day() is not False
+
+
+    def _find_task(self, task: str):
+        """
+        :return: the task as named in the Tasks sheet (ignoring the case), None if it is a new task
+        """
+        key = task.casefold()
+        for task_item in self.storage.task_records():
+            name = task_item.get(TASKS_COL_NAME)
+            if name is not None and str(name).casefold() == key:
+                return str(name)
+        return None
+
+
+    def start(self, task=None, notes=None) -> int:
+        """
+        Starts the task, or resumes the paused task if no task is given
+        A new task is added to the Tasks sheet, same as adding it in the app
+        """
+        if not self._catch_up_days():
+            print("Error: could not log the previous day of the task, try again")
+            return 1
+
+        if self.engine.status == TimerStatus.RUNNING:
+            print(f"'{self.engine.current_task}' is already running ({self._elapsed()})")
+            return 1
+
+        if self.engine.status == TimerStatus.PAUSED:
+            if task and task.casefold() != self.engine.current_task.casefold():
+                print(f"'{self.engine.current_task}' is paused, end it before starting '{task}'")
+                return 1
+            self.engine.start()
+            if notes is not None:
+                self.notes = notes
+            self._save()
+            print(f"Resumed '{self.engine.current_task}' ({self._elapsed()})")
+            return 0
+
+        if not task or not task.strip():
+            print("Error: no task given and no paused task to resume")
+            return 1
+
+        task = task.strip()
+        existing_task = self._find_task(task)
+        if existing_task is None:
+            # to preserve formats like 'ITR' 'GPS', same as the app
+            task = task[0].upper() + task[1:]
+            now = dt.datetime.now()
+            if not self.storage.append_rows([(TASKS_SHEET, {TASKS_COL_NAME: task, "Status": TASK_ACTIVE_STATUS_SYMBOL,
+                                                             "Added_On": f"{now:%d-%b-%Y T%I:%M %p}"})]):
+                print(f"Error: could not add the task '{task}'")
+                return 1
+            print(f"Added '{task}'")
+        else:
+            task = existing_task
+
+        self.notes = notes or ""
+        self.engine.start(task)
+        self._save()
+        print(f"Started '{task}' at {self.clock.now():%I:%M %p}")
+        return 0
+
+
+    def pause(self) -> int:
+        if not self._catch_up_days():
+            print("Error: could not log the previous day of the task, try again")
+            return 1
+        if self.engine.status != TimerStatus.RUNNING:
+            print("No task is running")
+            return 1
+
+        self.engine.pause()
+        self._save()
+        print(f"Paused '{self.engine.current_task}' ({self._elapsed()})")
+        return 0
+
+
+    def end(self, notes=None, save=True) -> int:
+        """
+        Ends the task and logs it to the storage, then writes the journal to the Excel file (Excel file as the store)
+        :param save: False to leave the rows in the journal, the app writes them to the Excel file when it runs next
+        """
+        if self.engine.status == TimerStatus.STOPPED:
+            print("No task to end")
+            return 1
+        if not self._catch_up_days():
+            print("Error: could not log the previous day of the task, try again")
+            return 1
+
+        if notes is not None:
+            self.notes = notes
+        task, elapsed = self.engine.current_task, self._elapsed()
+        if not self.engine.end():
+            # the engine keeps the task paused, so ending it again retries the log
+            self._save()
+            print(f"Error: could not log '{task}', the task is paused, end it again to retry")
+            return 1
+        self._save()
+        print(f"Ended '{task}' ({elapsed})")
+
+        if save and not self.storage.flush():
+            print(f"Could not save to {self.excel_file} (is it open in Excel?), the rows are kept in the journal")
+        return 0
+
+
+    def _elapsed(self) -> str:
+        return humanize_time(self.engine.elapsed_seconds() // 60) or "0m"
+
+
+    def today(self) -> int:
+        """
+        Prints the day's work by task, and the task running/paused now
+        """
+        print(today_text(self.storage, task_status(self.engine)))
+        return 0
+
+
+    def report(self, start=None, end=None, group_by="task", task=None) -> int:
+        """
+        Prints the work from start to end (both included), grouped, this week by task by default
+        """
+        print(report_text(self.storage, start, end, group_by, task))
+        return 0
+
+
+    def export(self, export_file=None) -> int:
+        """
+        Writes the Tasks and the Time sheets with the whole history to one xlsx file, streamed so the memory stays flat
+        :param export_file: str, <Excel file name>_export.xlsx by default
+        """
+        export_file = export_file or os.path.splitext(self.excel_file)[0] + "_export.xlsx"
+
+        def on_progress(rows_done, rows_total):
+            progress = f"{rows_done * 100 // rows_total}%" if rows_total else f"{rows_done:,} rows"
+            print(f"\rExporting... {progress}", end="", flush=True)
+
+        try:
+            rows_count = self.storage.export(export_file, on_progress=on_progress)
+        except (OSError, ValueError) as e:
+            print(f"\nError: could not export to {export_file}: {e}")
+            return 1
+        print(f"\nExported {rows_count:,} rows to {export_file}")
+        return 0
+
+
+def task_status(engine):
+    """
+    :return: (status, task, elapsed) of the task running/paused now, e.g., (TimerStatus.RUNNING, 'Study Python', '1h 5m'),
+             None if the timer is stopped
+    """
+    if engine.status == TimerStatus.STOPPED:
+        return None
+    return engine.status, engine.current_task, humanize_time(engine.elapsed_seconds() // 60) or "0m"
+
+
+def today_text(storage, current_task_status=None) -> str:
+    """
+    Day's work by task, and the task running/paused now, same text in the CLI and from the app (query())
+    :param current_task_status: see task_status()
+    """
+    today = dt.date.today()
+    # only the rows (or the archives, shards.py) of the day are read
+    totals = storage.time_index(today, today).totals(today, today, group_by="task")
+    lines = [f"  {task}: {humanize_time(minutes['work']) or '0m'}" for task, minutes in totals.items()]
+    work_minutes = sum(minutes["work"] for minutes in totals.values())
+    lines.append(f"Day: {humanize_time(work_minutes) or '0m'}")
+
+    if current_task_status is not None:
+        status, task, elapsed = current_task_status
+        lines.append(f"{'Running' if status == TimerStatus.RUNNING else 'Paused'}: '{task}' ({elapsed}, not yet logged)")
+    return "\n".join(lines)
+
+
+def report_text(storage, start=None, end=None, group_by="task", task=None) -> str:
+    """
+    Work from start to end (both included), grouped, this week by task by default
+    """
+    today = dt.date.today()
+    start = start or today - dt.timedelta(days=today.weekday())
+    end = end or today
+    totals = storage.time_index(start, end, task).totals(start, end, group_by=group_by, task=task)
+    lines = [f"{start} to {end} by {group_by}" + (f" for '{task}'" if task else "") + ":"]
+    for group, minutes in totals.items():
+        lines.append(f"  {group}: {humanize_time(minutes['work']) or '0m'}"
+                     f" (pause {humanize_time(minutes['pause']) or '0m'})")
+    lines.append(f"Total: {humanize_time(sum(minutes['work'] for minutes in totals.values())) or '0m'}")
+    return "\n".join(lines)
+
+
+def _parse_date(text):
+    try:
+        return dt.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date (YYYY-MM-DD): {text!r}")
+
+
+def _forward_to_app(single_instance, args) -> int:
+    """
+    Passes start/pause/end on to the app running on the Excel file, same as main.py --start/--pause/--end,
+    and asks the app the queries (today, report), as it has the rows not yet saved and the task running now
+    """
+    if args.command in QUERY_ACTIONS:
+        command = {"action": args.command}
+        if args.command == "report":
+            command.update(start=args.start and args.start.isoformat(), end=args.end and args.end.isoformat(),
+                           group_by=args.group_by, task=args.task)
+        text = single_instance.query(command)
+        if text is None:
+            return 1
+        print(text)
+        return 0
+    if args.command not in ("start", "pause", "end"):
+        print(f"Error: Time Keeper is running on {args.file}, close it to run '{args.command}'")
+        return 1
+    if getattr(args, "notes", None) is not None:
+        print("The notes are not passed on to the running app, add them in the app")
+    if not single_instance.forward({"action": args.command, "task": getattr(args, "task", None)}):
+        return 1
+    print(f"Passed '{args.command}' on to the running Time Keeper")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Time Keeper from the command line")
+    parser.add_argument("--file", default=EXCEL_FILE, help=f"Excel file (default {EXCEL_FILE})")
+    parser.add_argument("--storage", choices=BACKENDS,
+                        help="where the logs live, the database (Time_Keeper.db) by default if it exists, else the Excel file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start_parser = commands.add_parser("start", help="start a task, or resume the paused task")
+    start_parser.add_argument("task", nargs="?")
+    start_parser.add_argument("--notes")
+    commands.add_parser("pause", help="pause the running task")
+    end_parser = commands.add_parser("end", help="end the task and log it")
+    end_parser.add_argument("--notes")
+    end_parser.add_argument("--no-save", action="store_true",
+                            help="keep the rows in the journal instead of writing them to the Excel file now")
+    commands.add_parser("today", help="day's work by task")
+    report_parser = commands.add_parser("report", help="work over a date range, this week by default")
+    report_parser.add_argument("--from", dest="start", type=_parse_date)
+    report_parser.add_argument("--to", dest="end", type=_parse_date)
+    report_parser.add_argument("--by", dest="group_by", default="task", choices=("task", "day", "week", "month"))
+    report_parser.add_argument("--task")
+    export_parser = commands.add_parser("export", help="whole history in one xlsx file")
+    export_parser.add_argument("--out", help="xlsx file to write (default <file>_export.xlsx)")
+
+    args = parser.parse_args(argv)
+    # one app or CLI command at a time per Excel file, else both would write the journal/Excel file and the caches
+    single_instance = SingleInstance(args.file)
+    if not single_instance.acquire(listen=False):
+        return _forward_to_app(single_instance, args)
+
+    time_keeper = TimeKeeperCLI(args.file, args.storage)
+    try:
+        if args.command == "start":
+            return time_keeper.start(args.task, args.notes)
+        if args.command == "pause":
+            return time_keeper.pause()
+        if args.command == "end":
+            return time_keeper.end(args.notes, save=not args.no_save)
+        if args.command == "today":
+            return time_keeper.today()
+        if args.command == "export":
+            return time_keeper.export(args.out)
+        return time_keeper.report(args.start, args.end, args.group_by, args.task)
+    finally:
+        time_keeper.checkpoint.close()
+        time_keeper.storage.close()
+        single_instance.release()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
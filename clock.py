@@ -0,0 +1,92 @@
+# Clocks used by the timer engine
+# The engine never calls dt.datetime.now()/time.monotonic() directly but asks its clock,
+# so that the simulation (simulate.py) can run days of sessions in a fraction of a second
+import datetime as dt
+import sys
+import time
+
+
+def _suspend_clock():
+    """
+    Picks a pair of clocks of the platform that run the same while the system is awake,
+    one counting the time the system is suspended (sleep/hibernate) and the other not
+    :return: callable() -> float seconds the system was suspended since the boot, None if the platform has no such pair
+    """
+    if sys.platform.startswith("linux") and hasattr(time, "CLOCK_BOOTTIME"):
+        return lambda: time.clock_gettime(time.CLOCK_BOOTTIME) - time.clock_gettime(time.CLOCK_MONOTONIC)
+    if sys.platform == "darwin" and hasattr(time, "CLOCK_UPTIME_RAW"):
+        return lambda: time.clock_gettime(time.CLOCK_MONOTONIC_RAW) - time.clock_gettime(time.CLOCK_UPTIME_RAW)
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+            unbiased_time = ctypes.c_ulonglong()
+
+            def suspended_seconds():
+                # GetTickCount64 (ms) counts the suspended time, QueryUnbiasedInterruptTime (100 ns) does not
+                kernel32.QueryUnbiasedInterruptTime(ctypes.byref(unbiased_time))
+                return kernel32.GetTickCount64() / 1000 - unbiased_time.value / 10 ** 7
+            return suspended_seconds
+        except (ImportError, AttributeError, OSError):
+            return None
+    return None
+
+
+class SystemClock:
+    """
+    The real clock, used by the app
+    """
+    def __init__(self) -> None:
+        # False -> not picked yet, None -> the platform has no suspend clock
+        self.suspend_clock = False
+
+    def now(self) -> dt.datetime:
+        # local wall-clock time, logged to the Excel file
+        return dt.datetime.now()
+
+    def monotonic(self) -> float:
+        # seconds that never jump with wall-clock changes, used to detect system sleep/freeze
+        return time.monotonic()
+
+    def suspended_seconds(self):
+        # seconds the system was suspended since the boot, grows only while the system sleeps,
+        # so a slow Tk thread is not taken as a sleep, None if the platform can't tell (the gap between ticks is used)
+        # the clocks are picked on the first call (first tick) as ctypes is slow to import on Windows
+        if self.suspend_clock is False:
+            self.suspend_clock = _suspend_clock()
+        return self.suspend_clock() if self.suspend_clock is not None else None
+
+
+class SimulatedClock:
+    """
+    A clock that moves only when advance() is called
+    """
+    def __init__(self, start: dt.datetime) -> None:
+        self.current_time = start
+        self.current_mono = 0.0
+        self.current_suspended = 0.0
+
+    def now(self) -> dt.datetime:
+        return self.current_time
+
+    def monotonic(self) -> float:
+        return self.current_mono
+
+    def advance(self, seconds: float) -> None:
+        """
+        Moves both the wall-clock and the monotonic time forward
+        A busy Tk thread (e.g., a slow Excel save) is an advance() without a tick, a system sleep is suspend()
+        """
+        self.current_time += dt.timedelta(seconds=seconds)
+        self.current_mono += seconds
+
+    def suspended_seconds(self) -> float:
+        return self.current_suspended
+
+    def suspend(self, seconds: float) -> None:
+        """
+        The system sleeps for the seconds, an advance() that the suspend clock also counts
+        """
+        self.advance(seconds)
+        self.current_suspended += seconds
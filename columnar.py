@@ -0,0 +1,356 @@
+# Columnar mirror of the Time sheet, kept next to the Excel file (Time_Keeper.columns folder)
+# so that reading the history (day totals, reports, scripts) does not have to parse the xlsx XML
+# Each column is a file of little-endian int32 values, one per row, that can be memory-mapped with NumPy
+# Text columns (Task, Notes) store an id into a string table (one JSON string per line, id = line number, -1 = blank)
+# Dates are stored as day numbers (dt.date.toordinal()), 0 = blank
+# meta.json has the number of rows (rows_written) that are in the Excel file and the Excel file version they are from,
+# rows after rows_written are the rows logged to the journal but not yet written to the Excel file
+# Example usage (scripts):
+#     meta = json.load(open("Time_Keeper.columns/meta.json"))
+#     work = np.memmap("Time_Keeper.columns/Work_Minutes.i32", dtype="<i4", mode="r", shape=(meta["rows_written"],))
+from array import array
+import datetime as dt
+import json
+import os
+import sys
+import threading
+
+from workbook import cell_to_int, cell_to_ordinal
+
+# column name -> kind of value stored
+COLUMNS = {"Date": "date", "Task": "text", "Notes": "text", "Work_Minutes": "int", "Pause_Minutes": "int",
+           "Total_Minutes": "int", "Multi_day_Start": "date"}
+_DTYPE = "<i4"
+_VERSION = 1
+
+
+def _int_array():
+    # int32 in the byte order of the machine, swapped on read/write as the files are little-endian
+    return array("i")
+
+
+class ColumnarCache:
+    def __init__(self, cache_dir) -> None:
+        self.cache_dir = cache_dir
+        self.meta_file = os.path.join(cache_dir, "meta.json")
+        # version of the Excel file ([mtime_ns, size, inode]) the first rows_written rows are in sync with
+        self.fingerprint = None
+        self.rows_written = 0
+        # rows in the column files, rows_written + the rows logged to the journal
+        self.rows = 0
+        # rows written to the Excel file (mark_written()) before they were appended here (append()),
+        # the excel_writer thread can be quicker than the UI thread
+        self.rows_written_ahead = 0
+        # column -> number of strings saved in meta.json
+        self.string_counts = {}
+        # column -> list of strings and string -> id, loaded only when needed (_strings())
+        self.string_tables = {}
+        self.string_ids = {}
+        self.is_loaded = False
+        # appended from the UI thread, marked as written from the excel_writer thread
+        self.lock = threading.RLock()
+
+
+    def _column_file(self, column) -> str:
+        return os.path.join(self.cache_dir, f"{column}.i32")
+
+
+    def _strings_file(self, column) -> str:
+        return os.path.join(self.cache_dir, f"{column}.strings")
+
+
+    def _load(self) -> None:
+        """
+        Reads meta.json, the rows and strings after the ones in meta.json (not saved/torn) are dropped
+        """
+        self.is_loaded = True
+        try:
+            with open(self.meta_file, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != _VERSION:
+                raise ValueError(f"version {meta['version']}")
+            self.fingerprint = meta["fingerprint"]
+            self.rows_written = meta["rows_written"]
+            self.string_counts = meta["strings"]
+        except FileNotFoundError:
+            self._clear()
+            return
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading the Time sheet columns, they will be rebuilt: {e}")
+            self._clear()
+            return
+        self._truncate(self.rows_written)
+
+
+    def _clear(self) -> None:
+        """
+        Empties the cache, it is then rebuilt from the Excel file
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for column, kind in COLUMNS.items():
+            open(self._column_file(column), "wb").close()
+            if kind == "text":
+                open(self._strings_file(column), "wb").close()
+        self.fingerprint = None
+        self.rows_written = 0
+        self.rows = 0
+        self.string_counts = {column: 0 for column, kind in COLUMNS.items() if kind == "text"}
+        self.string_tables = {}
+        self.string_ids = {}
+
+
+    def _truncate(self, rows) -> None:
+        """
+        Cuts the column files to the rows, e.g., drops the journal rows that are re-added from the journal on sync()
+        """
+        for column in COLUMNS:
+            with open(self._column_file(column), "ab") as f:
+                f.truncate(rows * 4)
+        self.rows = rows
+        self.rows_written_ahead = 0
+
+
+    def _strings(self, column):
+        """
+        :return: list of the strings of a text column, loaded from the disk on the first use
+        """
+        if column not in self.string_tables:
+            strings, size = self._read_strings(column, self.string_counts.get(column, 0))
+            # drop the strings after the saved count, e.g., of the journal rows or half written when the app crashed
+            with open(self._strings_file(column), "ab") as f:
+                f.truncate(size)
+            self.string_tables[column] = strings
+            self.string_ids[column] = {string: string_id for string_id, string in enumerate(strings)}
+        return self.string_tables[column]
+
+
+    def _read_strings(self, column, count):
+        """
+        :return: (first count strings of a text column, size of those in the file)
+        """
+        strings = []
+        size = 0
+        with open(self._strings_file(column), "rb") as f:
+            for line in f:
+                if len(strings) == count:
+                    break
+                strings.append(json.loads(line))
+                size += len(line)
+        if len(strings) < count:
+            raise ValueError(f"{column} strings are missing")
+        return strings, size
+
+
+    def _string_id(self, column, value, new_strings) -> int:
+        if value is None or value == "":
+            return -1
+        self._strings(column)
+        value = str(value)
+        string_id = self.string_ids[column].get(value)
+        if string_id is None:
+            string_id = self.string_ids[column][value] = len(self.string_tables[column])
+            self.string_tables[column].append(value)
+            new_strings[column].append(value)
+        return string_id
+
+
+    def _append_rows(self, rows) -> int:
+        """
+        Appends the rows to the column files, the strings first so that a row never refers to a missing string
+        :return: number of rows appended
+        """
+        columns = {column: _int_array() for column in COLUMNS}
+        new_strings = {column: [] for column, kind in COLUMNS.items() if kind == "text"}
+        count = 0
+        for row in rows:
+            for column, kind in COLUMNS.items():
+                value = row.get(column)
+                if kind == "date":
+                    # 0 = blank/not a date in the files
+                    columns[column].append(cell_to_ordinal(value) or 0)
+                elif kind == "text":
+                    columns[column].append(self._string_id(column, value, new_strings))
+                else:
+                    columns[column].append(cell_to_int(value))
+            count += 1
+        if not count:
+            return 0
+
+        for column, strings in new_strings.items():
+            if strings:
+                with open(self._strings_file(column), "ab") as f:
+                    f.writelines((json.dumps(string) + "\n").encode("utf-8") for string in strings)
+                self.string_counts[column] = len(self.string_tables[column])
+        for column, values in columns.items():
+            if sys.byteorder != "little":
+                values.byteswap()
+            with open(self._column_file(column), "ab") as f:
+                values.tofile(f)
+        self.rows += count
+        return count
+
+
+    def _save_meta(self) -> None:
+        """
+        Writes meta.json to a temp file and replaces it, so a crash never leaves a half written meta.json
+        """
+        meta = {"version": _VERSION, "fingerprint": self.fingerprint, "rows_written": self.rows_written,
+                "strings": self.string_counts, "dtype": _DTYPE, "columns": COLUMNS}
+        temp_file = self.meta_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(temp_file, self.meta_file)
+        except OSError as e:
+            print(f"Error saving the Time sheet columns: {e}")
+
+
+    def _read_column(self, column, start, stop):
+        values = _int_array()
+        with open(self._column_file(column), "rb") as f:
+            f.seek(start * 4)
+            values.frombytes(f.read((stop - start) * 4))
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+
+    def sync(self, fingerprint, read_rows, pending_rows) -> None:
+        """
+        Brings the cache in sync with the Excel file, same as DayIndex.sync()
+        If the Excel file is unchanged, this does not read the Excel file at all
+        If it was changed outside the app (the app's own saves go through mark_written()), all the rows are read again,
+        as any row may have been edited, not just rows added at the end
+        :param fingerprint: current file_fingerprint() of the Excel file
+        :param read_rows: callable() that returns an iterable of all the Time sheet rows as dicts
+        :param pending_rows: Time sheet rows in the journal
+        """
+        with self.lock:
+            if not self.is_loaded:
+                self._load()
+            # the journal rows are added again below, the journal has the rows not yet written as of now
+            self._truncate(self.rows_written)
+
+            if fingerprint != self.fingerprint:
+                self._rebuild(read_rows)
+                self.fingerprint = fingerprint
+                self._save_meta()
+
+            self._append_rows(pending_rows)
+
+
+    def _rebuild(self, read_rows) -> None:
+        if self.rows_written > 0:
+            print("Time sheet was changed outside the app, rebuilding the Time sheet columns")
+        self._clear()
+        self.rows_written = self._append_rows(read_rows())
+
+
+    def append(self, row: dict) -> None:
+        """
+        Appends a Time sheet row that has been logged to the journal, on _log_data_to_excel()
+        """
+        with self.lock:
+            if not self.is_loaded:
+                # not synced yet, the row is added from the journal on sync()
+                return
+            self._append_rows([row])
+            if self.rows_written_ahead:
+                self.rows_written_ahead -= 1
+                self.rows_written += 1
+
+
+    def mark_written(self, rows, old_fingerprint, new_fingerprint) -> None:
+        """
+        Marks the journal rows written to the Excel file as saved, with the new version of the Excel file
+        If the cache was not in sync with the file before the write (e.g., file edited in Excel meanwhile),
+        the rows are read from the file on the next sync()
+        :param rows: Time sheet rows written to the Excel file, in the order they were written
+        """
+        with self.lock:
+            if not self.is_loaded or old_fingerprint != self.fingerprint:
+                return
+            written = self.rows_written + len(rows)
+            self.rows_written = min(written, self.rows)
+            self.rows_written_ahead += written - self.rows_written
+            self.fingerprint = new_fingerprint
+            self._save_meta()
+
+
+    def iter_rows(self):
+        """
+        Reads the rows written to the Excel file as dicts, same as iter_records() on the Time sheet
+        """
+        with self.lock:
+            rows_written = self.rows_written
+            columns = {column: self._read_column(column, 0, rows_written) for column in COLUMNS}
+            strings = {column: self._strings(column) for column, kind in COLUMNS.items() if kind == "text"}
+
+        for position in range(rows_written):
+            row = {}
+            for column, kind in COLUMNS.items():
+                value = columns[column][position]
+                if kind == "date":
+                    row[column] = dt.date.fromordinal(value) if value else None
+                elif kind == "text":
+                    row[column] = strings[column][value] if value >= 0 else None
+                else:
+                    row[column] = value
+            yield row
+
+
+    def oldest_date(self):
+        """
+        Earliest date of the rows written to the Excel file, without NumPy, e.g., to check if there are periods to archive
+        :return: dt.date or None if there are no dated rows
+        """
+        with self.lock:
+            if not self.is_loaded:
+                self._load()
+            dates = [value for value in self._read_column("Date", 0, self.rows_written) if value]
+        return dt.date.fromordinal(min(dates)) if dates else None
+
+
+    def columns(self) -> dict:
+        """
+        Memory-maps the column files, the rows not yet written to the Excel file are included
+        :return: dict column -> read-only NumPy array of int32, and the string tables (Task, Notes)
+        """
+        import numpy as np
+
+        with self.lock:
+            rows = self.rows
+            columns = {column: (np.memmap(self._column_file(column), dtype=_DTYPE, mode="r", shape=(rows,))
+                                if rows else np.zeros(0, dtype=_DTYPE))
+                       for column in COLUMNS}
+            strings = {column: list(self._strings(column)) for column, kind in COLUMNS.items() if kind == "text"}
+        return {"columns": columns, "strings": strings}
+
+
+    def saved_columns(self, fingerprint):
+        """
+        Memory-maps the saved rows without changing the files, for readers other than the app (e.g., query.py)
+        as the app may be appending to the files at the same time
+        :param fingerprint: current file_fingerprint() of the Excel file
+        :return: same as columns() for the rows written to the Excel file, or None if the cache is not in sync with it
+        """
+        import numpy as np
+
+        try:
+            with open(self.meta_file, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != _VERSION or meta["fingerprint"] != fingerprint:
+                return None
+            rows = meta["rows_written"]
+            columns = {column: (np.memmap(self._column_file(column), dtype=_DTYPE, mode="r", shape=(rows,))
+                                if rows else np.zeros(0, dtype=_DTYPE))
+                       for column in COLUMNS}
+            strings = {column: self._read_strings(column, meta["strings"].get(column, 0))[0]
+                       for column, kind in COLUMNS.items() if kind == "text"}
+        except FileNotFoundError:
+            # the app has not built the columns yet
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading the Time sheet columns: {e}")
+            return None
+        return {"columns": columns, "strings": strings}
@@ -0,0 +1,139 @@
+# Sidecar index of the work minutes per day for the Time sheet
+# so that the 'Day:' total is a lookup instead of reading the whole Time sheet
+# The index is saved next to the Excel file and is trusted only if the Excel file has not changed since
+import datetime as dt
+import json
+import os
+import threading
+
+from workbook import cell_to_int, cell_to_ordinal
+
+
+def _day_key(value):
+    """
+    Converts the Date cell value of a Time sheet row to the index key 'YYYY-MM-DD', "" if it's not a date
+    """
+    ordinal = cell_to_ordinal(value)
+    return dt.date.fromordinal(ordinal).isoformat() if ordinal is not None else ""
+
+
+class DayIndex:
+    def __init__(self, index_file) -> None:
+        self.index_file = index_file
+        # day ('YYYY-MM-DD') -> {"total": work minutes} for the rows in the Excel file
+        self.days = {}
+        # same as days, for the rows in the journal that are not yet written to the Excel file
+        # these are not saved to the index file as the journal itself is persistent
+        self.pending_days = {}
+        # version of the Excel file ([mtime_ns, size, inode]) the index is in sync with
+        self.fingerprint = None
+        # the index is updated from the background compaction thread and read from the UI thread
+        self.lock = threading.Lock()
+
+
+    @staticmethod
+    def _add(days, row, sign=1):
+        """
+        Adds (sign=1) or removes (sign=-1) the work minutes of a Time sheet row to/from days
+        """
+        day = days.setdefault(_day_key(row.get("Date")), {"total": 0})
+        day["total"] += sign * cell_to_int(row.get("Work_Minutes"))
+
+
+    def sync(self, fingerprint, read_rows, pending_rows) -> None:
+        """
+        Loads the index from the disk and brings it in sync with the Excel file
+        If the Excel file is unchanged, this does not read the Excel file at all
+        If it was changed outside the app (the app's own saves go through mark_written()), the index is rebuilt
+        from all the rows, as any row may have been edited, not just rows added at the end
+        :param fingerprint: current file_fingerprint() of the Excel file
+        :param read_rows: callable() that returns an iterable of all the Time sheet rows as dicts
+        :param pending_rows: Time sheet rows in the journal
+        """
+        with self.lock:
+            if self.fingerprint is None:
+                self._load()
+
+            if fingerprint != self.fingerprint:
+                self._rebuild(read_rows)
+                self.fingerprint = fingerprint
+                self._save()
+
+            self.pending_days = {}
+            for row in pending_rows:
+                self._add(self.pending_days, row)
+
+
+    def _rebuild(self, read_rows):
+        if self.days:
+            print("Time sheet was changed outside the app, rebuilding the day index")
+        days = {}
+        for row in read_rows():
+            self._add(days, row)
+        self.days = days
+
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_file, encoding="utf-8") as f:
+                data = json.load(f)
+            self.days = data["days"]
+            self.fingerprint = data["fingerprint"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading the day index, it will be rebuilt: {e}")
+
+
+    def _save(self) -> None:
+        """
+        Writes the index to a temp file and replaces the index file, so a crash never leaves a half written index
+        """
+        data = {"fingerprint": self.fingerprint, "days": self.days}
+        temp_file = self.index_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.index_file)
+        except OSError as e:
+            print(f"Error saving the day index: {e}")
+
+
+    def add_pending(self, row: dict) -> None:
+        """
+        Adds a Time sheet row that has been logged to the journal
+        """
+        with self.lock:
+            self._add(self.pending_days, row)
+
+
+    def mark_written(self, rows, old_fingerprint, new_fingerprint) -> None:
+        """
+        Moves the Time sheet rows written from the journal to the Excel file from pending to the saved index
+        If the index was not in sync with the file before the write (e.g., file edited in Excel meanwhile),
+        the rows are only removed from pending and are indexed from the file on the next sync()
+        :param rows: Time sheet rows written to the Excel file, in the order they were written
+        :param old_fingerprint: file_fingerprint() of the Excel file before the save
+        :param new_fingerprint: file_fingerprint() of the Excel file after the save
+        """
+        with self.lock:
+            is_in_sync = old_fingerprint == self.fingerprint
+            for row in rows:
+                self._add(self.pending_days, row, sign=-1)
+                if is_in_sync:
+                    self._add(self.days, row)
+            if is_in_sync:
+                self.fingerprint = new_fingerprint
+                self._save()
+
+
+    def day_total(self, date) -> int:
+        """
+        Total work minutes logged for the date
+        :param date: dt.date
+        """
+        key = _day_key(date)
+        with self.lock:
+            return (self.days.get(key, {}).get("total", 0) +
+                    self.pending_days.get(key, {}).get("total", 0))
+
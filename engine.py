@@ -0,0 +1,527 @@
+# Timer engine: the state of the task being timed (start, pause, resume, end), multi-day splits and sleep detection
+# It does not know about the UI or the Excel file, the rows to be logged are handed to the log_rows callable
+# and all the time is read from the clock, so the engine can run headless (simulate.py)
+import datetime as dt
+from enum import Enum
+
+from clock import SystemClock
+
+
+class TimerStatus(Enum):
+    # to track the timer status for the buttons to work correctly
+    RUNNING = 1
+    PAUSED = 2
+    STOPPED = 3
+
+
+def humanize_time(minutes):
+    """
+    Formats the total minutes to H:MM string format to be logged to Excel
+    Handles durations longer than 24 hours by accumulating the hours
+    :return: str: 2h 12m or 0
+    """
+    # this is incorrect as there may be pause time in between
+    # difference = self.task_end_time - self.task_start_time
+    # diff_seconds = difference.total_seconds()
+    # seconds_elapsed represents only the time in seconds timer ran and not paused
+    if minutes:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:.0f}h {minutes:02.0f}m" if hours else f"{minutes:.0f}m"
+    else:
+        return 0
+
+
+def calculate_duration(task_start_time, task_end_time, work_seconds):
+    """
+    calculates work_minutes, pause_minutes, and total_task_minutes at the end of the task to be saved to Excel
+    ensures work_minutes + pause_minutes == total_task_minutes, to align with start and end time shown in hh:mm in Excel
+    """
+
+    # we have to tie in task start and end time, trimmed task start and end time, work_minutes, pause_minutes, total_minutes together to ensure total_m = work_m + pause_m
+
+    # trim the seconds for Excel visible times
+    task_start_trimmed = task_start_time.replace(second=0, microsecond=0)
+    task_end_trimmed = task_end_time.replace(second=0, microsecond=0)
+
+    total_task_seconds_trimmed = int( (task_end_trimmed - task_start_trimmed).total_seconds() )
+    total_task_minutes = total_task_seconds_trimmed // 60
+
+    # calculate total wall-clock seconds for the task
+    # cast to int for consistency with work_seconds
+    total_actual_seconds = int( (task_end_time - task_start_time).total_seconds() )
+
+    # Since we accumulate the work_seconds at hh:mm:ss level, i.e., at seconds precision,
+    # we also get the pause duration at seconds precision
+    # max to cover cases where work_seconds may be more than total_actual_seconds
+    pause_seconds = max(0, total_actual_seconds - work_seconds)
+    pause_minutes = pause_seconds // 60
+
+    # derive work_minutes to ensure the work_m + pause_m = total_m
+    work_minutes = total_task_minutes - pause_minutes
+    work_minutes = max(0, work_minutes)  # Ensure non-negative
+
+    return work_minutes, pause_minutes, total_task_minutes
+
+
+class TimerEngine:
+    def __init__(self, clock=None, log_row=None, get_notes=None, on_day_logged=None, log_rows=None) -> None:
+        """
+        :param clock: SystemClock (default) or SimulatedClock
+        :param log_row: callable(row_dict) -> bool that logs a Time sheet row, True if logged
+        :param log_rows: callable(list of row_dict) -> bool that logs the rows all or nothing, True if logged
+                         used for the rows of a multi-day split, defaults to log_row for each row
+        :param get_notes: callable() -> str notes of the task to be logged with the row
+        :param on_day_logged: callable(work_minutes) called after the current/new day row of an ended task is logged
+        """
+        self.clock = clock or SystemClock()
+        self.log_row = log_row or (lambda row: True)
+        # not all or nothing by default, a row logged before a failed one stays logged
+        self.log_rows = log_rows or (lambda rows: all(self.log_row(row) for row in rows))
+        self.get_notes = get_notes or (lambda: "")
+        self.on_day_logged = on_day_logged or (lambda work_minutes: None)
+
+        # track the timer status - running, paused, stopped
+        self.status: TimerStatus = TimerStatus.STOPPED
+        # task being timed
+        self.current_task = ""
+        self.task_start_time = None # to store the start time of the task
+        self.task_end_time = None # to store the end time of the task
+        self.segment_start_time = None # start of a segment, if paused
+        self.segment_end_time = None # end of a segment, if paused
+        self.work_seconds = 0
+        # ----to track multi day task tracking variables----
+        self.new_day_pause_start = None
+        self.new_day_pause_seconds = 0
+        self.work_seconds_logged = 0
+        self.multiday_start_date = None # to group multiday tasks
+        # to track if the end of the task is by user of by system so that the task_end_time and segment_end_time are set accordingly
+        self.auto_end = False
+
+        # to track the system sleep/freeze/hang phases etc.
+        self.last_tick_mono = self.clock.monotonic()
+        self.last_tick_time = self.clock.now()
+        # suspended seconds of the clock at the last tick, None if the clock can't tell a sleep from a busy Tk thread
+        self.last_tick_suspended = self.clock.suspended_seconds()
+        # a suspend shorter than this is not taken as a sleep (the two clocks may differ by a tick of their resolution)
+        self.min_suspend_seconds = 1.0
+
+
+    def seconds_accumulator(self):
+        """
+        calculate the segment duration (segment_end_time - segment_start_time), when paused
+        and add the duration to work seconds
+        only completed second is considered i.e., numbers after decimal. that we get from .total_seconds() is ignored
+        """
+        self.work_seconds += int((self.segment_end_time - self.segment_start_time).total_seconds())
+
+
+    def new_day_pause_seconds_accumulator(self, current_timestamp: dt.datetime) -> None:
+        """
+        Accumulates the pause seconds of a new day for multi-day tasks
+        :return: None
+        """
+        # if pause start is captured (not None), pause start and end or on a new day, else pause start is on the previous day (i.e., before midnight) and end (the pause end = resume) is on new day
+        if self.new_day_pause_start:
+            # pause start was on a new day
+            self.new_day_pause_seconds += int( (current_timestamp - self.new_day_pause_start).total_seconds())
+            self.new_day_pause_start = None
+        else:
+            # pause start was on the previous day
+            midnight_timestamp = dt.datetime.combine(current_timestamp, dt.time())
+            # new day pause duration will be midnight -> resume time
+            self.new_day_pause_seconds += int( (current_timestamp - midnight_timestamp).total_seconds() )
+
+
+    def start(self, task=None):
+        """
+        Starts a new task (from STOPPED) or resumes a paused task
+        :param task: str task to start, only used when starting from STOPPED
+        """
+        if self.status == TimerStatus.RUNNING:
+            return
+
+        # Set task_start_time only if the timer is beginning a new session (from STOPPED);
+        # this preserves the original start time when resuming from a PAUSED state.
+        if self.status == TimerStatus.STOPPED:
+            if task is not None:
+                self.current_task = task
+            # set the task_start_time at the start of the task
+            self.task_start_time = self.clock.now()
+
+        # set the start of the segment
+        self.segment_start_time = self.clock.now()
+
+        # accumulate the pause seconds if new day on resuming a pause
+        # check if the resume (i.e., status was PAUSED before resume) is on a new day
+        if self.status == TimerStatus.PAUSED and self.task_start_time.date() != self.segment_start_time.date():
+            self.new_day_pause_seconds_accumulator(current_timestamp= self.segment_start_time)
+
+        self.status = TimerStatus.RUNNING
+        # a task that was auto ended (sleep/crash recovery) and failed to log is now resumed by the user,
+        # so the end time is to be taken on end and not the one set by the system
+        self.auto_end = False
+
+
+    def pause(self):
+        """
+        Pauses the running task
+        """
+        if self.status != TimerStatus.RUNNING:
+            return
+
+        # capture the end of segment when paused
+        self.segment_end_time = self.clock.now()
+        if self.task_start_time.date() != self.segment_end_time.date():
+            # paused on a new day, capture pause start for calculating pause duration
+            self.new_day_pause_start = self.clock.now()
+        # accumulate the work seconds when paused
+        self.seconds_accumulator()
+        self.status = TimerStatus.PAUSED
+
+
+    def elapsed_seconds(self) -> int:
+        """
+        Work seconds of the task so far, including the running segment, for the timer display
+        """
+        seconds_elapsed = self.work_seconds
+        if self.status == TimerStatus.RUNNING:
+            seconds_elapsed += (self.clock.now() - self.segment_start_time).total_seconds()
+        return int(seconds_elapsed)
+
+
+    def day_row(self, task_start_time, task_end_time, work_minutes, pause_minutes, total_task_minutes) -> dict:
+        """
+        Builds the Time sheet row for a day of the task
+        :return: dict column header -> cell value
+        """
+        # get the work duration in hh:mm format
+        work_duration = humanize_time(work_minutes)
+        pause_duration = humanize_time(pause_minutes)
+
+        # write data to the Excel Date, Task, Duration, Notes, Start Time, End Time, Seconds
+        return dict(Date=task_start_time.date(),
+                    Task=self.current_task,
+                    Work_Duration=work_duration,
+                    Notes=self.get_notes(),
+                    Pause_Duration=pause_duration,
+                    Start_Time=f"{task_start_time:%I:%M %p}",
+                    End_Time=f"{task_end_time:%I:%M %p}",
+                    Work_Minutes=work_minutes,
+                    Pause_Minutes=pause_minutes,
+                    Total_Minutes=total_task_minutes,
+                    Multi_day_Start = f"{self.multiday_start_date}",
+                    )
+
+
+    def check_day_split_and_log(self, now=None) -> bool:
+        """
+        If the task spans for more than one day, logs entry for each day splitting the duration till midnight
+        Else, logs the task for the day
+        This method is called on detection of new day start (on_new_day())
+        Or on task end inside end()
+        The rows of the previous day and the current day are logged together with log_rows, all or nothing,
+        so a failed log never leaves the previous day logged without the current day
+        :param now: dt.datetime the new day is seen at, the clock's now by default (a midnight replayed by on_new_day())
+        :return: Log Status as bool
+        """
+        # rows to be logged, and the task start/work logged for the current day once the previous day is logged
+        rows = []
+        task_start_time = self.task_start_time
+        work_seconds_logged = self.work_seconds_logged
+        # restored if the log fails, as the pause of a paused task is accumulated below
+        multiday_start_date = self.multiday_start_date
+        new_day_pause_start, new_day_pause_seconds = self.new_day_pause_start, self.new_day_pause_seconds
+
+        # check if task start date and now are on different dates
+        current_timestamp = now or self.clock.now() # time when a new day is detected or when the task stopped/ended by the user
+        if self.status == TimerStatus.STOPPED:
+            # on end, the task ends at task_end_time, which is before now if ended by the system (sleep/crash recovery)
+            # e.g., slept before midnight and woke up on the next day must not split the task at midnight
+            current_timestamp = self.task_end_time
+        is_split = self.task_start_time.date() != current_timestamp.date()
+        if is_split:
+            # this block is triggered from both on_new_day() and end()
+
+            # a new day has started
+            cumulative_work_seconds = self.work_seconds
+
+            if self.status == TimerStatus.RUNNING:
+                # the seconds_accumulator() would not have been called for the current segment
+                cumulative_work_seconds += int( (current_timestamp - self.segment_start_time).total_seconds() )
+
+            # CASE - pause may have started on previous day/new day and not resumed
+            # new day change gets triggered inside on_new_day that calls check_day_split_and_log, but pause duration accumulation does not happen in start()
+            # so, we have to count the pause duration from pause start to current_timestamp
+            if self.status == TimerStatus.PAUSED:
+                self.new_day_pause_seconds_accumulator(current_timestamp=current_timestamp)
+
+            # midnight -> now i.e., when a new day was detected/when the task ended on new day
+            midnight_timestamp = dt.datetime.combine(current_timestamp, dt.time())
+            new_day_total_seconds = int( (current_timestamp - midnight_timestamp).total_seconds() )
+            new_day_work_seconds = new_day_total_seconds - self.new_day_pause_seconds
+
+            # work_seconds_logged is the work of the days already logged, for a task running 3+ days
+            prev_day_work_seconds = cumulative_work_seconds - self.work_seconds_logged - new_day_work_seconds
+
+            # to track the multi-day tasks
+            # set only on the first split, task_start_time is midnight for the later days of a task running 3+ days
+            if not self.multiday_start_date:
+                self.multiday_start_date = f"{self.task_start_time.date()}"
+
+            # calculate the durations for the previous day i.e., task_start -> midnight
+            work_minutes, pause_minutes, total_task_minutes = calculate_duration(
+                                                                task_start_time=self.task_start_time,
+                                                                task_end_time=midnight_timestamp,
+                                                                work_seconds=prev_day_work_seconds)
+
+            # row for the previous day
+            rows.append(self.day_row(task_start_time=self.task_start_time,
+                                     task_end_time=midnight_timestamp,
+                                     work_minutes=work_minutes,
+                                     pause_minutes=pause_minutes,
+                                     total_task_minutes=total_task_minutes))
+
+            # the current day starts at midnight
+            # we keep adding to work_seconds_logged to handle tasks spanning 2+ days
+            work_seconds_logged += prev_day_work_seconds
+            task_start_time = midnight_timestamp
+
+        # CASE - task started on the previous day and ended on new day
+        # on end, end() is triggered, which in turn calls this method to log both previous day and new day data
+        # CASE - task start and end are on the same day
+        # in this case, there is no previous day row, and we only have to log the current day
+        day_work_minutes = None
+        if self.status == TimerStatus.STOPPED:
+            # this block is triggered on call from end() where we have to log for
+            # only current day and the new day
+            # previous day is handled by the above if block
+
+            # get the current day's work seconds (matters if the task is a multi-day task)
+            current_day_work_seconds = self.work_seconds - work_seconds_logged
+
+            # calculate the durations for the current day or new day (if multi-day task)
+            day_work_minutes, pause_minutes, total_task_minutes = calculate_duration(
+                                                                    task_start_time=task_start_time,
+                                                                    task_end_time=self.task_end_time,
+                                                                    work_seconds=current_day_work_seconds)
+
+            # row for the current day
+            rows.append(self.day_row(task_start_time=task_start_time,
+                                     task_end_time=self.task_end_time,
+                                     work_minutes=day_work_minutes,
+                                     pause_minutes=pause_minutes,
+                                     total_task_minutes=total_task_minutes))
+
+        if not rows:
+            # same day and the task is not ended, nothing to log
+            return ""
+
+        # log the previous day and the current day rows in one go
+        if not self.log_rows(rows):
+            # nothing is logged, so the next attempt builds the same rows again
+            self.multiday_start_date = multiday_start_date
+            self.new_day_pause_start, self.new_day_pause_seconds = new_day_pause_start, new_day_pause_seconds
+            return False
+
+        if is_split:
+            # if the previous day is successfully logged to Excel, reset the variables
+            self.work_seconds_logged = work_seconds_logged
+            self.task_start_time = task_start_time
+            # Multi - day tracking variables reset
+            # we reset these here instead of in reset() as check_day_split_and_log() is also called from on_new_day() where reset() is no where triggered
+            self.new_day_pause_start = None
+            self.new_day_pause_seconds = 0
+
+        if day_work_minutes is not None:
+            # to update the days' work duration in the UI
+            # we need not call this for prev_day log because - if preV-day logging is triggered by on_new_day() i.e., when the timer is paused or running, updating UI display might confuse the user
+            # so, we only call this when the same day or new day datat is logged to the Excel
+            self.on_day_logged(day_work_minutes)
+
+        return True
+
+
+    def end(self):
+        """
+        Ends the task and logs it
+        If logging fails, the task is kept as PAUSED so that ending it again retries the log
+        :return: None if there was no task to end, else the log status (True or False)
+        """
+        # if the timer is not stopped i.e., status is running/paused
+        if self.status == TimerStatus.STOPPED:
+            return None
+
+        if not self.auto_end:
+            # end() is not triggered by the system but by the user
+
+            # to capture when the task has ended and to be logged to the Excel
+            self.task_end_time = self.clock.now()
+            # accumulate seconds if the timer is not in paused state before ending the task
+            if self.status != TimerStatus.PAUSED:
+                self.segment_end_time = self.clock.now()
+                self.seconds_accumulator()
+
+        # check for multi-day tasks and log the data to Excel
+        self.status = TimerStatus.STOPPED
+        log_status = self.check_day_split_and_log()
+
+        if log_status:
+            self.reset()
+            return True
+
+        # if we set this to STOPPED, we can't attempt to retry saving to the Excel file
+        self.status = TimerStatus.PAUSED
+        return False
+
+
+    def reset(self):
+        """
+        Resets the engine to its initial stopped state, without logging
+        """
+        self.status = TimerStatus.STOPPED
+        self.current_task = ""
+        self.task_start_time = None
+        self.task_end_time = None
+        self.segment_start_time = None
+        self.segment_end_time = None
+        self.work_seconds = 0
+        # Multi - day tracking variables reset
+        self.work_seconds_logged = 0
+        self.new_day_pause_start = None
+        self.new_day_pause_seconds = 0
+        # reset the multi-day task ID
+        self.multiday_start_date = None
+        self.auto_end = False
+
+
+    def on_new_day(self):
+        """
+        To be called when a new day is detected, logs the previous day's part of a running/paused task
+        Every midnight since the current day of the task started is replayed, one row per day, e.g., for the days
+        the app was not running (crash recovery, the CLI between the commands) or the system slept through
+        :return: log status or None if the timer is stopped, False if logging a day failed (the days not yet logged
+                 are replayed on the next call)
+        """
+        if self.status == TimerStatus.STOPPED:
+            return None
+
+        day = self.task_start_time.date() + dt.timedelta(days=1)
+        if self.new_day_pause_start is not None:
+            # paused on a later day than the task's current day (the splits before it were missed),
+            # the work of the days before the pause is not known per day, so they are logged as one
+            day = max(day, self.new_day_pause_start.date())
+        log_status = ""
+        while day <= self.clock.now().date():
+            log_status = self.check_day_split_and_log(now=dt.datetime.combine(day, dt.time()))
+            if log_status is False:
+                return False
+            if self.auto_end and self.task_end_time < self.task_start_time:
+                # a recovered task (recover()) is paused since its end at the last heartbeat, ending it now ends it
+                # on the day it is on, the days in between are logged as paused
+                self.task_end_time = self.task_start_time
+            day += dt.timedelta(days=1)
+        return log_status
+
+
+    def tick(self, expected_interval: float) -> bool:
+        """
+        To be called periodically, detects system sleep by the time the system was suspended since the previous tick
+        (clock.suspended_seconds()), or by the gap since the previous tick if the clock can't tell
+        A gap without a suspend is the Tk thread being busy (e.g., a slow Excel save) and the task keeps running
+        If a running task is found to have slept, it is ended (auto_end) at the last tick before the sleep
+        :param expected_interval: float seconds expected between the ticks, including a buffer for scheduling delays
+        :return: True if a sleep/freeze was detected and the task was ended
+        """
+        is_slept = False
+        suspended_seconds = self.clock.suspended_seconds()
+        if self.status == TimerStatus.RUNNING:
+            time_since_last_tick = self.clock.monotonic() - self.last_tick_mono
+            if suspended_seconds is not None and self.last_tick_suspended is not None:
+                has_slept = suspended_seconds - self.last_tick_suspended >= self.min_suspend_seconds
+            else:
+                has_slept = time_since_last_tick >= expected_interval
+
+            if has_slept:
+                # the system is awake from sleep or recovered from a freeze/hang
+                # in this case, the task and segment were running till the last_tick_time
+                # we accumulate work from the segment that was running before sleep
+                # till the last known active moment before suspension i.e., last tick
+                self.segment_end_time = self.last_tick_time
+                # we set the task end time to last_tick_time so that sleep time is excluded as we use task_end_time to calculate pause duration inside calculate_duration()
+                self.task_end_time = self.last_tick_time
+                self.auto_end = True
+                self.seconds_accumulator()
+                is_slept = True
+
+        # capture the last tick time to check for system sleep/freeze by calculating the diff between this and next tick
+        self.last_tick_time = self.clock.now()
+        self.last_tick_mono = self.clock.monotonic()
+        self.last_tick_suspended = suspended_seconds
+        return is_slept
+
+
+    def to_state(self) -> dict:
+        """
+        State of the task to be saved to the checkpoint
+        """
+        return {
+            "status": self.status.value,
+            "current_task": self.current_task,
+            "task_start_time": self.task_start_time,
+            "segment_start_time": self.segment_start_time,
+            "work_seconds": self.work_seconds,
+            "work_seconds_logged": self.work_seconds_logged,
+            "new_day_pause_start": self.new_day_pause_start,
+            "new_day_pause_seconds": self.new_day_pause_seconds,
+            "multiday_start_date": self.multiday_start_date,
+            "heartbeat": self.clock.now(),
+        }
+
+
+    def restore(self, state: dict) -> bool:
+        """
+        Restores the task exactly as saved by to_state(), a running task keeps running
+        Used by the CLI (cli.py), where the task is saved between the commands and not lost in a crash
+        :param state: dict from the checkpoint
+        :return: True if there was a task to restore
+        """
+        if state is None or state["status"] not in (TimerStatus.RUNNING.value, TimerStatus.PAUSED.value):
+            return False
+
+        self.current_task = state["current_task"]
+        self.task_start_time = state["task_start_time"]
+        self.segment_start_time = state["segment_start_time"]
+        self.work_seconds = state["work_seconds"]
+        self.work_seconds_logged = state["work_seconds_logged"]
+        self.new_day_pause_start = state["new_day_pause_start"]
+        self.new_day_pause_seconds = state["new_day_pause_seconds"]
+        self.multiday_start_date = state["multiday_start_date"]
+        self.status = TimerStatus(state["status"])
+        return True
+
+
+    def recover(self, state: dict) -> bool:
+        """
+        Restores the task that was running/paused when the app crashed (or was killed) as a paused task
+        A running task is taken as worked till the last heartbeat, the same as a system sleep in tick()
+        If ended without resuming, the task ends at the last heartbeat and not at the time of recovery
+        :param state: dict from the checkpoint (to_state() + heartbeat)
+        :return: True if there was a task to recover
+        """
+        if not self.restore(state):
+            return False
+        heartbeat = state["heartbeat"]
+
+        if state["status"] == TimerStatus.RUNNING.value:
+            # the segment was running till the last heartbeat
+            self.segment_end_time = max(heartbeat, self.segment_start_time)
+            self.seconds_accumulator()
+            if self.task_start_time.date() != self.segment_end_time.date():
+                # paused on a new day, same as in pause()
+                self.new_day_pause_start = self.segment_end_time
+            heartbeat = self.segment_end_time
+
+        self.task_end_time = heartbeat
+        self.auto_end = True
+        self.status = TimerStatus.PAUSED
+        return True
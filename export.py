@@ -0,0 +1,72 @@
+# Streaming export of the app's store (storage.py) to an xlsx file, e.g., Time_Keeper.xlsx for Excel/Power BI
+# A normal openpyxl workbook holds every cell of every sheet in the memory till it is saved,
+# so the export uses the openpyxl write-only mode: each row is written to the sheet's XML as it comes in
+# (strings are written inline, there is no shared strings table), and the rows are read from the store one by one,
+# so the memory stays flat whatever the number of rows
+# Run on a background thread in the app, on_progress is called on that thread
+import os
+import time
+
+from metrics import metrics
+
+
+class ExportSheet:
+    def __init__(self, sheet_name, headers, rows, rows_count=None) -> None:
+        """
+        A sheet of the export
+        :param sheet_name: str e.g., 'Time'
+        :param headers: list of the column headers in the order of the columns, e.g., as _append_data_to_excel() wrote them
+        :param rows: callable that returns an iterable of the rows as dicts header -> cell value, called on the export,
+                     a header missing in a row is a blank cell
+        :param rows_count: int number of rows for the progress, None if not known
+        """
+        self.sheet_name = sheet_name
+        self.headers = list(headers)
+        self.rows = rows
+        self.rows_count = rows_count
+
+
+def export_workbook(export_file, sheets, on_progress=None, progress_every_seconds=0.5) -> int:
+    """
+    Writes the sheets to the export file, saved to a temporary file and replaced in one go,
+    so the old file is kept as it is if the export fails (e.g., the file is open in Excel)
+    Example usage:
+        export_workbook("Time_Keeper.xlsx", [ExportSheet("Tasks", ["Task", "Status", "Added_On"], lambda: tasks)],
+                        on_progress=lambda rows_done, rows_total: print(rows_done, rows_total))
+    :param sheets: list of ExportSheet, in the order of the sheets in the workbook
+    :param on_progress: callable(rows_done, rows_total) called every progress_every_seconds and once at the end,
+                        rows_total is None if the rows_count of a sheet is not known
+    :return: int number of rows exported
+    :raises OSError: if the export file could not be written or replaced
+    """
+    from openpyxl import Workbook
+
+    rows_total = sum(sheet.rows_count for sheet in sheets) if all(
+        sheet.rows_count is not None for sheet in sheets) else None
+    rows_done = 0
+    last_progress = time.monotonic()
+    temp_file = export_file + ".tmp"
+
+    with metrics.timer("export"):
+        wb = Workbook(write_only=True)
+        for sheet in sheets:
+            worksheet = wb.create_sheet(sheet.sheet_name)
+            worksheet.append(sheet.headers)
+            for row in sheet.rows():
+                worksheet.append([row.get(header) for header in sheet.headers])
+                rows_done += 1
+                if on_progress is not None and time.monotonic() - last_progress >= progress_every_seconds:
+                    last_progress = time.monotonic()
+                    on_progress(rows_done, rows_total)
+        try:
+            # a write-only workbook can only be saved once, the sheets are closed by the save
+            wb.save(temp_file)
+            os.replace(temp_file, export_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    metrics.count("export.rows", rows_done)
+    if on_progress is not None:
+        on_progress(rows_done, rows_done)
+    return rows_done
@@ -0,0 +1,278 @@
+# Only one app per Excel file
+# Two apps on the same Excel file would each load and save it and silently overwrite each other's rows,
+# so the first app holds an OS lock on Time_Keeper.lock (released by the OS even if the app crashes) and listens on
+# a local channel (multiprocessing.connection: a Unix socket, or a named pipe on Windows)
+# A second launch finds the lock taken, hands its command (show the window, start/pause/end) over to the running app
+# and exits, before it has loaded the heavy modules or read the Excel file
+# cli.py also asks the running app its queries (today, report) through the channel, and prints the app's answer
+# Run: python main.py                     -> starts the app, or shows the running app
+#      python main.py --start "Study Python"
+#      python main.py --pause
+#      python main.py --end
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# Excel file of the app (TaskTimer) and of cli.py, defined here as the lock is taken on it before the app is loaded
+EXCEL_FILE = "Time_Keeper.xlsx"
+# commands answered by the running app with a text (query()), the others are acknowledged and run later (forward())
+QUERY_ACTIONS = ("today", "report")
+# channel of the platform, a named pipe on Windows and a Unix socket elsewhere
+_FAMILY = "AF_PIPE" if sys.platform == "win32" else "AF_UNIX"
+
+
+def parse_command(argv):
+    """
+    The command of a launch, the other arguments (e.g., --startup-profile) are left for the app
+    :return: dict {"action": "show"|"start"|"pause"|"end", "task": str or None}
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    actions = parser.add_mutually_exclusive_group()
+    actions.add_argument("--start", nargs="?", const="", metavar="TASK")
+    actions.add_argument("--pause", action="store_true")
+    actions.add_argument("--end", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+
+    if args.start is not None:
+        return {"action": "start", "task": args.start.strip() or None}
+    if args.pause:
+        return {"action": "pause", "task": None}
+    if args.end:
+        return {"action": "end", "task": None}
+    return {"action": "show", "task": None}
+
+
+def _try_lock(file) -> bool:
+    """
+    Takes the OS lock on the file without waiting
+    :return: False if another process holds it
+    """
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class SingleInstance:
+    def __init__(self, excel_file, forward_timeout=5.0) -> None:
+        """
+        :param excel_file: str the Excel file of the app, one app per Excel file
+        :param forward_timeout: seconds forward() keeps trying, e.g., while the first app is still starting up
+        """
+        base_name = os.path.splitext(excel_file)[0]
+        # locked by the running app, the OS releases the lock when the app exits or crashes, so it's never stale
+        self.lock_file = base_name + ".lock"
+        # address and key of the running app's channel, a separate file as the locked file can't be read on Windows
+        self.address_file = base_name + ".instance"
+        self.forward_timeout = forward_timeout
+        self.file = None
+        self.listener = None
+        # called with each command received, on the listener thread
+        self.handler = None
+        # called with each query received, on the listener thread, returns the text sent back
+        self.query_handler = None
+        # commands received before the app set its handler, e.g., a second launch while the app is starting up
+        self.pending_commands = []
+        self.lock = threading.Lock()
+
+
+    def acquire(self, listen=True) -> bool:
+        """
+        Takes the lock and starts listening for the commands of the later launches
+        :param listen: False to only hold the lock, e.g., cli.py for the time of a command
+        :return: False if another app holds the lock, True otherwise
+        """
+        from multiprocessing.connection import Listener
+
+        try:
+            self.file = open(self.lock_file, "a+b")
+        except OSError as e:
+            # the app works without the lock, only the check for a second app is lost
+            print(f"Error opening the instance lock file: {e}")
+            return True
+        if not _try_lock(self.file):
+            self.file.close()
+            self.file = None
+            return False
+        if not listen:
+            return True
+
+        try:
+            # a new random address (and key) on each start, so a stale address file never reaches another app
+            authkey = os.urandom(32)
+            self.listener = Listener(family=_FAMILY, authkey=authkey)
+            temp_file = self.address_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"address": self.listener.address, "authkey": authkey.hex(), "pid": os.getpid()}, f)
+            os.replace(temp_file, self.address_file)
+        except OSError as e:
+            # the lock is still held, a second launch can't reach this app but it won't run on the same file either
+            print(f"Error starting the instance channel: {e}")
+            return True
+
+        threading.Thread(target=self._listen, name="instance_listener", daemon=True).start()
+        return True
+
+
+    def _listen(self) -> None:
+        """
+        Serves the later launches one at a time, each sends a command and waits for the reply
+        """
+        from multiprocessing import AuthenticationError
+
+        while True:
+            try:
+                connection = self.listener.accept()
+            except AuthenticationError:
+                # not a launch of this app (wrong key)
+                continue
+            except OSError:
+                # closed on release()
+                return
+            try:
+                with connection:
+                    # json and not pickle, so a message can't run code in the app
+                    command = json.loads(connection.recv_bytes(4096).decode("utf-8"))
+                    if command.get("action") in QUERY_ACTIONS:
+                        # answered right away, the launch is waiting for the text
+                        connection.send_bytes(json.dumps(self._answer(command)).encode("utf-8"))
+                        continue
+                    connection.send_bytes(b"ok")
+            except (OSError, EOFError, ValueError, AttributeError) as e:
+                print(f"Error receiving a command from another launch: {e}")
+                continue
+            self._dispatch(command)
+
+
+    def _answer(self, command) -> dict:
+        """
+        :return: dict {"text": str} the answer of the query, or {"error": str}
+        """
+        with self.lock:
+            query_handler = self.query_handler
+        if query_handler is None:
+            return {"error": "Time Keeper is starting up, try again"}
+        try:
+            return {"text": query_handler(command)}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+
+    def _dispatch(self, command) -> None:
+        with self.lock:
+            if self.handler is None:
+                self.pending_commands.append(command)
+                return
+            handler = self.handler
+        handler(command)
+
+
+    def set_handler(self, handler) -> None:
+        """
+        :param handler: callable(command) called on the listener thread, the commands received so far are passed right away
+        """
+        with self.lock:
+            self.handler = handler
+            pending_commands, self.pending_commands = self.pending_commands, []
+        for command in pending_commands:
+            handler(command)
+
+
+    def set_query_handler(self, query_handler) -> None:
+        """
+        :param query_handler: callable(command) -> str called on the listener thread, see QUERY_ACTIONS
+        """
+        with self.lock:
+            self.query_handler = query_handler
+
+
+    def _send(self, command, max_reply_bytes=64):
+        """
+        Sends the command to the running app, retried till forward_timeout as the running app may be starting up
+        :return: bytes reply of the running app, None if it could not be reached
+        """
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Client
+
+        deadline = time.monotonic() + self.forward_timeout
+        while True:
+            try:
+                with open(self.address_file, encoding="utf-8") as f:
+                    channel = json.load(f)
+                with Client(channel["address"], family=_FAMILY, authkey=bytes.fromhex(channel["authkey"])) as connection:
+                    connection.send_bytes(json.dumps(command).encode("utf-8"))
+                    return connection.recv_bytes(max_reply_bytes)
+            except (OSError, EOFError, ValueError, KeyError, AuthenticationError) as e:
+                # no address yet, or the address of an app that has exited/crashed
+                if time.monotonic() > deadline:
+                    print(f"Time Keeper is already running but did not respond: {e}")
+                    return None
+                time.sleep(0.05)
+
+
+    def forward(self, command) -> bool:
+        """
+        Sends the command to the running app, see _send()
+        :param command: dict, see parse_command()
+        :return: True if the running app got the command
+        """
+        reply = self._send(command)
+        if reply is None:
+            return False
+        if reply != b"ok":
+            # not this app's reply, e.g., another program on a reused address, sending again would get the same
+            print(f"Time Keeper is already running but did not accept the command: {reply[:20]!r}")
+            return False
+        return True
+
+
+    def query(self, command):
+        """
+        Asks the running app a query, e.g., cli.py today while the app is running
+        :param command: dict {"action": one of QUERY_ACTIONS, ...}
+        :return: str answer of the running app, None if it could not answer
+        """
+        reply = self._send(command, max_reply_bytes=1024 * 1024)
+        if reply is None:
+            return None
+        try:
+            answer = json.loads(reply.decode("utf-8"))
+            if not isinstance(answer, dict):
+                raise ValueError("not an answer")
+        except ValueError:
+            print(f"Time Keeper is already running but did not answer the query: {reply[:20]!r}")
+            return None
+        if "error" in answer:
+            print(f"Time Keeper could not answer the query: {answer['error']}")
+            return None
+        return answer.get("text")
+
+
+    def release(self) -> None:
+        """
+        Stops listening and releases the lock, on quit
+        """
+        if self.listener is not None:
+            try:
+                self.listener.close()
+            except OSError:
+                pass
+            self.listener = None
+            try:
+                os.remove(self.address_file)
+            except OSError:
+                pass
+        if self.file is not None:
+            # closing the file releases the lock
+            self.file.close()
+            self.file = None
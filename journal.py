@@ -0,0 +1,210 @@
+# Append-only journal for the rows to be logged to the Excel file
+# Saving the Excel file means loading and rewriting the whole workbook, which gets slower as the history grows
+# So, rows are first appended to a small local journal file (one line per row) and
+# are written (compacted) to the Excel file later in one go, on idle or on demand
+import contextlib
+import datetime as dt
+import json
+import os
+import threading
+import uuid
+
+from metrics import metrics
+
+
+def _encode_value(value):
+    """
+    json.dumps() hook for the values json can't handle
+    dates are stored with a marker key so that they are written back to Excel as dates and not as text
+    """
+    if isinstance(value, dt.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, dt.date):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+
+def _decode_value(obj):
+    """
+    json.loads() hook to restore the dates encoded by _encode_value()
+    """
+    if "$datetime" in obj:
+        return dt.datetime.fromisoformat(obj["$datetime"])
+    if "$date" in obj:
+        return dt.date.fromisoformat(obj["$date"])
+    return obj
+
+
+class Journal:
+    def __init__(self, journal_file) -> None:
+        # rows that are yet to be written to the Excel file
+        self.journal_file = journal_file
+        # on compaction, the journal file is renamed to this file so that new rows can be appended
+        # to a fresh journal file while the Excel file is being saved
+        self.compacting_file = journal_file + ".compacting"
+        # guards the journal file between appends and the rename on compaction, held by the readers
+        # to see a row either in the journal or in the Excel file (and its caches), never in both or none
+        self.lock = threading.RLock()
+        # only one save of the Excel file at a time (compaction, update of cells, archival), also held by the readers
+        # that have to parse the Excel file, so that they don't read a file being saved
+        self.compact_lock = threading.RLock()
+        # number of saves of the Excel file in progress, see saving()
+        self.saves_in_progress = 0
+
+        # if the app crashed in the middle of an append, end the incomplete line
+        # so that the next row is not appended to it and lost along with it
+        if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0:
+            with open(self.journal_file, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+
+    def append(self, sheet_name, row: dict) -> bool:
+        """
+        Appends a row to the journal and flushes it to the disk
+        This is O(1) irrespective of how big the Excel file is
+        :param sheet_name: str sheet the row belongs to
+        :param row: dict column header -> cell value
+        :return: True if the row is safely on the disk, False otherwise
+        """
+        return self.append_rows([(sheet_name, row)])
+
+
+    def append_rows(self, rows) -> bool:
+        """
+        Appends the rows to the journal as one batch, all or nothing
+        The rows of a batch are written as a single line, and a partly written line is skipped on read,
+        so a crash in the middle of the write never leaves only some of the rows in the journal
+        e.g., the previous day and the new day rows of a multi-day task
+        :param rows: list of (sheet_name, row_dict) in the order they have to be written
+        :return: True if all the rows are safely on the disk, False otherwise
+        """
+        if len(rows) == 1:
+            # same record as a single row, so that the journal stays readable by the older versions
+            sheet_name, row = rows[0]
+            record = {"sheet": sheet_name, "row": row}
+        else:
+            record = {"rows": [{"sheet": sheet_name, "row": row} for sheet_name, row in rows]}
+        line = json.dumps(record, default=_encode_value) + "\n"
+        try:
+            with self.lock, metrics.timer("journal.append"):
+                with open(self.journal_file, "a", encoding="utf-8") as f:
+                    f.write(line)
+                    f.flush()
+                    # make sure the rows survive a crash or power loss
+                    os.fsync(f.fileno())
+            return True
+        except OSError as e:
+            print(f"Error on appending data to the journal: {e}")
+            return False
+
+
+    def _read_records(self, file_path):
+        """
+        Reads the rows from a journal file
+        A partly written last line (e.g., crash in the middle of an append) is skipped, with all the rows of its batch
+        :return: (list of (sheet_name, row_dict) tuples, str id of the compaction batch or None), see compact()
+        """
+        rows = []
+        batch = None
+        if not os.path.exists(file_path):
+            return rows, batch
+
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line, object_hook=_decode_value)
+                    if "batch" in record:
+                        # the last one counts, an earlier one was added before a crash that stopped the compaction
+                        batch = record["batch"]
+                        continue
+                    # a batch (append_rows()) or a single row
+                    rows += [(row_record["sheet"], row_record["row"]) for row_record in record.get("rows", [record])]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    print(f"Skipping an incomplete record in {file_path}")
+        return rows, batch
+
+
+    def _read_rows(self, file_path):
+        return self._read_records(file_path)[0]
+
+
+    def pending_rows(self, sheet_name=None):
+        """
+        Rows not yet written to the Excel file, oldest first
+        :param sheet_name: str if given, only the rows of that sheet are returned (as dicts)
+        :return: list of (sheet_name, row_dict) or list of row_dict if sheet_name is given
+        """
+        with self.lock:
+            rows = self._read_rows(self.compacting_file) + self._read_rows(self.journal_file)
+
+        if sheet_name is None:
+            return rows
+        return [row for sheet, row in rows if sheet == sheet_name]
+
+
+    def has_pending(self) -> bool:
+        for file_path in (self.compacting_file, self.journal_file):
+            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+                return True
+        return False
+
+
+    @property
+    def is_saving(self) -> bool:
+        return self.saves_in_progress > 0
+
+
+    @contextlib.contextmanager
+    def saving(self):
+        """
+        Wraps a save of the Excel file, one at a time (compact_lock)
+        The readers don't wait for the save, while is_saving they use what they cached from the file before the save
+        along with the rows still in the journal, so the saver must update those caches under the journal's lock
+        """
+        with self.compact_lock:
+            with self.lock:
+                self.saves_in_progress += 1
+            try:
+                yield
+            finally:
+                with self.lock:
+                    self.saves_in_progress -= 1
+
+
+    def compact(self, write_rows) -> bool:
+        """
+        Writes the pending rows to the Excel file and clears them from the journal
+        If writing fails (e.g., the Excel file is open and locked), the rows stay in the journal for the next attempt
+        The rows are written as a batch with an id, saved to the Excel file along with the rows, so that a crash after
+        the save but before the journal is cleared does not write the rows again on the next attempt
+        :param write_rows: callable(rows, batch) that writes a list of (sheet_name, row_dict) with the str batch id
+                           (None for a journal of an older version), returns a callable() that updates the caches
+                           to the saved file, run along with the removal of the rows from the journal, or None on failure
+        :return: True if the journal is empty after the compaction
+        """
+        with self.compact_lock, metrics.timer("journal.compact"):
+            # at most 2 rounds: leftover .compacting file from an earlier failed attempt, then the journal
+            while True:
+                with self.lock:
+                    if not os.path.exists(self.compacting_file):
+                        if not os.path.exists(self.journal_file) or os.path.getsize(self.journal_file) == 0:
+                            return True
+                        # the id of the batch goes with its rows, on the disk before any of them is saved to Excel
+                        with open(self.journal_file, "a", encoding="utf-8") as f:
+                            f.write(json.dumps({"batch": uuid.uuid4().hex}) + "\n")
+                            f.flush()
+                            os.fsync(f.fileno())
+                        # move the journal aside, new appends go to a new journal file
+                        os.replace(self.journal_file, self.compacting_file)
+
+                rows, batch = self._read_records(self.compacting_file)
+                with self.saving():
+                    commit = write_rows(rows, batch) if rows else (lambda: None)
+                    if commit is None:
+                        return False
+                    # the rows move from the journal to the Excel file in one step for the readers
+                    with self.lock:
+                        commit()
+                        os.remove(self.compacting_file)
@@ -4,36 +4,70 @@
 # has buttons -> start, pause, end, reset
 # stores the start time, end time in Excel on click of end button
 # resets timer on reset button click
+# for handling file paths and the --startup-profile flag
+import sys
+# to measure the startup time of the app phase by phase
+from startup_profile import StartupProfile
+# --startup-profile prints the time taken by each startup phase once the first frame is rendered
+startup_profile = StartupProfile(enabled="--startup-profile" in sys.argv)
+
+if __name__ == "__main__":
+    # only one app per Excel file (the same file as TaskTimer.excel_file), checked before the heavy imports below
+    # so that a second launch hands its command (--start [task], --pause, --end, or show the window)
+    # over to the running app and exits right away
+    from instance import EXCEL_FILE, SingleInstance, parse_command
+    instance_command = parse_command(sys.argv[1:])
+    single_instance = SingleInstance(EXCEL_FILE)
+    if not single_instance.acquire():
+        if single_instance.forward(instance_command):
+            sys.exit(0)
+        # cli.py holds the lock only for the time of a command and does not listen, so the lock may be free by now
+        if not single_instance.acquire():
+            sys.exit(1)
+    startup_profile.mark("single instance check")
+
+# Heavy modules are not imported here but only where they are needed so that the app shows up faster
+# openpyxl -> workbook.py, PIL -> _get_icon(), pystray -> _initialize_systray_icon() (sys tray thread),
+# ctypes.windll -> _get_dpi_scaling()
 import time
 import customtkinter as ctk
+startup_profile.mark("import customtkinter")
 import os
-import pandas as pd
-from PIL.ImageFile import ImageFile
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils.exceptions import InvalidFileException
 import datetime as dt
-from enum import Enum
-# for handling icons
-# ImageTk for toolbar icon in about and manage task status windows
-from PIL import Image, ImageDraw, ImageTk
-# for handling file paths
-import sys
 # to create a separate thread for sys tray icon
 import threading
-# to create a sys tray icon and to create menu items for sys tray icon right click
-import pystray
-# to get dpi scaling
-from ctypes import windll
+# to hand over the results from the background threads to the Tk thread
+import queue
+# where the tasks and the time logs live, the Excel file (journal + background writer + caches) or an SQLite database
+from storage import open_storage
+# crash-safe checkpoint of the running/paused task
+from checkpoint import Checkpoint
+# perpetual tick, slower while the app is hidden in the system tray, and the timer for the next midnight
+from ticks import MidnightScheduler, TickScheduler
+# task names index for the duplicate check and the search as you type in the task_list_menu combobox
+from task_index import TaskIndex
+# virtualized list of the tasks for the Manage Tasks window
+from task_list_view import TaskListView
+# state of the task being timed, runs on the clock so that it can also be run headless (simulate.py)
+from engine import TimerEngine, TimerStatus, humanize_time
+# counters and timers of the hot paths, shown in the debug panel (Ctrl+Shift+D) and flushed to a file
+from metrics import metrics
+# records the stalls of the Tk thread, which are not taken as a system sleep
+from watchdog import Watchdog
+# reloads the task list when the Tasks sheet is edited in Excel while the app is open
+from watcher import FileWatcher, diff_records
+# the Excel file the single instance lock is taken on, so that the lock and the file are the same
+from instance import EXCEL_FILE
+startup_profile.mark("import app modules")
 
 
-class TimerStatus(Enum):
-    # to track the timer status for the buttons to work correctly
-    RUNNING = 1
-    PAUSED = 2
-    STOPPED = 3
-
 class TaskTimer:
-    def __init__(self) -> None:
+    def __init__(self, single_instance=None, instance_command=None) -> None:
+        """
+        :param single_instance: SingleInstance holding the lock of the Excel file, the commands of the later launches
+                                come in through it, None if not checked (e.g., imported)
+        :param instance_command: dict the command of this launch, see instance.parse_command()
+        """
         # set the window theme to 'dark' mode
         ctk.set_appearance_mode("dark")
         # initialize the main window
@@ -45,10 +79,11 @@ class TaskTimer:
         # to disable the toolbar and make it as a widget,
         # makes a window borderless and removes from taskbar
         self.app.overrideredirect(True)
+        startup_profile.mark("create window")
 
         # -----------assets-----------
         # Excel file to store the task list, time
-        self.excel_file = "Time_Keeper.xlsx"
+        self.excel_file = EXCEL_FILE
         # icon for the system tray
         self.app_icon = "app_icon.ico"
         # Sheet in the Excel file to store the task list
@@ -60,36 +95,73 @@ class TaskTimer:
         # excel icon for excel_btn
         self.excel_btn_icon = "excel_btn_icon.png"
         self.task_active_status_symbol = "Active"
+        # callbacks from the background threads to be run on the Tk thread (Tk is not thread safe)
+        # drained every second by _process_ui_queue()
+        self.ui_queue = queue.Queue()
+        # "excel" -> Time_Keeper.xlsx is the store, "sqlite" -> Time_Keeper.db is the store and the Excel file is an export
+        # (created from the Excel file on the first run with --sqlite), None -> "sqlite" if Time_Keeper.db exists
+        self.storage_backend = "sqlite" if "--sqlite" in sys.argv else None
+        # with the Excel file as the store, the rows are written to the Excel file on a separate thread (started below)
+        # and the result is shown on the Tk thread, e.g., 'Close Excel' if the Excel file is locked
+        self.storage = open_storage(self.excel_file, self.storage_backend,
+                                    tasks_sheet=self.excel_tasks_sheet, time_sheet=self.excel_time_sheet,
+                                    on_write_result=lambda *result: self._run_on_ui_thread(
+                                        lambda: self._on_excel_write_result(*result)))
+        # running/paused task state, to recover the task if the app crashes
+        self.checkpoint = Checkpoint(os.path.splitext(self.excel_file)[0] + ".checkpoint")
+        # the checkpoint is also updated every few seconds from _update_timer_display() as a heartbeat
+        self.checkpoint_every_seconds = 10
+        self.last_checkpoint_mono = time.monotonic()
+        # metrics of this session are flushed to this file every metrics_flush_every_ms and on quit
+        # the last session's file is kept as .prev, as the session to look at is usually the one that froze/crashed
+        self.metrics_file = os.path.splitext(self.excel_file)[0] + ".metrics.json"
+        self.metrics_flush_every_ms = 60000
+        if os.path.exists(self.metrics_file):
+            try:
+                os.replace(self.metrics_file, os.path.splitext(self.excel_file)[0] + ".metrics.prev.json")
+            except OSError as e:
+                print(f"Error on keeping the last session's metrics: {e}")
+        # hidden debug panel showing the metrics, opened with Ctrl+Shift+D
+        self.debug_panel = None
+        # brings the Excel file up to date before it is opened, see _open_excel_file()
+        self.export_thread = None
+        self.storage.start()
+        # to show the 'Saved' status only when a save goes through after failed attempts
+        self.excel_write_failed = False
 
 
         # To track the work duration for the current date
         # We use .replace as only this works in _get_days_work_minutes() method
         self.current_date = dt.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         self.days_work_minutes = self._get_days_work_minutes()
+        startup_profile.mark("day's work minutes")
 
         # get the task list from the Excel if it exists, to populate task_list_menu combobox dropdown
         self.all_tasks_dict_list = None
+        # rebuilt by _get_task_list()
+        self.task_index = TaskIndex()
+        # the combobox dropdown shows only these many tasks matching the typed text, as a long dropdown is slow to build
+        self.task_menu_limit = 30
+        # values currently in the combobox dropdown, to not rebuild the dropdown if the matches did not change
+        self.task_menu_values = None
         # this is only active tasks list
         self.task_list = self._get_task_list()
-        # task selected from the task_list_menu combobox
-        self.current_task = ""
+        startup_profile.mark("task list")
+        # reloads the task list when the Excel file is saved outside the app (e.g., a task renamed in Excel),
+        # started once the UI is built, None with the SQLite database as the store (the Excel file is only an export)
+        watch_file = self.storage.watch_file()
+        self.file_watcher = FileWatcher(watch_file, self._on_watched_file_changed) if watch_file else None
+        # start, pause, end of the task, multi-day splits and sleep detection
+        # the rows of the task are logged with _log_rows_to_excel(), the rows of a multi-day split in one go
+        self.engine = TimerEngine(log_row=self._log_data_to_excel,
+                                  log_rows=self._log_rows_to_excel,
+                                  get_notes=self._get_notes,
+                                  on_day_logged=self._update_days_work_minutes_display)
+        # task selected from the task_list_menu combobox (self.current_task) and the timer status (self.is_timer_running)
+        # are kept in the engine, see the properties below
 
-        # track the timer status - running, paused, stopped
-        self.is_timer_running: TimerStatus = TimerStatus.STOPPED
         # to display timer text inside the timer_display Entry
         self.timer_text = ctk.StringVar()
-        # to track the number of seconds elapsed and to use to set the text for timer_display Entry via timer_text
-        # self.seconds_elapsed_ui = 0
-        self.task_start_time = None # to store the start time of the task
-        self.task_end_time = None # to store the end time of the task
-        self.segment_start_time = None # start of a segment, if paused
-        self.segment_end_time = None # end of a segment, if paused
-        self.work_seconds = 0
-        # ----to track multi day task tracking variables----
-        self.new_day_pause_start = None
-        self.new_day_pause_seconds = 0
-        self.work_seconds_logged = 0
-        self.multiday_start_date = None # to group multiday tasks
 
         # to manage placeholder text in the notes_entry field
         # when is_placeholder_active is True, show PH text in the notes_entry filed
@@ -108,7 +180,6 @@ class TaskTimer:
 
         # to store the after() ID and to handle .after() calls overlaps i.e., to be used in .after_cancel()
         self.status_update_queue = None
-        self.timer_running_queue = None
 
         # to handle drag and reposition of the app window
         self.start_mouse_x_root = None
@@ -123,8 +194,11 @@ class TaskTimer:
         # start the sys tray thread
         self.systray_thread.start()
 
+        startup_profile.mark("init state, start sys tray thread")
+
         # build the ui (widgets) of the app
         self._build_ui()
+        startup_profile.mark("build ui")
 
         # position app window in the bottom right corner of the screen
         self.position_window()
@@ -133,126 +207,297 @@ class TaskTimer:
         # self.app.attributes("-topmost", False)
         # retain the top position for 500 ms and release after that
         self.app.after(500, lambda: self.app.attributes('-topmost', False))
+        startup_profile.mark("position window")
 
-        # to track the system sleep/freeze/hang phases etc.
-        self.last_ui_update_mono = time.monotonic()
-        self.last_ui_update_time = dt.datetime.now()
         # perpetual loop to log last UI update time to detect system sleep/freeze/hang etc.
-        self._schedule_update_timer()
-        # to track if the end of the task is by user of by system so that the task_end_time and segment_end_time are set accordingly
-        self.auto_end = False
-
-        # start the loop to check if day has changed and update the day's duration display
-        self.check_day_change_queue = self.app.after(60000, self._check_for_day_change_periodically)
+        # ticks every second while the app is visible and slower while it is hidden in the system tray
+        self.tick_scheduler = TickScheduler(self.app, self._update_timer_display)
+        self.tick_scheduler.start()
+        # records how long the Tk thread was blocked (e.g., a slow Excel save) as latency, from a side thread,
+        # such a gap between the ticks does not end the task, only a system suspend does (engine.tick())
+        self.watchdog = Watchdog(self.engine.clock)
+        self.watchdog.start()
+
+        # restore the task that was running/paused when the app crashed, if any
+        self._recover_from_checkpoint()
+
+        # a single timer for the next local midnight, the day's duration display is reset and a running/paused task is
+        # split right at midnight, armed again on wall-clock jumps (DST, timezone change, resume) seen by the tick
+        self.midnight_scheduler = MidnightScheduler(self.app, self._on_new_day)
+        self.midnight_scheduler.start()
+
+        # flush the metrics to the metrics_file perpetually
+        self.metrics_flush_queue = self.app.after(self.metrics_flush_every_ms, self._flush_metrics_periodically)
+
+        # move the closed periods out of the Excel file, if any
+        self._archive_closed_periods_in_background()
+
+        if self.file_watcher is not None:
+            self.file_watcher.start()
+
+        # the commands of the later launches come in on the listener thread of instance.py and are run on the Tk thread
+        # via .after() (same as the sys tray thread) so that e.g., 'show' does not wait for the next tick
+        self.single_instance = single_instance
+        if self.single_instance is not None:
+            self.single_instance.set_handler(
+                lambda command: self.app.after(0, self._run_instance_command, command))
+            # cli.py today/report while the app is running
+            self.single_instance.set_query_handler(self._answer_instance_query)
+        # the command of this launch, e.g., main.py --start "Study Python"
+        if instance_command is not None and instance_command["action"] != "show":
+            self._run_instance_command(instance_command)
+
+        if startup_profile.enabled:
+            # runs once mainloop() has started and drawn the window
+            self.app.after_idle(self._report_startup_profile)
 
         self.app.mainloop()
 
 
+    @property
+    def current_task(self):
+        return self.engine.current_task
+
+
+    @current_task.setter
+    def current_task(self, task):
+        self.engine.current_task = task
+
+
+    @property
+    def is_timer_running(self) -> TimerStatus:
+        return self.engine.status
+
+
+    def _report_startup_profile(self):
+        """
+        Prints the startup profile once the first frame is rendered (--startup-profile)
+        """
+        # make sure the pending redraws are done so that the window is actually drawn
+        self.app.update_idletasks()
+        startup_profile.mark("first frame")
+        print(startup_profile.report())
+
+
+    def _flush_metrics_periodically(self):
+        """
+        Writes the metrics to the metrics_file every metrics_flush_every_ms, a small file replaced in one go
+        """
+        self._record_tick_wakeups()
+        metrics.flush(self.metrics_file)
+        self.metrics_flush_queue = self.app.after(self.metrics_flush_every_ms, self._flush_metrics_periodically)
+
+
+    def _record_tick_wakeups(self):
+        """
+        Average tick wakeups per second in each mode (visible/hidden), to verify the idle cost of the app
+        """
+        for mode, wakeups_per_second in self.tick_scheduler.wakeups_per_second().items():
+            metrics.gauge(f"tick.wakeups_per_sec.{mode}", wakeups_per_second)
+
+
+    def _show_debug_panel(self, event=None):
+        """
+        Hidden window showing the metrics (counters, timers, tick jitter), opened with Ctrl+Shift+D
+        Refreshed every second while it is open
+        """
+        if self.debug_panel is not None and self.debug_panel.winfo_exists():
+            self.debug_panel.lift()
+            return
+
+        self.debug_panel = ctk.CTkToplevel(self.app)
+        self.debug_panel.title("Time Keeper - Metrics")
+        metrics_textbox = ctk.CTkTextbox(self.debug_panel, width=560, height=420, font=("Consolas", 12), wrap="none")
+        metrics_textbox.grid(row=1, column=1, padx=10, pady=10)
+
+        def refresh():
+            if not self.debug_panel.winfo_exists():
+                return
+            metrics_textbox.configure(state="normal")
+            metrics_textbox.delete("1.0", "end")
+            metrics_textbox.insert("1.0", metrics.report())
+            metrics_textbox.configure(state="disabled")
+            self.debug_panel.after(1000, refresh)
+
+        refresh()
+
+
     def _get_days_work_minutes(self) -> int:
         """
-        Get the total of days work minutes from the Excel when the app is opened
-        If the Excel does not exist, reruns 0
+        Get the total of days work minutes from the storage when the app is opened or on a new day
+        With the Excel file as the store, this is from the day index, read from the Excel only if the Excel was changed
+        outside the app, and the rows logged to the journal but not yet written to the Excel are also counted
+        If there are no logs, returns 0
         :return:
         """
-        # 1. check if the Excel file exists
-        if os.path.exists(self.excel_file) and os.path.getsize(self.excel_file) > 0:
-            # check if the Time sheet exists and catch errors on read
+        # the time waiting for a save in progress (Excel file as the store) is also timed
+        with metrics.timer("days_work_minutes"):
             try:
-                # 2. read the Time sheet in the Excel file
-                time_df = pd.read_excel(self.excel_file, sheet_name=self.excel_time_sheet)
-
-                # check if DF is not empty (e.g., only headers)
-                if not time_df.empty:
-                    # get the line items of current date
-                    days_time_df = time_df[ time_df["Date"] == self.current_date ]
-                    days_work_minutes_list = days_time_df["Work_Minutes"].tolist()
-                    days_work_minutes = sum(days_work_minutes_list)
-                    return days_work_minutes
-            except pd.errors.ParserError as e:
-                print(f"Error reading the file to get the Time list: {e}")
+                return self.storage.day_work_minutes(self.current_date.date())
             except Exception as e:
-                # catch any other unexpected errors
-                print(f"An unexpected error occurred while getting the Time list: {e}")
+                print(f"An unexpected error occurred while getting the day's work minutes: {e}")
+                return 0
 
-        return 0
 
-
-    def _check_for_day_change_periodically(self):
+    def _on_new_day(self):
         """
-        Checks if a new day has started every 1 minute, and if a new day is detected,
+        Run by the midnight_scheduler at midnight (or right after a wall-clock jump to another day)
         resets the days work minutes to 0 (for UI display) and current date to new day's date
         triggers the previous day's data logging if the timer is not stopped i.e., paused or running
         """
-        # get the calendar date and compare it with the date currently we are displaying the day's duration for
+        # compare with the date currently we are displaying the day's duration for, e.g., a task ended right after
+        # midnight has already moved the display to the new day
         if self.current_date != dt.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
-            # a new day has started
-
             if self.is_timer_running != TimerStatus.STOPPED:
                 # if the timer is running or is paused,
                 # log the previous day's data to the Excel
-                self._check_day_split_and_log()
+                if self.engine.on_new_day():
+                    # the task now starts at midnight, checkpoint it so that a crash does not log the previous day again
+                    self._save_checkpoint()
 
             # update the UI to display the new day's work minutes, which would mostly be 0
-            # _check_day_split_and_log() method also triggers _update_days_work_minutes_display() method
+            # engine.check_day_split_and_log() method also triggers _update_days_work_minutes_display() method
             # but only for current/new day's log and not for the previous day's log
             # so we call _update_days_work_minutes_display() here irrespective of timer running status
             self._update_days_work_minutes_display()
 
-
+            # a new day may close a period (e.g., new year), move it out of the Excel file
+            self._archive_closed_periods_in_background()
 
             print(f"{self.current_date=}, {self.days_work_minutes=}")
 
-        # to ensure the check runs perpetually
-        self.check_day_change_queue = self.app.after(60000, self._check_for_day_change_periodically)
+
+    def _archive_closed_periods_in_background(self):
+        """
+        Moves the rows of the closed periods from the Time sheet to the archive workbooks (shards.py) on a background thread
+        Checked on the start and on a new day, the thread is started only if the Time sheet has rows before the cutoff
+        Nothing to do with the SQLite database as the store, its lookups are indexed
+        """
+        try:
+            has_periods_to_archive = self.storage.has_periods_to_archive()
+        except Exception as e:
+            print(f"An unexpected error occurred while checking for periods to archive: {e}")
+            return
+        if has_periods_to_archive:
+            threading.Thread(target=self._archive_closed_periods, name="archiver", daemon=True).start()
+
+
+    def _archive_closed_periods(self):
+        """
+        Runs on the archiver thread, the status is shown on the Tk thread
+        """
+        try:
+            archived = self.storage.archive_old_periods()
+        except Exception as e:
+            # e.g., the Excel file is open in Excel, the rows archived so far are recorded and skipped on the next attempt
+            print(f"An unexpected error occurred while archiving the closed periods: {e}")
+            return
+        if archived:
+            self._run_on_ui_thread(lambda: self._update_status_label("Archived", 0))
 
 
     def _get_task_list(self):
         """
-        Read tasks from the Excel file if it exists and is not empty
+        Read tasks from the storage (the Excel file if it exists and is not empty, or the SQLite database)
         Only includes tasks where Status='Active'
         :returns list: A list of tasks always starting with "<Add new task...>".
         Returns just ["<Add new task...>"] if the Excel file doesn't exist, is empty, or has invalid data.
         """
 
-        tasks_list = []
+        # to check if a task exists on new task addition
+        self.all_tasks_dict_list = []
 
-        # 1. check if the file exists and is not empty
-        if os.path.exists(self.excel_file) and os.path.getsize(self.excel_file) > 0:
-            # to catch errors in reading the file
+        with metrics.timer("task_list"):
+            # to catch errors in reading the store
             try:
-                # 2. read the Excel sheet into a DF
-                tasks_df = pd.read_excel(self.excel_file, sheet_name=self.excel_tasks_sheet)
-                # print(f"tasks df:\n{tasks_df}")
-                # to check if a task exists on new task addition
-                self.all_tasks_dict_list = tasks_df.to_dict(orient="records")
-
-                # 3. check if DF is not empty (e.g., only headers)
-                if not tasks_df.empty:
-                    # 4. drop blanks in 'Tasks' column and filter out tasks with status != 'active'
-                    active_tasks = tasks_df[
-                        tasks_df[self.tasks_col_name].notna() &
-                        (tasks_df["Status"].str.lower() == self.task_active_status_symbol.lower())
-                    ]
-
-                    # 5. convert the tasks to a list
-                    tasks_list = active_tasks[self.tasks_col_name].to_list()
-                    tasks_list.sort()
-
-                else:
-                    print(f"{self.excel_file} exists but contains no data.")
-            except pd.errors.ParserError as e:
-                print(f"Error reading the file to get the task list: {e}")
+                # 1. read the rows of the Tasks sheet as dicts, new dicts as the task status is changed in _manage_task_status()
+                # with the Excel file as the store, this includes the tasks still in the journal
+                self.all_tasks_dict_list = self.storage.task_records()
             except Exception as e:
-                # catch any other unexpected errors
+                # catch any unexpected errors
                 print(f"An unexpected error occurred while getting the task list: {e}")
-        else:
-            print(f"{self.excel_file} doesn't exist or is empty.")
 
+        # 2. drop blanks in 'Tasks' column
+        self.all_tasks_dict_list = [task_item for task_item in self.all_tasks_dict_list
+                                    if task_item.get(self.tasks_col_name) is not None]
+        return self._active_task_list()
+
+
+    def _on_watched_file_changed(self):
+        """
+        Runs on the file_watcher thread when the Excel file was saved (by the app or outside it)
+        The Tasks sheet is parsed here so that the Tk thread only gets the tasks from the parsed snapshot
+        """
+        try:
+            self.storage.task_records(strict=True)
+        except Exception as e:
+            # e.g., the file is still being saved, it is reloaded on its next change
+            print(f"An unexpected error occurred while reading the changed task list: {e}")
+            return
+        self._run_on_ui_thread(self._reload_task_list)
+
+
+    def _reload_task_list(self):
+        """
+        Applies the changes of the Tasks sheet made outside the app to the task list, on the Tk thread
+        Nothing is redrawn if the tasks did not change (e.g., the save was the app's own)
+        """
+        try:
+            with metrics.timer("task_reload"):
+                task_records = [task_item for task_item in self.storage.task_records(strict=True)
+                                if task_item.get(self.tasks_col_name) is not None]
+        except Exception as e:
+            print(f"An unexpected error occurred while reloading the task list: {e}")
+            return
+
+        added, removed, changed = diff_records(self.all_tasks_dict_list, task_records, self.tasks_col_name)
+        if not (added or removed or changed):
+            return
+        metrics.count("task_reload.changes", len(added) + len(removed) + len(changed))
+
+        self.all_tasks_dict_list = task_records
+        self.task_list = self._active_task_list()
+        self._filter_task_list_menu()
+        # a task renamed/deleted in Excel is deselected, unless it is being timed (it is logged under its old name)
+        if self.is_timer_running == TimerStatus.STOPPED and self.current_task in removed:
+            self.task_list_menu.set("")
+            self.current_task = ""
+        self._update_status_label("Reloaded", 0)
+
+
+    def _active_task_list(self):
+        """
+        Active tasks from all_tasks_dict_list (in the memory), without reading the Excel file
+        :returns list: sorted active tasks, starting with "<Add new task...>"
+        """
+        # filter out tasks with status != 'active'
+        tasks_list = [task_item[self.tasks_col_name] for task_item in self.all_tasks_dict_list
+                      if str(task_item.get("Status") or "").lower() == self.task_active_status_symbol.lower()]
+
+        tasks_list.sort()
         # print(f"{tasks_list=}")
+        self.task_index.rebuild(all_tasks=[task_item[self.tasks_col_name] for task_item in self.all_tasks_dict_list],
+                                active_tasks=tasks_list)
         return ["<Add new task...>"] + tasks_list
 
 
+    def _filter_task_list_menu(self, event=None):
+        """
+        Shows only the tasks matching the text typed in the task_list_menu combobox in its dropdown (up to task_menu_limit)
+        Runs on every key release in the combobox, or without an event to show the first tasks (e.g., after a selection)
+        """
+        if event is not None and event.keysym in ("Return", "Escape", "Tab", "Up", "Down", "Left", "Right"):
+            return
+        typed_text = self.task_list_menu.get() if event is not None else ""
+        values = ["<Add new task...>"] + self.task_index.search(typed_text, limit=self.task_menu_limit)
+        if values != self.task_menu_values:
+            self.task_menu_values = values
+            self.task_list_menu.configure(values=values)
+
+
     def _list_menu_callback(self, choice):
+        # the dropdown was filtered by the typed text, show the first tasks again for the next time
+        self._filter_task_list_menu()
         # instead of removing the existing task manually, if any,
         # user can select the "<Add new task...>" item to clear the field and set the focus to type the new task
         # space before < to ensure this stays at the top after sorting the list
@@ -304,8 +549,8 @@ class TaskTimer:
 
     def _append_data_to_excel(self, sheet_name, **kwargs) -> bool:
         """
-        Appends new row of data to the specified sheet in the Excel file
-        Creates the Excel file/new sheet if they don't exist
+        Appends new row of data to the specified sheet in the storage, see _append_rows_to_excel()
+        Creates the Excel file/new sheet (or the table) if they don't exist
         Data is passed as keyword arguments and keywords become headers
         Example usage:
             _append_data_to_excel("Tasks", Task="Study Python", Status="Active", Added_On="2025-04-05 10:00")
@@ -314,48 +559,106 @@ class TaskTimer:
         :param kwargs: Each key becomes a column header, value becomes cell data
         :returns bool: True if successful, False otherwise
         """
-        # using openpyxl for appending data as calculating last row (with openpyxl) is required for pandas
-        try:
-            # 1. check if the file exists or to be created
-            if os.path.exists(self.excel_file):
-                try:
-                    # Attempt to load the workbook. This will fail for zero-byte or corrupted files
-                    wb = load_workbook(self.excel_file)
-                except (InvalidFileException, Exception) as e:
-                    print(f"Error with existing file: {e}. Creating new file.")
-                    wb = Workbook()
-                    # remove default sheets created e.g., 'Sheet1'
-                    if len(wb.sheetnames) > 0:
-                        for s in wb.sheetnames:
-                            wb.remove(wb[s])
-            else:
-                # file does not exist, so creating a new file
-                wb = Workbook()
-                # remove default sheets created e.g., 'Sheet1'
-                if len(wb.sheetnames) > 0:
-                    for s in wb.sheetnames:
-                        wb.remove(wb[s])
-
-            # 2. check if the sheet exists or to be created
-            if sheet_name not in wb.sheetnames:
-                sheet = wb.create_sheet(sheet_name)
-                # set the headings for the sheet
-                sheet.append(list(kwargs.keys()))
-            else:
-                # sheet exists in the Excel file
-                sheet = wb[sheet_name]
+        return self._append_rows_to_excel([(sheet_name, kwargs)])
 
-            # 3. append the new data
-            sheet.append( list(kwargs.values()) )
 
-            # 4. save and close the Excel file
-            wb.save(self.excel_file)
-            wb.close()
-            return True
-        except Exception as e:
-            # This outer catch is for errors during sheet creation, appending, or saving
-            print(f"Error on appending data to excel: {e}")
-            return False
+    def _append_rows_to_excel(self, rows) -> bool:
+        """
+        Appends the rows to one or more sheets in the storage, all or nothing
+        With the Excel file as the store, the rows are appended to the journal as one batch (a single line)
+        and are written to the Excel file with a single load and save by the excel_writer thread
+        With the SQLite database as the store, the rows are inserted in one transaction
+        Example usage:
+            _append_rows_to_excel([("Time", previous_day_row), ("Time", new_day_row)])
+        :param rows: list of (sheet_name, row_dict) in the order they have to be written
+        :returns bool: True if successful, False otherwise
+        """
+        return self.storage.append_rows(rows)
+
+
+    def _on_excel_write_result(self, is_saved, rows_count, retry_in):
+        """
+        Shows the result of the background Excel write, runs on the Tk thread
+        The rows are safe in the journal either way, so a failed write only needs a heads-up
+        :param is_saved: bool
+        :param rows_count: number of rows logged since the last save
+        :param retry_in: seconds till the next attempt if the save failed
+        """
+        if is_saved:
+            if self.excel_write_failed:
+                # the Excel file was closed and the pending rows got saved
+                self._update_status_label("Saved", 0)
+            self.excel_write_failed = False
+        else:
+            # e.g., the Excel file is open in Excel, show this only once and not on every retry
+            if not self.excel_write_failed:
+                self._update_status_label("Close Excel", 1)
+            self.excel_write_failed = True
+            print(f"Could not save {rows_count} row(s) to {self.excel_file}, retrying in {retry_in}s")
+
+
+    def _run_on_ui_thread(self, callback):
+        """
+        Queues a callback from a background thread to be run on the Tk thread by _process_ui_queue()
+        """
+        self.ui_queue.put(callback)
+
+
+    def _process_ui_queue(self):
+        """
+        Runs the callbacks queued by the background threads, called from the Tk thread every second
+        """
+        while True:
+            try:
+                callback = self.ui_queue.get_nowait()
+            except queue.Empty:
+                return
+            callback()
+
+
+    def _save_checkpoint(self, flush=True):
+        """
+        Saves the state of the running/paused task to the checkpoint, or marks that there is no task if the timer is stopped
+        Called on start, pause, resume, end, reset and every checkpoint_every_seconds as a heartbeat
+        :param flush: bool False for the heartbeat, see Checkpoint.save()
+        """
+        self.last_checkpoint_mono = time.monotonic()
+        state = self.engine.to_state()
+        state["notes"] = self._get_notes()
+        self.checkpoint.save(state, flush=flush)
+
+
+    def _recover_from_checkpoint(self):
+        """
+        Restores the task that was running/paused when the app crashed (or was killed) as a paused task
+        The user can then resume it, end it to log it (ends at the last heartbeat), or reset it to discard it
+        A task started with cli.py while the app was closed (detached) is taken over as it is, a running task keeps running
+        """
+        state = self.checkpoint.load()
+        is_detached = state is not None and state["detached"]
+        if is_detached:
+            if not self.engine.restore(state):
+                return
+        elif not self.engine.recover(state):
+            return
+        # the midnights since the crash were missed, log the days in between, one row per day
+        if self.engine.on_new_day() is False:
+            print("Could not log the previous days of the recovered task, logged on the next new day or on end")
+
+        # restore the UI as in a paused task
+        self.task_list_menu.set(self.current_task)
+        self.task_list_menu.configure(state="disabled")
+        if state["notes"]:
+            self.notes_textbox.delete("1.0", "end")
+            self.notes_textbox.insert("1.0", state["notes"])
+            self.notes_textbox.configure(text_color="#d2d9e0")
+            self.is_placeholder_active = False
+        self._render_timer_text()
+        self.start_btn.configure(text="⏸" if self.is_timer_running == TimerStatus.RUNNING else "▶")
+        self.manage_tasks_btn.configure(command=lambda: ..., text_color="#353535")
+        # saved as the app's task from now on, not detached
+        self._save_checkpoint()
+        self._update_status_label("Taken over" if is_detached else "Recovered", 0)
 
 
     def _show_placeholder(self):
@@ -403,13 +706,8 @@ class TaskTimer:
         if new_task:
             # to preserve formats like 'ITR' 'GPS'
             new_task = new_task[0].upper() + new_task[1:]
-            # check if there are any existing tasks and then check if the new task exists
-            if self.all_tasks_dict_list:
-                # For robust check on if the task exists,
-                does_task_exist = any(task_item[self.tasks_col_name].lower() == new_task.lower()
-                                  for task_item in self.all_tasks_dict_list)
-            else:
-                does_task_exist = False
+            # check if the new task exists (active or inactive), ignoring the case
+            does_task_exist = self.task_index.exists(new_task)
 
             if not does_task_exist:
                 # add/append the task to excel and if that is successful, proceed further
@@ -424,7 +722,7 @@ class TaskTimer:
                     # to ensure "<Add new task...>" is at the top of the list
                     self.task_list[1:] = sorted(self.task_list[1:])
                     # update the combobox with the new task_list
-                    self.task_list_menu.configure(values=self.task_list)
+                    self._filter_task_list_menu()
                     # set the value to new_task with spaces stripped and capitalized
                     self.task_list_menu.set(new_task)
                     # update the current task selection which will be used as validation for starting timer on click of start_btn in run_timer method
@@ -443,98 +741,54 @@ class TaskTimer:
 
     def _update_timer_display(self):
         """
-        updates the timer display every second if the timer is RUNNING
-        detects system sleep/freeze and if detected, will end the current timer and log the data to Excel by calling the end_timer() method
+        runs on every tick of the tick_scheduler, every second while the app window is visible and
+        every few seconds while it is hidden in the system tray
+        updates the timer display if the timer is RUNNING and the app window is visible
+        detects system sleep and if detected, will end the current timer and log the data to Excel by calling the end_timer() method
+        a late tick without a system suspend (busy Tk thread) keeps the timer running and is recorded by the watchdog
         """
-        # UI should update every 1000ms due to .after() calls
+        # UI should update every tick interval (1000ms when visible) due to .after() calls
         # 0.5 buffer to address scheduling delays
-        update_interval = 1.5
-
-        if self.is_timer_running == TimerStatus.RUNNING:
-            current_mono = time.monotonic()
-
-            time_since_last_ui_update = current_mono - self.last_ui_update_mono
-
-            if time_since_last_ui_update < update_interval:
-                # the system did not sleep, or there was no UI freeze
-                # use .seconds instead of .total_seconds() as the later keeps accumulating the fractional seconds that may lead to a jump between multiple pause and resume cycles (this happens if we include decimal points also that we get with .total_seconds(). but we exclude the decimal part with int() )
-                # .seconds only gives max 86400 i.e., seconds for the day, so use total_seconds() and int()
-                # Why we do not accumulate work_seconds here and use _seconds_aacumulator() for that?
-                #
-                seconds_elapsed_ui = self.work_seconds + (dt.datetime.now() -
-                                                          self.segment_start_time).total_seconds()
-                seconds_elapsed_ui = int(seconds_elapsed_ui)
-                # print(f"_update_timer_display() -> {self.work_seconds=} {seconds_elapsed_ui=}")
-                hours_elapsed, remainder = divmod(seconds_elapsed_ui, 3600)
-                # the remainder we get here is the seconds remaining
-                minutes_elapsed, remainder = divmod(remainder, 60)
-                # show the timer in the timer_display Entry via timer_text instance variable
-                self.timer_text.set(f"{hours_elapsed:02}:{minutes_elapsed:02}:{remainder:02}")
-            else:
-                # the system is awake from sleep or recovered from a freeze/hang
-                # in this case, the task and segment were running till the last_ui_update_time
-                # we accumulate work from the segment that was running before sleep
-                # till the last known active moment before suspension i.e., last_ui_update
-                self.segment_end_time = self.last_ui_update_time
-                # we set the task end time to last_ui_update_time so that sleep time is excluded as we use task_endTime to calculate pause duration inside _calculate_duration() method
-                self.task_end_time = self.last_ui_update_time
-                self.auto_end = True
-                self._seconds_accumulator()
-                self._end_timer()
-
-        # capture the last ui update time to check for system sleep/freeze by calculating the diff between this and next ui update time
-        self.last_ui_update_time = dt.datetime.now()
-        self.last_ui_update_mono = time.monotonic()
-        # call the schedule timer method irrespective of the timer status to ensure perpetual loop for sleep/freeze detection
-        self._schedule_update_timer()
-
-
-    def _schedule_update_timer(self):
-        # perpetual loop to detect system sleep/freeze
-       self.timer_running_queue=  self.app.after(1000, self._update_timer_display)
-
-
-    def _humanize_time(self, minutes):
-        """
-        Formats the total minutes to H:MM string format to be logged to Excel
-        Handles durations longer than 24 hours by accumulating the hours
-        :return: str: 2h 12m or 0
-        """
-        # this is incorrect as there may be pause time in between
-        # difference = self.task_end_time - self.task_start_time
-        # diff_seconds = difference.total_seconds()
-        # seconds_elapsed represents only the time in seconds timer ran and not paused
-        if minutes:
-            hours, minutes = divmod(minutes, 60)
-            return f"{hours:.0f}h {minutes:02.0f}m" if hours else f"{minutes:.0f}m"
-        else:
-            return 0
-
+        update_interval = self.tick_scheduler.armed_interval_ms / 1000 + 0.5
+        self.watchdog.beat(update_interval)
+
+        if self.engine.tick(expected_interval=update_interval):
+            # the system is awake from sleep or recovered from a freeze/hang
+            # the engine has ended the task at the last tick before the sleep, log it
+            self._end_timer()
+        elif self.is_timer_running == TimerStatus.RUNNING:
+            # the system did not sleep, or there was no UI freeze
+            # nothing to draw while the app is hidden, the display is synced when the app is shown
+            if self.tick_scheduler.is_visible:
+                self._render_timer_text()
+
+        # re-arms the midnight timer if the wall clock jumped or the UTC offset changed (DST, timezone),
+        # after the sleep check so that a task is ended at the sleep before it is split at a midnight slept through
+        self.midnight_scheduler.check()
+
+        # heartbeat: the last moment the task is known to be running, used as the end of the task on crash recovery
+        if self.is_timer_running != TimerStatus.STOPPED:
+            if time.monotonic() - self.last_checkpoint_mono >= self.checkpoint_every_seconds:
+                # no flush to the disk, the mapped memory survives an app crash and costs only a memory copy
+                self._save_checkpoint(flush=False)
 
-    def _seconds_accumulator(self):
-        """
-        calculate the segment duration (segment_end_time - segment_start_time), when paused
-        and add the duration to work seconds
-        only completed second is considered i.e., numbers after decimal. that we get from .total_seconds() is ignored
-        """
-        self.work_seconds += int((self.segment_end_time - self.segment_start_time).total_seconds())
+        # run the callbacks from the background threads e.g., Excel write result
+        self._process_ui_queue()
+        # the tick_scheduler schedules the next tick irrespective of the timer status to ensure perpetual loop for sleep/freeze detection
 
 
-    def _new_day_pause_seconds_accumulator(self, current_timestamp: dt.datetime) -> None:
+    def _render_timer_text(self):
         """
-        Accumulates the pause seconds of a new day for multi-day tasks
-        :return: None
+        Shows the work duration of the running task as hh:mm:ss in the timer_display Entry
         """
-        # if pause start is captured (not None), pause start and end or on a new day, else pause start is on the previous day (i.e., before midnight) and end (the pause end = resume) is on new day
-        if self.new_day_pause_start:
-            # pause start was on a new day
-            self.new_day_pause_seconds += int( (current_timestamp - self.new_day_pause_start).total_seconds())
-            self.new_day_pause_start = None
-        else:
-            # pause start was on the previous day
-            midnight_timestamp = dt.datetime.combine(current_timestamp, dt.time())
-            # new day pause duration will be midnight -> resume time
-            self.new_day_pause_seconds += int( (current_timestamp - midnight_timestamp).total_seconds() )
+        # use .seconds instead of .total_seconds() as the later keeps accumulating the fractional seconds that may lead to a jump between multiple pause and resume cycles (this happens if we include decimal points also that we get with .total_seconds(). but we exclude the decimal part with int() )
+        # .seconds only gives max 86400 i.e., seconds for the day, so use total_seconds() and int()
+        seconds_elapsed_ui = self.engine.elapsed_seconds()
+        hours_elapsed, remainder = divmod(seconds_elapsed_ui, 3600)
+        # the remainder we get here is the seconds remaining
+        minutes_elapsed, remainder = divmod(remainder, 60)
+        # show the timer in the timer_display Entry via timer_text instance variable
+        self.timer_text.set(f"{hours_elapsed:02}:{minutes_elapsed:02}:{remainder:02}")
 
 
     def _run_timer(self):
@@ -549,26 +803,9 @@ class TaskTimer:
             self.manage_tasks_btn.configure(command=lambda: ..., text_color="#353535")
             # run timer if the timer is not running i.e., timer is paused or stopped
             if self.is_timer_running != TimerStatus.RUNNING:
-                # we set the task_start_time before changing the is_timer_running status to catch the scenario where a timer that was paused is being resumed
-                # when paused, is_timer_running = PAUSED, so != RUNNING
-                # we then set is_timer_running = RUNNING and after that we again set task_start_time as this inner if evaluates true,
-                # i.e., RUNNING != PAUSED which means a new task_start_time is created for an already running task
-                # Set task_start_time only if the timer is beginning a new session (from STOPPED);
-                # this preserves the original start time when resuming from a PAUSED state.
-                # only set if completely new task
-                if self.is_timer_running == TimerStatus.STOPPED:
-                    # set the task_start_time at the start of the task
-                    self.task_start_time = dt.datetime.now()
-
-                # set the start of the segment
-                self.segment_start_time = dt.datetime.now()
-
-                # accumulate the pause seconds if new day on resuming a pause
-                # check if the resume (i.e., status was PAUSED before resume) is on a new day
-                if self.is_timer_running == TimerStatus.PAUSED and self.task_start_time.date() != self.segment_start_time.date():
-                    self._new_day_pause_seconds_accumulator(current_timestamp= self.segment_start_time)
-
-                self.is_timer_running = TimerStatus.RUNNING
+                # starts a new task or resumes the paused one (the original task_start_time is kept)
+                self.engine.start()
+                self._save_checkpoint()
                 self.start_btn.configure(text="⏸")
                 # to not select a new task while the timer is running
                 self.task_list_menu.configure(state="disabled")
@@ -576,17 +813,9 @@ class TaskTimer:
                 # print("Timer running")
             else:
                 # timer is paused
-                # capture the end of segment when paused
-                self.segment_end_time = dt.datetime.now()
-                if self.task_start_time.date() != self.segment_end_time.date():
-                    # paused on a new day, capture pause start for calculating pause duration
-                    self.new_day_pause_start = dt.datetime.now()
-                # accumulate the work seconds when paused
-                self._seconds_accumulator()
-                self.is_timer_running = TimerStatus.PAUSED
+                self.engine.pause()
+                self._save_checkpoint()
                 self.start_btn.configure(text="▶")
-                # as we are updating self.is_timer_running = TimerStatus.STOPPED, _update_timer() will stop as it runs only when the timer is running -> if self.is_timer_running == TimerStatus.RUNNING: ...
-                # self._update_timer()
                 self._update_status_label("Pause", 0)
                 # print("Timer paused")
         else:
@@ -595,62 +824,13 @@ class TaskTimer:
         self.app.focus()
 
 
-    def _calculate_duration(self, task_start_time, task_end_time, work_seconds):
-        """
-        calculates work_minutes, pause_minutes, and total_task_minutes at the end of the task to be saved to Excel
-        ensures work_minutes + pause_minutes == total_task_minutes, to align with start and end time shown in hh:mm in Excel
-        """
-
-        # we have to tie in task start and end time, trimmed task start and end time, work_minutes, pause_minutes, total_minutes together to ensure total_m = work_m + pause_m
-
-        # trim the seconds for Excel visible times
-        task_start_trimmed = task_start_time.replace(second=0, microsecond=0)
-        task_end_trimmed = task_end_time.replace(second=0, microsecond=0)
-
-        total_task_seconds_trimmed = int( (task_end_trimmed - task_start_trimmed).total_seconds() )
-        total_task_minutes = total_task_seconds_trimmed // 60
-
-        # calculate total wall-clock seconds for the task
-        # cast to int for consistency with work_seconds
-        total_actual_seconds = int( (task_end_time - task_start_time).total_seconds() )
-
-        # Since we accumulate the work_seconds at hh:mm:ss level, i.e., at seconds precision,
-        # we also get the pause duration at seconds precision
-        # max to cover cases where work_seconds may be more than total_actual_seconds
-        pause_seconds = max(0, total_actual_seconds - work_seconds)
-        pause_minutes = pause_seconds // 60
-
-        # derive work_minutes to ensure the work_m + pause_m = total_m
-        work_minutes = total_task_minutes - pause_minutes
-        work_minutes = max(0, work_minutes)  # Ensure non-negative
-
-        return work_minutes, pause_minutes, total_task_minutes
-
-
-    # def _dev_log_data(self):
-    #     work_minutes, pause_minutes, total_task_minutes = self._calculate_duration()
-    #
-    #     write_status = self._append_data_to_excel(
-    #         sheet_name="Log",
-    #         Date=f"{self.task_start_time:%d-%b-%Y}",
-    #         Task=self.current_task,
-    #         Start=f"{self.task_start_time:%I:%M:%S}",
-    #         End=f"{self.task_end_time:%I:%M:%S}",
-    #         Total_Seconds = int((self.task_end_time - self.task_start_time).total_seconds()),
-    #         Work_Seconds = self.work_seconds,
-    #         Work_Minutes = work_minutes,
-    #         Pause_Minutes = pause_minutes,
-    #         Total_Minutes = total_task_minutes
-    #     )
-
-
     def _update_days_work_minutes_display(self, current_task_work_minutes=0) -> None:
         """
         Update the UI to show the latest 'days work duration' after the end of the end of a task
         :return: None
         """
-        # this is run on task end and triggered from _end_timer() -> log data to excel method
-        # or on detection of a date change from _check_for_day_change_periodically()
+        # this is run on task end and triggered from _end_timer() -> engine.check_day_split_and_log()
+        # or on a new day from _on_new_day() (midnight_scheduler)
         # check if the current date is equal to task end date i.e., task start and end are on the same date
         # if yes, add to days work minutes
         # if not, reset the days work minutes and change the current date
@@ -661,190 +841,66 @@ class TaskTimer:
             # this call to _get_days_work_minutes() may not be required, but we do it be safe
             self.days_work_minutes = self._get_days_work_minutes()
 
-        days_work_minutes_formated = self._humanize_time(self.days_work_minutes)
+        days_work_minutes_formated = humanize_time(self.days_work_minutes)
         self.days_work_label.configure(text=f"Day: {days_work_minutes_formated}")
 
 
-    def _log_data_to_excel(self, task_start_time, task_end_time, work_minutes, pause_minutes, total_task_minutes) -> bool:
+    def _get_notes(self) -> str:
         """
-        Logs data to Excel on end of the timer
-        Triggered by _end_timer() method
-        :return: log_status (True or False)
+        :return: notes typed in the notes_textbox, "" if the placeholder is shown
         """
-
-        # get the work duration in hh:mm format
-        work_duration = self._humanize_time(work_minutes)
-        pause_duration = self._humanize_time(pause_minutes)
-
         # to avoid capturing placeholder text as notes
         if self.is_placeholder_active:
-            task_notes = ""
-        else:
-            task_notes = self.notes_textbox.get("1.0", "end-1c")
-
-        # write data to the Excel Date, Task, Duration, Notes, Start Time, End Time, Seconds
-        # print(f"{task_start_time.date()=},{self.current_task=}, {work_duration=},{task_notes=},{pause_duration=}, {task_start_time:%I:%M %p}, {task_end_time:%I:%M %p}, {work_minutes=}, {pause_minutes=}, {total_task_minutes=}")
-        log_status = self._append_data_to_excel(self.excel_time_sheet,
-                                                Date=task_start_time.date(),
-                                                Task=self.current_task,
-                                                Work_Duration=work_duration,
-                                                Notes=task_notes,
-                                                Pause_Duration=pause_duration,
-                                                Start_Time=f"{task_start_time:%I:%M %p}",
-                                                End_Time=f"{task_end_time:%I:%M %p}",
-                                                Work_Minutes=work_minutes,
-                                                Pause_Minutes=pause_minutes,
-                                                Total_Minutes=total_task_minutes,
-                                                Multi_day_Start = f"{self.multiday_start_date}",
-                                                )
+            return ""
+        return self.notes_textbox.get("1.0", "end-1c")
 
-        return log_status
 
-
-    def _check_day_split_and_log(self) -> bool:
+    def _log_data_to_excel(self, row) -> bool:
         """
-        If the task spans for more than one day, logs entry for each day splitting the duration till midnight
-        Else, logs the task for the day
-        This method is called on detection of new day start inside _check_for_day_change_periodically()
-        Or on task end inside _end_timer()
-        :return: Log Status as bool
+        Logs a row of the task (built by the engine) to Excel
+        :param row: dict Date, Task, Work_Duration, Notes, Pause_Duration, Start_Time, End_Time, Work_Minutes, Pause_Minutes, Total_Minutes, Multi_day_Start
+        :return: log_status (True or False)
         """
+        return self._log_rows_to_excel([row])
 
-        # check if task start date and now are on different dates
-        current_timestamp = dt.datetime.now() # time when a new day is detected or when the task stopped/ended by the user
-        if self.task_start_time.date() != current_timestamp.date():
-            # this block is triggered from both _check_for_day_change_periodically() and _end_timer()
 
-            # a new day has started
-            cumulative_work_seconds = self.work_seconds
-
-            if self.is_timer_running == TimerStatus.RUNNING:
-                # the _seconds_accumulator() would not have been called for the current segment
-                cumulative_work_seconds += int( (current_timestamp - self.segment_start_time).total_seconds() )
-
-            # CASE - pause may have started on previous day/new day and not resumed
-            # new day change gets triggered inside _check_for_day_change_periodically that calls _check_day_split_and_log, but pause duration accumulation does not happen in run_timer
-            # so, we have to count the pause duration from pause start to current_timestamp
-            if self.is_timer_running == TimerStatus.PAUSED:
-                self._new_day_pause_seconds_accumulator(current_timestamp=current_timestamp)
-
-            # midnight -> now i.e., when a new day was detected/when the task ended on new day
-            midnight_timestamp = dt.datetime.combine(current_timestamp, dt.time())
-            new_day_total_seconds = int( (current_timestamp - midnight_timestamp).total_seconds() )
-            new_day_work_seconds = new_day_total_seconds - self.new_day_pause_seconds
-
-            prev_day_work_seconds = cumulative_work_seconds - new_day_work_seconds
-
-            # to track the multi-day tasks
-            self.multiday_start_date = f"{self.task_start_time.date()}"
-
-            # calculate the durations for the previous day i.e., task_start -> midnight
-            work_minutes, pause_minutes, total_task_minutes = self._calculate_duration(
-                                                                task_start_time=self.task_start_time,
-                                                                task_end_time=midnight_timestamp,
-                                                                work_seconds=prev_day_work_seconds)
-
-            # log the previous day to the Excel
-            prev_day_log_status = self._log_data_to_excel(task_start_time=self.task_start_time,
-                                                          task_end_time=midnight_timestamp,
-                                                          work_minutes=work_minutes,
-                                                          pause_minutes=pause_minutes,
-                                                          total_task_minutes=total_task_minutes)
-
-            if prev_day_log_status:
-                # if the previous day is successfully logged to Excel, reset the variables
-                # we keep adding to work_seconds_logged to handle tasks spanning 2+ days
-                self.work_seconds_logged += prev_day_work_seconds
-                self.task_start_time = midnight_timestamp
-                # Multi - day tracking variables reset
-                # we reset these here instead of in _reset_timer() as _check_day_split_and_log() is also called from _check_for_day_change_periodically() where _reset_timer() is no where triggered
-                self.new_day_pause_start = None
-                self.new_day_pause_seconds = 0
-            else:
-                return False
-
-        # CASE - task started on the previous day and ended on new day
-        # on end, _end_timer() is triggered, which in turn calls this method to log both previous day and new day data
-        # if the previous day data log is unsuccessful we should not proceed for new day log
-        # CASE - task start and end are on the same day
-        # in this case, there is no previous day log status, and we only have to log the current day
-        # to handle these situations, we have a return False statement above
-
-        day_log_status = ""
-        if self.is_timer_running == TimerStatus.STOPPED:
-            # this block is triggered on call from _end_timer() where we have to log for
-            # only current day and the new day
-            # previous day is handled by the above if block
-
-            # get the current day's work seconds (matters if the task is a multi-day task)
-            current_day_work_seconds = self.work_seconds - self.work_seconds_logged
-
-            # calculate the durations for the current day or new day (if multi-day task)
-            work_minutes, pause_minutes, total_task_minutes = self._calculate_duration(
-                                                                    task_start_time=self.task_start_time,
-                                                                    task_end_time=self.task_end_time,
-                                                                    work_seconds=current_day_work_seconds)
-
-            # log the previous day to the Excel
-            day_log_status = self._log_data_to_excel(task_start_time=self.task_start_time,
-                                                          task_end_time=self.task_end_time,
-                                                          work_minutes=work_minutes,
-                                                          pause_minutes=pause_minutes,
-                                                          total_task_minutes=total_task_minutes)
-
-            # to update the days' work duration in the UI
-            # if a new day has started, this method reads the data from the Excel freshly
-            # hence calling this after logging to excel
-            # we need not call this for prev_day log because - if preV-day logging is triggered by _check_for_day_change_periodically(self) i.e., when the timer is paused or running, updating UI display might confuse the user
-            # so, we only call this when the same day or new day datat is logged to the Excel
-            self._update_days_work_minutes_display(work_minutes)
-
-        return day_log_status
+    def _log_rows_to_excel(self, rows) -> bool:
+        """
+        Logs the rows of the task (built by the engine) to Excel, on end of the timer or on a new day for the previous day
+        The previous day and the new day rows of a multi-day task are logged together, all or nothing
+        Triggered by engine.check_day_split_and_log()
+        :param rows: list of row dicts, see _log_data_to_excel()
+        :return: log_status (True or False)
+        """
+        # the storage keeps its day's total up-to-date, so the day's total never needs a read of the Time sheet
+        return self._append_rows_to_excel([(self.excel_time_sheet, row) for row in rows])
 
 
     # if there is an error in saving the data to the Excel file (e.g., file is opened and so permission is denied), we have to stop timer and show 'Error' status
     # when user clicks stop_btn again, we have to try saving to the Excel again (e.g., user closed the file now and hit stop_btn again)
-    # since we set the running status = STOPPED in the else block also to stop the timer, next time when user clicks stop_btn, we will not try to save the data
+    # the engine keeps the task as PAUSED in that case, so the next click of stop_btn retries the save
     def _end_timer(self):
         """
         Stops the timer, saves the task log to Excel, and resets the timer state
-        stop timer (_update_timer())
         reset the timer text (timer_text)
-        change the timer running status (is_timer_running)
         change the symbol on the start button
         deselect task in task_list_menu
         """
-        # if the timer is not stopped i.e., is_timer_status is running/paused
-        if self.is_timer_running != TimerStatus.STOPPED:
-            if not self.auto_end:
-                # _end_timer() is not triggered by the system but by the user
-
-                # to capture when the task has ended and to be logged to the Excel
-                self.task_end_time = dt.datetime.now()
-                # accumulate seconds if the timer is not in paused state before ending the task
-                if self.is_timer_running != TimerStatus.PAUSED:
-                    self.segment_end_time = dt.datetime.now()
-                    self._seconds_accumulator()
-
-            # check for multi-day tasks and log the data to Excel
-            self.is_timer_running = TimerStatus.STOPPED
-            log_status = self._check_day_split_and_log()
-            # log additional data for debugging
-            # self._dev_log_data()
-
-            # show status of saving the data to the Excel file
-            if log_status:
-                self._update_status_label("Saved", 0)
-                self.auto_end = False
-                self._reset_timer()
-                # reset the multi-day task ID
-                if self.multiday_start_date: self.multiday_start_date = None
-            else:
-                # if failed to save the data to the Excel
-                self._update_status_label("Error", 1)
-                # if we set this to STOPPED, we can't attempt to retry saving to the Excel file
-                self.is_timer_running = TimerStatus.PAUSED
-                self.start_btn.configure(text="▶")
+        # None if the timer is stopped i.e., there is no task to end
+        with metrics.timer("end_timer"):
+            log_status = self.engine.end()
+        if log_status is None:
+            return
+
+        # show status of saving the data to the Excel file
+        if log_status:
+            self._update_status_label("Saved", 0)
+            self._reset_timer()
+        else:
+            # if failed to save the data to the Excel
+            self._update_status_label("Error", 1)
+            self._save_checkpoint()
+            self.start_btn.configure(text="▶")
 
 
     def _reset_timer(self, status=""):
@@ -859,30 +915,22 @@ class TaskTimer:
         # so this does not clear the selection in task_list_menu or current_task
         # if the timer is not stopped i.e., is_timer_running is running/paused
 
-        # change the running status
-        self.is_timer_running = TimerStatus.STOPPED
+        # change the running status, clears the current_task and the durations
+        self.engine.reset()
         self.task_list_menu.configure(state="normal")
-        self.current_task=""
         # we can't edit combobox when the state is disabled
         # the state is disabled when start_btn is clicked,
         # the state is set to normal inside the reset_timer,
         # so after that we can set the value to "", else this line will have no change
         # Gemini AI or qwen did not catch this
         self.task_list_menu.set("")
-        self.task_start_time = None
-        self.task_end_time = None
-        self.segment_start_time = None
-        self.segment_end_time = None
-        self.work_seconds = 0.0
-        # Multi - day tracking variables reset
-        self.work_seconds_logged = 0
+        # no task to recover anymore
+        self._save_checkpoint()
         self.timer_text.set("00:00:00")
         self.notes_textbox.delete("1.0", "end") # clear notes
         self._show_placeholder() # show placeholder text
         self.start_btn.configure(text="▶")
         self.manage_tasks_btn.configure(command=self._manage_task_status, text_color="#4a4a4a")
-        # as we are updating self.is_timer_running = TimerStatus.STOPPED, _update_timer() will stop as it runs only when the timer is running
-        # self._update_timer()
         # to remove focus from notes entry field if the notes were being typed
         self.app.focus()
         # we use reset_timer method inside the end_timer method too to avoid code repetition as there are many common operations between both the methods,
@@ -903,6 +951,9 @@ class TaskTimer:
         used for custom_minimize button
         """
         self.app.withdraw()
+        # nothing to draw while hidden, tick only for the bookkeeping at a slower rate
+        # via .after() as this is also called from the sys tray thread
+        self.app.after(0, self.tick_scheduler.set_visible, False)
 
 
     def _start_drag(self, event):
@@ -955,7 +1006,7 @@ class TaskTimer:
 
     #---------system tray icon [start]---------
 
-    def _get_icon(self, icon_name) -> ImageFile:
+    def _get_icon(self, icon_name) -> "ImageFile":
         """
         checks the existence of icon at the path returned by _get_resource_path() method
         and if the icon file is valid, readable, not corrupted
@@ -964,6 +1015,9 @@ class TaskTimer:
         :param str icon_name
         :return: icon_image
         """
+        # for handling icons
+        from PIL import Image, ImageDraw
+
         # get the app icon path
         app_icon_path = self._get_resource_path(icon_name)
         # print(f"{app_icon_path=}")
@@ -998,6 +1052,10 @@ class TaskTimer:
         # 4. create sys tray icon -> pystray.Icon()
         # 5. run the sys tray icon in a loop on a separate thread -> self.systray_thread = threading.Thread()
         try:
+            # to create a sys tray icon and to create menu items for sys tray icon right click
+            # imported here as this runs on the sys tray thread and does not delay the app window
+            import pystray
+
             # create menu items for the sys tray icon right-click
             # default True to make it the default action on single click with LMB on the sys tray icon
             menu_items = (
@@ -1032,10 +1090,76 @@ class TaskTimer:
         if not is_app_visible:
             self.app.deiconify()
 
+        # back to the per-second tick, the timer display is synced right away
+        self.app.after(0, self.tick_scheduler.set_visible, True)
+
         self.app.after(0, lambda: self.app.attributes('-topmost', True))
         self.app.after(10, lambda: self.app.attributes('-topmost', False))  # Release after 500ms (150+500)
 
 
+    def _run_instance_command(self, command):
+        """
+        Runs the command of a launch (instance.py) on the Tk thread, as if the buttons were clicked
+        :param command: dict {"action": "show"|"start"|"pause"|"end", "task": str or None}
+        """
+        action = command.get("action")
+        if action == "start":
+            task = command.get("task")
+            # a task can be selected only while the timer is stopped, a paused task is resumed as it is
+            if task and self.is_timer_running == TimerStatus.STOPPED:
+                self._select_task(task)
+            if self.is_timer_running != TimerStatus.RUNNING:
+                self._run_timer()
+        elif action == "pause":
+            if self.is_timer_running == TimerStatus.RUNNING:
+                self._run_timer()
+        elif action == "end":
+            self._end_timer()
+        else:
+            self._show_app_window()
+
+
+    def _answer_instance_query(self, command) -> str:
+        """
+        Answers a query of cli.py (instance.QUERY_ACTIONS), same text as the CLI prints when the app is not running
+        Runs on the listener thread so that the Time rows are read without freezing the window,
+        only the task running now is read on the Tk thread
+        :param command: dict {"action": "today"} or {"action": "report", "start", "end", "group_by", "task"}
+        """
+        from cli import report_text, task_status, today_text
+
+        if command["action"] == "today":
+            current_task_status = []
+            is_read = threading.Event()
+
+            def read_task_status():
+                current_task_status.append(task_status(self.engine))
+                is_read.set()
+
+            self.app.after(0, read_task_status)
+            if not is_read.wait(timeout=2):
+                raise TimeoutError("the window is busy, try again")
+            return today_text(self.storage, current_task_status[0])
+
+        start, end = (dt.date.fromisoformat(command[key]) if command.get(key) else None for key in ("start", "end"))
+        return report_text(self.storage, start, end, command.get("group_by") or "task", command.get("task"))
+
+
+    def _select_task(self, task):
+        """
+        Selects the task in the task_list_menu, ignoring the case, the task is added if it does not exist
+        """
+        existing_task = next((item[self.tasks_col_name] for item in self.all_tasks_dict_list
+                              if str(item[self.tasks_col_name]).casefold() == task.casefold()), None)
+        if existing_task is None:
+            # added as if typed into the task_list_menu combobox, sets the current_task if the task is saved
+            self.task_list_menu.set(task)
+            self._add_task_on_enter(None)
+        else:
+            self.task_list_menu.set(existing_task)
+            self.current_task = existing_task
+
+
     def _quit_app(self):
         """
         Quit the app entirely
@@ -1048,11 +1172,30 @@ class TaskTimer:
         if self.status_update_queue:
             self.app.after_cancel(self.status_update_queue)
 
-        if self.timer_running_queue:
-            self.app.after_cancel(self.timer_running_queue)
+        self.tick_scheduler.stop()
+        self.watchdog.stop(timeout=1)
+        self._record_tick_wakeups()
+
+        self.midnight_scheduler.stop()
 
-        if self.check_day_change_queue:
-            self.app.after_cancel(self.check_day_change_queue)
+        self.app.after_cancel(self.metrics_flush_queue)
+
+        # the task is ended (or failed to log and is in the checkpoint), release the checkpoint file
+        self.checkpoint.close()
+
+        if self.file_watcher is not None:
+            self.file_watcher.stop(timeout=1)
+
+        # write the pending journal rows to the Excel (Excel file as the store) and stop the background writer,
+        # if this fails (e.g., Excel is open), the rows stay in the journal and are written on the next start
+        self.storage.flush()
+        self.storage.close(timeout=5)
+        # after the last save, so that it is in the metrics
+        metrics.flush(self.metrics_file)
+
+        # a new launch can start once the app is gone
+        if self.single_instance is not None:
+            self.single_instance.release()
 
         # stop the system tray icon
         if self.systray_icon:
@@ -1066,6 +1209,36 @@ class TaskTimer:
     # ---------system tray icon [end]---------
 
     def _open_excel_file(self):
+        """
+        Brings the Excel file up to date on a background thread and then opens it, see _export_and_open_excel_file()
+        """
+        # a click while the export is still running opens the file once, when the export is done
+        if self.export_thread is not None and self.export_thread.is_alive():
+            return
+        self.export_thread = threading.Thread(target=self._export_and_open_excel_file, name="exporter", daemon=True)
+        self.export_thread.start()
+
+
+    def _export_and_open_excel_file(self):
+        """
+        Runs on the exporter thread, the progress and the opening of the file are handed over to the Tk thread
+        The Excel file should show all the logs, including the ones still in the journal
+        or, with the SQLite database as the store, the Excel file is exported from the database (streamed, export.py)
+        """
+        def on_progress(rows_done, rows_total):
+            if rows_total:
+                self._run_on_ui_thread(lambda: self._update_status_label(f"Export {rows_done * 100 // rows_total}%", 0))
+
+        try:
+            if not self.storage.export_to_excel(on_progress=on_progress):
+                # e.g., Excel file open/locked, the last version of the file is opened
+                print(f"Could not bring {self.excel_file} up to date, opening it as it is")
+        except Exception as e:
+            print(f"An unexpected error occurred while exporting to the Excel file: {e}")
+        self._run_on_ui_thread(self._launch_excel_file)
+
+
+    def _launch_excel_file(self):
         """
         Opens the Excel file using the default system application
         Provides user feedback via the status label
@@ -1137,6 +1310,41 @@ class TaskTimer:
         author_label.grid(row=5, column=1, padx=30, pady=(12, 5), sticky="we")
 
 
+    def _save_task_status_changes(self, status_updates, on_saved) -> None:
+        """
+        Writes the Status cells of the changed tasks to the Tasks sheet, on the excel_writer thread (Excel file as the store)
+        so that the window does not freeze while the Excel file is loaded and saved
+        The other rows and columns of the Tasks sheet are kept as they are
+        :param status_updates: dict task name -> {"Status": new status}
+        :param on_saved: callable(error_message) called on the Tk thread once saved, error_message is "" if saved
+        """
+        def on_result(updated_count, error):
+            # on the excel_writer thread
+            if error is not None:
+                # e.g., the journal could not be written to the Excel file first (Excel file open)
+                print(error)
+                error_message = "Error on save. Please try again :("
+            elif updated_count is None:
+                print(f"Error: {self.excel_tasks_sheet} sheet not found in the storage. No update performed.")
+                error_message = "Error on save. Please try again :("
+            else:
+                error_message = ""
+            self._run_on_ui_thread(lambda: on_saved(error_message))
+
+        self.storage.update_cells_in_background(self.excel_tasks_sheet, self.tasks_col_name, status_updates, on_result)
+
+
+    def _apply_task_status_changes(self, status_updates) -> None:
+        """
+        Applies the saved Status cells to the tasks in the memory, no need to read the Tasks sheet again
+        :param status_updates: see _save_task_status_changes()
+        """
+        for task_item in self.all_tasks_dict_list:
+            new_values = status_updates.get(str(task_item[self.tasks_col_name]))
+            if new_values is not None:
+                task_item.update(new_values)
+
+
     def _manage_task_status(self):
         """
         Opens a new window to manage the status of the tasks
@@ -1158,86 +1366,57 @@ class TaskTimer:
 
         # 3. Save changes
         def save_changes_to_task_status():
-            # 1. Get the active tasks after user changes
-            active_tasks = [cb.cget("text") for cb in task_checkboxes if cb.get() == "on"]
-
-            # 2. Change the status in the dict as per user changes
-            for task_item in self.all_tasks_dict_list:
-                # Excel column name will be the key for each dict
-                if task_item[self.tasks_col_name] in active_tasks:
-                    task_item["Status"] = self.task_active_status_symbol
-                else:
-                    task_item["Status"] = ""
-
-            # 4. Write the data back to the Excel with openpyxl as pd rewrites entire Excel
-            save_error_message = ""
-            try:
-                wb = load_workbook(self.excel_file)
-                if self.excel_tasks_sheet not in wb.sheetnames:
-                    save_error_message= f"Error: {self.excel_tasks_sheet} sheet not found in '{self.excel_file}'. No update performed."
-                    return
-
-                ws = wb[self.excel_tasks_sheet]
-                # Remove existing task rows excluding the header row
-                ws.delete_rows(2, ws.max_row - 1)
-
-                # Prepare the rows and write to the Excel
-                # Order of data in rows - Task	Status	Added_On
-                for task_dict in self.all_tasks_dict_list:
-                    row_values = [
-                        task_dict.get(self.tasks_col_name, ""),
-                        task_dict.get("Status", ""),
-                        task_dict.get("Added_On", "")
-                    ]
-                    ws.append(row_values)
-
-                wb.save(self.excel_file)
-
-                # 5. Refresh the task list for ComboBox dropdown and close the manage task status window if save is successful
-
-                # update the task list dropdown ComboBox
-                self.task_list = self._get_task_list()
-                # to ensure "<Add new task...>" is at the top of the list
-                self.task_list[1:] = sorted(self.task_list[1:])
-                # update the combobox with the new task_list
-                self.task_list_menu.configure(values=self.task_list)
-
-                # Reset the current task if any as it may be made inactive only if the timer is not running
-                # If the timer is running or paused, and if we reset the current_task, task name in Excel log will be blank
-                if self.is_timer_running == TimerStatus.STOPPED:
-                    self.current_task = ""
-                    self.task_list_menu.set("")
+            # 1. Get the tasks checked/unchecked by the user, the rest of the tasks are not touched
+            changed_tasks = task_list_view.changed_tasks()
+            if not changed_tasks:
+                manage_window.destroy()
+                return
+            # only the Status cells of the changed tasks are written
+            status_updates = {task: {"Status": self.task_active_status_symbol if is_active else ""}
+                              for task, is_active in changed_tasks.items()}
+
+            # 2. Write the changed cells to the Excel in the background and apply them to the tasks in the memory once saved
+            save_btn.configure(state="disabled")
+            save_error_label.configure(text="Saving...")
+            self._save_task_status_changes(status_updates,
+                                           on_saved=lambda error_message: on_task_status_saved(status_updates, error_message))
+
+
+        def on_task_status_saved(status_updates, error_message):
+            if error_message:
+                # the window may have been closed while saving
+                if manage_window.winfo_exists():
+                    save_error_label.configure(text=error_message)
+                    save_btn.configure(state="normal")
+                return
+
+            self._apply_task_status_changes(status_updates)
+            # 3. Refresh the task list for ComboBox dropdown and close the manage task status window if save is successful
+            self.task_list = self._active_task_list()
+            # update the combobox with the new task_list
+            self._filter_task_list_menu()
+
+            # Reset the current task if any as it may be made inactive only if the timer is not running
+            # If the timer is running or paused, and if we reset the current_task, task name in Excel log will be blank
+            if self.is_timer_running == TimerStatus.STOPPED:
+                self.current_task = ""
+                self.task_list_menu.set("")
+            if manage_window.winfo_exists():
                 manage_window.destroy()
-
-            except (pd.errors.ParserError, FileNotFoundError, InvalidFileException, Exception) as err:
-                print(err)
-                save_error_message = "Error on save. Please try again :("
-                save_error_label.configure(text=save_error_message)
 
 
         # 2. Show the tasks with checkbox if the tasks exist, else show the error message
         if self.all_tasks_dict_list:
-            scrollable_frame = ctk.CTkScrollableFrame(manage_window, width=220, height=350)
-            scrollable_frame.grid(row=1, column=1, padx=10, pady=(10,5))
-
-            # create checkbox for each task
-            task_checkboxes = [] # holds the created ctk CheckBoxes
-
             # sort the tasks in alphabetical order of task name
             sorted_tasks_dict_list = sorted(self.all_tasks_dict_list,
-                                            key=lambda task_item: task_item[self.tasks_col_name])
-
-            for item in sorted_tasks_dict_list:
-                checked_state = "on" if item["Status"] == self.task_active_status_symbol else "off"
-                checked_state_var = ctk.StringVar(value=checked_state)
-                task_checkbox = ctk.CTkCheckBox(scrollable_frame, text=item[self.tasks_col_name],
-                                                variable=checked_state_var, onvalue="on", offvalue="of",
-                                                corner_radius=4, border_width=2, fg_color="#085bbe",
-                                                hover_color="#05428b", font=("Segoe UI", 14))
-                # wrap lengthy task names
-                task_checkbox._text_label.configure(wraplength=280)
-                task_checkboxes.append(task_checkbox)
-                task_checkbox.grid(row=len(task_checkboxes), column=1, padx=10, pady=8, sticky="we")
+                                            key=lambda task_item: str(task_item[self.tasks_col_name]))
+
+            # checkbox for each task, only the visible rows have widgets so this does not slow down with many tasks
+            task_list_view = TaskListView(manage_window,
+                                          tasks=[(item[self.tasks_col_name],
+                                                  str(item.get("Status") or "").lower() == self.task_active_status_symbol.lower())
+                                                 for item in sorted_tasks_dict_list])
+            task_list_view.grid(row=1, column=1, padx=10, pady=(10,5))
 
             # 3. Save the changes
             # to show error warning if any on saving the changes
@@ -1269,7 +1448,7 @@ class TaskTimer:
         title_label.grid(row=1, column=1, sticky="w", pady=(7,3), padx=10)
 
         # get the duration in hh:mm format for display - text_color= #575f66
-        days_work_minutes_formated = self._humanize_time(self.days_work_minutes)
+        days_work_minutes_formated = humanize_time(self.days_work_minutes)
         self.days_work_label = ctk.CTkLabel(toolbar_frame, text=f"Day: {days_work_minutes_formated}",
                                        text_color="#4f575d", font=("Segoe UI", 13, "bold"))
         self.days_work_label.grid(row=1, column=2, sticky="e")
@@ -1293,12 +1472,18 @@ class TaskTimer:
         self.days_work_label.bind("<B1-Motion>", self._do_drag)
 
         # dropdown menu to choose the tasks from task_list
-        self.task_list_menu = ctk.CTkComboBox(self.app, values=self.task_list, command=self._list_menu_callback)
+        # only the first tasks are in the dropdown, the rest are found by typing (_filter_task_list_menu())
+        self.task_menu_values = self.task_list[:self.task_menu_limit + 1]
+        self.task_list_menu = ctk.CTkComboBox(self.app, values=self.task_menu_values, command=self._list_menu_callback)
         self.task_list_menu.grid(row=2, column=1, padx=10, pady=(10, 0), sticky="ew", columnspan=3)
         # remove the default option displayed from combobox dropdown (defaults to the first option)
         self.task_list_menu.set("")
         # to add a new task on press of the Enter key
         self.task_list_menu.bind("<Return>", self._add_task_on_enter)
+        # to show only the tasks matching the typed text in the dropdown
+        self.task_list_menu.bind("<KeyRelease>", self._filter_task_list_menu)
+        # hidden debug panel with the metrics
+        self.app.bind_all("<Control-Shift-D>", self._show_debug_panel)
 
         # hint text to show how to add a new task to the task_list
         hint_label = ctk.CTkLabel(self.app, text="Type new task & press Enter", font=("Segoe UI", 12, "bold"), height=5, text_color="#7a848d")
@@ -1387,6 +1572,8 @@ class TaskTimer:
         Example: 1.0 for 100%, 1.25 for 125%, 1.5 for 150%, etc.
         """
         try:
+            # to get dpi scaling
+            from ctypes import windll
             dpi = windll.user32.GetDpiForWindow(hwnd)
             return dpi / 96.0
         except Exception as e:
@@ -1431,4 +1618,6 @@ class TaskTimer:
         self.app.geometry(f"+{x_physical}+{y_physical}")
 
 
-app = TaskTimer()
+# only when run as the app, so that the modules can be imported (e.g., by cli.py) without opening the window
+if __name__ == "__main__":
+    app = TaskTimer(single_instance, instance_command)
@@ -0,0 +1,166 @@
+# Always-on, low-overhead counters and timers for the hot paths of the app
+# (Excel reads/writes, journal appends, the perpetual tick and its jitter, the day change check, ...)
+# so that a report like "the app froze when I hit stop" comes with data on where the time went
+# A timer is a count, a total, a max and a histogram with fixed buckets, so recording is a few additions and never grows
+# The metrics are shown in a hidden debug panel (Ctrl+Shift+D in the app) and flushed to a small JSON file
+# next to the Excel file every minute and on quit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# upper bounds (ms) of the histogram buckets, the last bucket is everything above
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+
+    def add(self, value_ms: float) -> None:
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+        self.buckets[bisect_left(BUCKETS_MS, value_ms)] += 1
+
+
+    def percentile(self, percent: float):
+        """
+        :return: upper bound (ms) of the bucket the percentile falls in, max_ms for the last bucket, None if empty
+        """
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            # bucket upper bound -> count, only the buckets with a count
+            "buckets": {(f"<={BUCKETS_MS[bucket]}" if bucket < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): bucket_count
+                        for bucket, bucket_count in enumerate(self.buckets) if bucket_count},
+        }
+
+
+class Metrics:
+    def __init__(self) -> None:
+        # name -> int
+        self.counters = {}
+        # name -> Histogram of the durations (timers) or of the observed values (e.g., tick jitter)
+        self.histograms = {}
+        # name -> float, the last value set (e.g., tick wakeups per second)
+        self.gauges = {}
+        # recorded from the Tk thread and the excel_writer thread
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+
+    def count(self, name: str, amount=1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+    def observe(self, name: str, value_ms: float) -> None:
+        """
+        Adds a value (ms) to the histogram of the name, e.g., a duration or the tick jitter
+        """
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(value_ms)
+
+
+    def gauge(self, name: str, value: float) -> None:
+        """
+        Sets the current value of the name, replacing the previous one
+        """
+        with self.lock:
+            self.gauges[name] = value
+
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Times the block, an exception in the block is also timed and counted as name.errors
+        Example usage:
+            with metrics.timer("excel.write"):
+                wb.save(excel_file)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count(name + ".errors")
+            raise
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "histograms": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            }
+
+
+    def report(self) -> str:
+        """
+        :return: str table of the timers and counters, for the debug panel
+        """
+        snapshot = self.snapshot()
+        lines = [f"Since {snapshot['started_at']}", "",
+                 f"{'timer':<26}{'count':>7}{'avg':>9}{'p50<=':>8}{'p99<=':>8}{'max':>9}  ms"]
+        for name, histogram in snapshot["histograms"].items():
+            lines.append(f"{name:<26}{histogram['count']:>7}{histogram['avg_ms'] or 0:>9.1f}"
+                         f"{histogram['p50_ms'] or 0:>8.0f}{histogram['p99_ms'] or 0:>8.0f}{histogram['max_ms']:>9.1f}")
+        lines += ["", f"{'counter':<26}{'count':>7}"]
+        for name, count in snapshot["counters"].items():
+            lines.append(f"{name:<26}{count:>7}")
+        if snapshot["gauges"]:
+            lines += ["", f"{'gauge':<26}{'value':>7}"]
+            for name, value in snapshot["gauges"].items():
+                lines.append(f"{name:<26}{value:>7.2f}")
+        return "\n".join(lines)
+
+
+    def flush(self, metrics_file) -> bool:
+        """
+        Writes the metrics to the file, replaced in one go so that a crash never leaves a half-written file
+        :return: True if written
+        """
+        temp_file = metrics_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=1)
+            os.replace(temp_file, metrics_file)
+            return True
+        except OSError as e:
+            print(f"Error on writing the metrics: {e}")
+            return False
+
+
+# shared by all the modules of the app, so that the metrics don't have to be passed around
+metrics = Metrics()
@@ -0,0 +1,257 @@
+# Time range and per task queries over the Time sheet rows
+# The rows are kept sorted by date in NumPy arrays, so a date range is found with a binary search (searchsorted)
+# and the minutes in it are summed with vectorized sums instead of going over the rows one by one
+# Each task also has a postings list (positions of its rows in the sorted arrays) for the per task queries
+# Run: python query.py -> prints this week's and this month's totals from Time_Keeper.xlsx
+import datetime as dt
+import sys
+
+import numpy as np
+
+from workbook import cell_to_int, cell_to_ordinal
+
+# group_by values of TimeIndex.totals()
+GROUP_BY = ("task", "day", "week", "month")
+# day number of 1970-01-01, NumPy's datetime64 counts the days from here
+_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+class TimeIndex:
+    def __init__(self, rows=()) -> None:
+        """
+        :param rows: iterable of the Time sheet rows as dicts (Date, Task, Work_Minutes, Pause_Minutes, Total_Minutes)
+        """
+        # rows as added, in columns, sorted into the arrays below on the next query
+        self._dates = []
+        self._tasks = []
+        self._work = []
+        self._pause = []
+        self._total = []
+        # task name -> task id
+        self.task_ids = {}
+        self.task_names = []
+        # sorted arrays, built by _sort() when rows were added since the last query
+        self.is_sorted = False
+        self.dates = self.months = self.tasks = self.work = self.pause = self.total = None
+        # task id -> positions of the rows of the task in the sorted arrays
+        self.postings = {}
+
+        for row in rows:
+            self.add(row)
+
+
+    @classmethod
+    def from_columns(cls, cache_columns):
+        """
+        Builds the index from the memory-mapped Time sheet columns (ColumnarCache.columns()) without reading the rows one by one
+        """
+        index = cls()
+        index.add_columns(cache_columns)
+        return index
+
+
+    def add_columns(self, cache_columns) -> None:
+        """
+        Adds the rows of the memory-mapped Time sheet columns (ColumnarCache.columns()), e.g., of each shard (shards.py)
+        """
+        columns, task_names = cache_columns["columns"], cache_columns["strings"]["Task"]
+        # task ids of the columns (position in task_names, blank task (-1) is the last one) -> task ids of the index
+        id_map = []
+        for task in list(task_names) + [""]:
+            task_id = self.task_ids.get(task)
+            if task_id is None:
+                task_id = self.task_ids[task] = len(self.task_names)
+                self.task_names.append(task)
+            id_map.append(task_id)
+        id_map = np.asarray(id_map, dtype=np.int32)
+
+        # rows without a valid date (0) are skipped, same as add()
+        has_date = columns["Date"] != 0
+        self._dates += columns["Date"][has_date].tolist()
+        self._tasks += id_map[np.where(columns["Task"] < 0, len(task_names), columns["Task"])[has_date]].tolist()
+        self._work += columns["Work_Minutes"][has_date].tolist()
+        self._pause += columns["Pause_Minutes"][has_date].tolist()
+        self._total += columns["Total_Minutes"][has_date].tolist()
+        self.is_sorted = False
+
+
+    def __len__(self):
+        return len(self._dates)
+
+
+    def add(self, row: dict) -> bool:
+        """
+        Adds a Time sheet row, e.g., on _log_data_to_excel() or while reading the Time sheet
+        :return: False if the row has no valid date and is skipped
+        """
+        ordinal = cell_to_ordinal(row.get("Date"))
+        if ordinal is None:
+            return False
+
+        task = str(row.get("Task") or "")
+        task_id = self.task_ids.get(task)
+        if task_id is None:
+            task_id = self.task_ids[task] = len(self.task_names)
+            self.task_names.append(task)
+
+        self._dates.append(ordinal)
+        self._tasks.append(task_id)
+        self._work.append(cell_to_int(row.get("Work_Minutes")))
+        self._pause.append(cell_to_int(row.get("Pause_Minutes")))
+        self._total.append(cell_to_int(row.get("Total_Minutes")))
+        self.is_sorted = False
+        return True
+
+
+    def _sort(self) -> None:
+        """
+        Builds the sorted arrays and the postings from the rows added so far
+        Rows are mostly added in the date order, so the (stable) sort is close to a copy
+        """
+        dates = np.asarray(self._dates, dtype=np.int32)
+        order = np.argsort(dates, kind="stable")
+        self.dates = dates[order]
+        # months since 1970-01 of each row, for group_by="month"
+        self.months = (self.dates - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+        self.tasks = np.asarray(self._tasks, dtype=np.int32)[order]
+        self.work = np.asarray(self._work, dtype=np.int64)[order]
+        self.pause = np.asarray(self._pause, dtype=np.int64)[order]
+        self.total = np.asarray(self._total, dtype=np.int64)[order]
+
+        # positions of each task's rows, in the date order as the positions are sorted
+        positions = np.argsort(self.tasks, kind="stable")
+        boundaries = np.searchsorted(self.tasks[positions], np.arange(len(self.task_names) + 1))
+        self.postings = {task_id: positions[boundaries[task_id]: boundaries[task_id + 1]]
+                         for task_id in range(len(self.task_names))}
+        self.is_sorted = True
+
+
+    def _range(self, start, end, task=None):
+        """
+        :return: positions of the rows from start to end (both included), of the task if given
+        """
+        if not self.is_sorted:
+            self._sort()
+
+        start_ordinal = start.toordinal() if start else -np.inf
+        end_ordinal = end.toordinal() if end else np.inf
+
+        if task is None:
+            low = np.searchsorted(self.dates, start_ordinal, side="left")
+            high = np.searchsorted(self.dates, end_ordinal, side="right")
+            return np.arange(low, high)
+
+        task_id = self.task_ids.get(str(task))
+        if task_id is None:
+            return np.arange(0)
+        positions = self.postings[task_id]
+        task_dates = self.dates[positions]
+        low = np.searchsorted(task_dates, start_ordinal, side="left")
+        high = np.searchsorted(task_dates, end_ordinal, side="right")
+        return positions[low:high]
+
+
+    def totals(self, start=None, end=None, group_by="task", task=None) -> dict:
+        """
+        Sums the minutes of the rows from start to end (both included), grouped
+        Example usage:
+            totals(dt.date(2025, 7, 1), dt.date(2025, 7, 31), group_by="week")
+            totals(group_by="day", task="Study Python")
+        :param start: dt.date first day, None for no lower limit
+        :param end: dt.date last day, None for no upper limit
+        :param group_by: "task" -> task name, "day" -> dt.date, "week" -> dt.date of the Monday,
+                         "month" -> dt.date of the 1st of the month
+        :param task: str only the rows of this task
+        :return: dict group -> {"work": minutes, "pause": minutes, "total": minutes}, in the order of the groups
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {GROUP_BY}, not {group_by!r}")
+
+        if not self._dates:
+            return {}
+        positions = self._range(start, end, task)
+        if not len(positions):
+            return {}
+
+        dates = self.dates[positions]
+        if group_by == "task":
+            keys = self.tasks[positions]
+        elif group_by == "day":
+            keys = dates
+        elif group_by == "week":
+            # day 1 (0001-01-01) is a Monday, so this is the day number of the Monday of the week
+            keys = dates - (dates - 1) % 7
+        else:
+            keys = self.months[positions]
+
+        groups, group_of_row = np.unique(keys, return_inverse=True)
+        sums = {name: np.bincount(group_of_row, weights=column[positions], minlength=len(groups)).astype(np.int64)
+                for name, column in (("work", self.work), ("pause", self.pause), ("total", self.total))}
+
+        if group_by == "task":
+            labels = [self.task_names[task_id] for task_id in groups]
+        elif group_by == "month":
+            labels = [dt.date(1970 + int(month) // 12, int(month) % 12 + 1, 1) for month in groups]
+        else:
+            labels = [dt.date.fromordinal(int(ordinal)) for ordinal in groups]
+
+        return {label: {"work": int(sums["work"][i]), "pause": int(sums["pause"][i]), "total": int(sums["total"][i])}
+                for i, label in enumerate(labels)}
+
+
+def load_time_index(excel_file, sheet_name="Time", pending_rows=(), start=None, end=None) -> TimeIndex:
+    """
+    Builds the index from the Time sheet columns saved next to the Excel file (columnar.py) if they are in sync
+    with the Excel file, else from the Time sheet of the Excel file (streamed)
+    The archived periods (shards.py) overlapping start to end are added from their cached columns,
+    so the index has the rows of all the shards for the range
+    Rows not yet written to the Excel file (pending_rows) are added to it
+    :param pending_rows: Time sheet rows in the journal
+    :param start: dt.date first day needed, None to include all the archives
+    :param end: dt.date last day needed, None to include all the archives
+    """
+    import os
+    from columnar import ColumnarCache
+    from shards import read_shard_columns, shard_sources
+    from workbook import file_fingerprint, iter_records
+
+    # read only, the app keeps the columns in sync
+    saved_columns = ColumnarCache(os.path.splitext(excel_file)[0] + ".columns").saved_columns(
+        file_fingerprint(excel_file))
+    if saved_columns is not None:
+        index = TimeIndex.from_columns(saved_columns)
+    else:
+        index = TimeIndex(iter_records(excel_file, sheet_name))
+
+    # archives, the first source is the Excel file itself
+    for source_file, source_sheet in shard_sources(excel_file, sheet_name, start, end)[1:]:
+        try:
+            index.add_columns(read_shard_columns(source_file, source_sheet))
+        except Exception as e:
+            # e.g., the cache folder is read-only, read the archive sheet itself
+            print(f"Error reading the columns of {source_file} ({source_sheet}): {e}")
+            for row in iter_records(source_file, source_sheet):
+                index.add(row)
+
+    for row in pending_rows:
+        index.add(row)
+    return index
+
+
+if __name__ == "__main__":
+    import os
+    from engine import humanize_time
+    from journal import Journal
+
+    excel_file = sys.argv[1] if len(sys.argv) > 1 else "Time_Keeper.xlsx"
+    journal = Journal(os.path.splitext(excel_file)[0] + ".journal")
+    today = dt.date.today()
+    week_start = today - dt.timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    time_index = load_time_index(excel_file, pending_rows=journal.pending_rows("Time"),
+                                 start=min(week_start, month_start), end=today)
+    for title, start, group_by in (("This week", week_start, "task"), ("This week", week_start, "day"),
+                                   ("This month", month_start, "week")):
+        print(f"{title} by {group_by}:")
+        for group, minutes in time_index.totals(start, today, group_by=group_by).items():
+            print(f"  {group}: {humanize_time(minutes['work'])}")
@@ -0,0 +1,243 @@
+# Sharding of the Time sheet by period, so that Time_Keeper.xlsx does not grow forever
+# Time_Keeper.xlsx keeps only the open periods (the current shard), which is all the app reads and writes on its hot paths
+# (day's total, logging a task). Closed periods are moved by archive_closed_periods() to archive workbooks:
+#     Time_Keeper_archive/Time_2023.xlsx -> sheet 'Time' with the rows of 2023               (policy period="year")
+#                                        -> sheets 'Time_2023-01' ... 'Time_2023-12'       (policy period="month")
+# The archives are xlsx files (zip compressed) so that they can still be opened in Excel
+# manifest.json in the archive folder lists the periods archived with their first/last dates,
+# so that a report reads only the shards overlapping its date range (shard_sources())
+import datetime as dt
+import json
+import os
+
+from metrics import metrics
+from workbook import cell_to_ordinal, file_fingerprint, iter_records
+
+# period -> number of characters of the 'YYYY-MM-DD' date that make up the period key
+_PERIOD_KEY_LENGTH = {"year": 4, "month": 7}
+
+
+def _to_date(value):
+    """
+    Date cell value as dt.date, None if it's not a date, see workbook.cell_to_ordinal()
+    """
+    ordinal = cell_to_ordinal(value)
+    return dt.date.fromordinal(ordinal) if ordinal is not None else None
+
+
+class ShardPolicy:
+    def __init__(self, period="year", keep_closed=1) -> None:
+        """
+        :param period: "year" -> a workbook per year, "month" -> a sheet per month in the workbook of its year
+        :param keep_closed: number of closed periods kept in the Excel file along with the current one,
+                            e.g., period="year", keep_closed=1 keeps this year and last year in Time_Keeper.xlsx
+        """
+        if period not in _PERIOD_KEY_LENGTH:
+            raise ValueError(f"period must be one of {tuple(_PERIOD_KEY_LENGTH)}, not {period!r}")
+        self.period = period
+        self.keep_closed = keep_closed
+
+
+    def period_of(self, date: dt.date) -> str:
+        """
+        :return: 'YYYY' or 'YYYY-MM'
+        """
+        return date.isoformat()[:_PERIOD_KEY_LENGTH[self.period]]
+
+
+    def cutoff(self, today: dt.date) -> dt.date:
+        """
+        :return: first day kept in the Excel file, the rows before it are in closed periods to be archived
+        """
+        if self.period == "year":
+            return dt.date(today.year - self.keep_closed, 1, 1)
+        months = today.year * 12 + today.month - 1 - self.keep_closed
+        return dt.date(months // 12, months % 12 + 1, 1)
+
+
+    def archive_sheet(self, period: str) -> str:
+        return "Time" if self.period == "year" else f"Time_{period}"
+
+
+def archive_dir(excel_file) -> str:
+    return os.path.splitext(excel_file)[0] + "_archive"
+
+
+def _archive_file(excel_file, period: str) -> str:
+    # a workbook per year for both the policies, the month sheets of a year are in the same workbook
+    return os.path.join(archive_dir(excel_file), f"Time_{period[:4]}.xlsx")
+
+
+def load_manifest(excel_file) -> dict:
+    """
+    :return: dict with "periods": {period: {"file", "sheet", "rows", "first", "last"}}
+             and "pending_cleanup": {period: rows} of the periods archived but not yet removed from the Excel file
+    """
+    manifest_file = os.path.join(archive_dir(excel_file), "manifest.json")
+    try:
+        with open(manifest_file, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"periods": {}, "pending_cleanup": {}}
+
+
+def _save_manifest(excel_file, manifest) -> None:
+    manifest_file = os.path.join(archive_dir(excel_file), "manifest.json")
+    with open(manifest_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+
+def _save_workbook(wb, excel_file) -> None:
+    """
+    Saves to a temporary file and replaces the file in one go, so a crash never leaves a half-written workbook
+    """
+    temp_file = excel_file + ".tmp"
+    with metrics.timer("excel.write_save"):
+        wb.save(temp_file)
+    os.replace(temp_file, excel_file)
+
+
+def needs_archival(oldest_date, policy: ShardPolicy, today=None) -> bool:
+    """
+    Cheap check before archive_closed_periods(), e.g., with the oldest date in the Time sheet columns
+    """
+    return oldest_date is not None and oldest_date < policy.cutoff(today or dt.date.today())
+
+
+def archive_closed_periods(excel_file, policy: ShardPolicy, sheet_name="Time", today=None) -> dict:
+    """
+    Moves the Time sheet rows of the closed periods (before policy.cutoff()) to the archive workbooks
+    The archives are saved first, then the manifest, then the Excel file without the archived rows, so a crash in between
+    never loses rows: the rows archived but still in the Excel file (pending_cleanup) are only removed on the next run
+    The journal must be written to the Excel file before and the caller must hold the journal's saving()
+    :return: dict period -> rows archived, empty if there was nothing to archive
+    """
+    from openpyxl import load_workbook
+    from workbook import new_workbook
+
+    if not os.path.exists(excel_file):
+        return {}
+
+    with metrics.timer("archive"):
+        cutoff = policy.cutoff(today or dt.date.today())
+        with metrics.timer("excel.write_load"):
+            wb = load_workbook(excel_file)
+        try:
+            if sheet_name not in wb.sheetnames:
+                return {}
+            sheet = wb[sheet_name]
+            rows = sheet.iter_rows(values_only=True)
+            headers = next(rows, None)
+            if not headers or "Date" not in headers:
+                return {}
+            date_position = headers.index("Date")
+
+            # rows to keep in the Excel file, and the rows of each closed period in the order of the sheet
+            kept_rows = []
+            closed_periods = {}
+            for row in rows:
+                date = _to_date(row[date_position] if date_position < len(row) else None)
+                if date is None or date >= cutoff:
+                    # rows without a date are kept, they are not in any period
+                    kept_rows.append(row)
+                else:
+                    closed_periods.setdefault(policy.period_of(date), []).append(row)
+            if not closed_periods:
+                return {}
+
+            os.makedirs(archive_dir(excel_file), exist_ok=True)
+            manifest = load_manifest(excel_file)
+            # rows archived by an earlier run that crashed before the Excel file was saved, not to be archived twice
+            to_archive = {}
+            for period, period_rows in closed_periods.items():
+                already_archived = manifest["pending_cleanup"].get(period, 0)
+                if len(period_rows) > already_archived:
+                    to_archive[period] = period_rows[already_archived:]
+
+            # 1. append the rows to the archive workbooks, one load and save per workbook
+            archive_files = {}
+            for period in to_archive:
+                archive_files.setdefault(_archive_file(excel_file, period), []).append(period)
+            for archive_file, periods in archive_files.items():
+                archive_wb = load_workbook(archive_file) if os.path.exists(archive_file) else new_workbook()
+                for period in sorted(periods):
+                    archive_sheet_name = policy.archive_sheet(period)
+                    if archive_sheet_name not in archive_wb.sheetnames:
+                        archive_wb.create_sheet(archive_sheet_name).append(list(headers))
+                    archive_sheet = archive_wb[archive_sheet_name]
+                    for row in to_archive[period]:
+                        archive_sheet.append(list(row))
+                _save_workbook(archive_wb, archive_file)
+                archive_wb.close()
+
+            # 2. record the periods in the manifest, and that their rows are yet to be removed from the Excel file
+            for period, period_rows in to_archive.items():
+                dates = [_to_date(row[date_position]) for row in period_rows]
+                entry = manifest["periods"].setdefault(period, {
+                    "file": os.path.basename(_archive_file(excel_file, period)),
+                    "sheet": policy.archive_sheet(period), "rows": 0,
+                    "first": min(dates).isoformat(), "last": max(dates).isoformat()})
+                entry["rows"] += len(period_rows)
+                entry["first"] = min(entry["first"], min(dates).isoformat())
+                entry["last"] = max(entry["last"], max(dates).isoformat())
+            manifest["pending_cleanup"] = {period: len(period_rows) for period, period_rows in closed_periods.items()}
+            _save_manifest(excel_file, manifest)
+
+            # 3. rewrite the Time sheet with only the open periods, the other sheets (Tasks) are kept as they are
+            sheet.delete_rows(2, sheet.max_row)
+            for row in kept_rows:
+                sheet.append(list(row))
+            _save_workbook(wb, excel_file)
+        finally:
+            wb.close()
+
+        manifest["pending_cleanup"] = {}
+        _save_manifest(excel_file, manifest)
+
+    archived = {period: len(period_rows) for period, period_rows in to_archive.items()}
+    if archived:
+        metrics.count("archive.rows", sum(archived.values()))
+        print(f"Archived {sum(archived.values())} row(s) of {', '.join(sorted(archived))} to {archive_dir(excel_file)}")
+    return archived
+
+
+def shard_sources(excel_file, sheet_name="Time", start=None, end=None) -> list:
+    """
+    The workbooks/sheets holding the Time rows from start to end (both included), the Excel file first
+    Archived periods outside the range are skipped using the manifest, without opening their workbooks
+    :return: list of (excel_file, sheet_name)
+    """
+    sources = [(excel_file, sheet_name)]
+    manifest = load_manifest(excel_file)
+    for period, entry in sorted(manifest["periods"].items()):
+        if start and entry["last"] < start.isoformat():
+            continue
+        if end and entry["first"] > end.isoformat():
+            continue
+        source = (os.path.join(archive_dir(excel_file), entry["file"]), entry["sheet"])
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+def shard_columns_dir(source_file, sheet_name) -> str:
+    """
+    Folder of the cached columns (columnar.py) of an archive sheet, an archive is written once so the cache stays valid
+    """
+    return f"{os.path.splitext(source_file)[0]}.{sheet_name}.columns"
+
+
+def read_shard_columns(source_file, sheet_name):
+    """
+    Columns of an archive sheet from its columnar cache, built on the first read
+    :return: same as ColumnarCache.columns()
+    """
+    from columnar import ColumnarCache
+
+    cache = ColumnarCache(shard_columns_dir(source_file, sheet_name))
+    cache.sync(fingerprint=file_fingerprint(source_file),
+               read_rows=lambda: iter_records(source_file, sheet_name), pending_rows=())
+    return cache.columns()
@@ -0,0 +1,557 @@
+# Headless simulation of the timer engine on a simulated clock
+# Replays scripted sessions (start/pause/resume/end across midnights, system sleeps) thousands of times faster than
+# real time and checks the rows logged, so the multi-day splits and the sleep detection can be verified without waiting
+# Also checks the storage on temporary files: crashes while saving/archiving, the caches after an edit in Excel,
+# the report totals and the dates read back from SQLite
+# Run: python simulate.py            -> runs the scenarios
+#      python simulate.py --years 10 -> also runs 10 simulated years of work days to benchmark the engine
+import datetime as dt
+import sys
+import time
+
+from clock import SimulatedClock
+from engine import TimerEngine, TimerStatus
+
+
+class Simulation:
+    def __init__(self, start: dt.datetime, tick_seconds=1) -> None:
+        """
+        :param start: dt.datetime the app is opened at
+        :param tick_seconds: tick interval of the app, the expected gap between the ticks (+ 0.5 buffer)
+        """
+        self.clock = SimulatedClock(start)
+        self.engine = TimerEngine(clock=self.clock, log_rows=self._log_rows, get_notes=lambda: self.notes,
+                                  on_day_logged=self._on_day_logged)
+        self.tick_seconds = tick_seconds
+        # the day shown in the app, same as TaskTimer.current_date
+        self.current_date = start.date()
+        self.notes = ""
+        # rows logged by the engine, in the order logged
+        self.rows = []
+        self.log_calls = 0
+        # number of the next logs to fail, e.g., to simulate the Excel file being open
+        self.fail_next_logs = 0
+        # log status of the last end()
+        self.last_end_status = None
+
+
+    def _log_rows(self, rows) -> bool:
+        # all or nothing, same as TaskTimer._log_rows_to_excel()
+        if self.fail_next_logs:
+            self.fail_next_logs -= 1
+            return False
+        self.rows += rows
+        # number of the log_rows calls, a multi-day split is logged in one call
+        self.log_calls += 1
+        return True
+
+
+    def _on_day_logged(self, work_minutes) -> None:
+        # same as TaskTimer._update_days_work_minutes_display(), the day shown moves to today on a task end
+        self.current_date = self.clock.now().date()
+
+
+    def _advance(self, seconds: float) -> None:
+        """
+        Moves the clock while the app is awake, the app ticks all through so no sleep is detected
+        """
+        self.clock.advance(seconds)
+        self.engine.tick(expected_interval=seconds + self.tick_seconds + 0.5)
+
+
+    def _next_day_change(self) -> float:
+        """
+        :return: monotonic time the app sees the new day, the app's MidnightScheduler fires at midnight
+        """
+        now = self.clock.now()
+        if self.current_date != now.date():
+            # the new day is already here (e.g., woke up from a sleep after midnight), the timer fires on wake up
+            return self.clock.monotonic()
+        next_midnight = dt.datetime.combine(now.date() + dt.timedelta(days=1), dt.time())
+        return self.clock.monotonic() + (next_midnight - now).total_seconds()
+
+
+    def _on_new_day(self) -> None:
+        # same as TaskTimer._on_new_day()
+        today = self.clock.now().date()
+        if self.current_date != today:
+            self.engine.on_new_day()
+            self.current_date = today
+
+
+    def select(self, task: str) -> None:
+        self.engine.current_task = task
+
+
+    def start(self, task=None) -> None:
+        self.engine.start(task)
+
+
+    # resuming is the same button (and method) as starting
+    resume = start
+
+
+    def pause(self) -> None:
+        self.engine.pause()
+
+
+    def end(self):
+        self.last_end_status = self.engine.end()
+        return self.last_end_status
+
+
+    def reset(self) -> None:
+        self.engine.reset()
+
+
+    def fail_logs(self, count: int) -> None:
+        """
+        The next count logs fail, e.g., the Excel file is open
+        """
+        self.fail_next_logs = count
+
+
+    def run(self, seconds: float) -> None:
+        """
+        Lets the app run (awake) for the seconds, seeing each new day at midnight the same way as the app
+        Jumps from one midnight to the next, so a run of days costs a few steps
+        """
+        end_mono = self.clock.monotonic() + seconds
+        while True:
+            new_day_mono = self._next_day_change()
+            if new_day_mono > end_mono:
+                break
+            self._advance(new_day_mono - self.clock.monotonic())
+            self._on_new_day()
+        self._advance(end_mono - self.clock.monotonic())
+
+
+    def until(self, moment: dt.datetime) -> None:
+        """
+        Runs till the wall-clock time
+        """
+        self.run((moment - self.clock.now()).total_seconds())
+
+
+    def sleep(self, seconds: float) -> None:
+        """
+        The system sleeps for the seconds, nothing runs in the app
+        On wake up, the first tick sees the suspend and the running task is ended at the tick before the sleep
+        """
+        self.clock.suspend(seconds)
+        self._late_tick()
+
+
+    def stall(self, seconds: float) -> None:
+        """
+        The Tk thread is busy for the seconds (e.g., a slow Excel save), the system is awake
+        The first tick after it sees the gap but no suspend, so the task keeps running
+        """
+        self.clock.advance(seconds)
+        self._late_tick()
+
+
+    def crash(self, seconds: float) -> None:
+        """
+        The app is killed and opened again after the seconds, the task is recovered from its checkpoint
+        the same way as TaskTimer._recover_from_checkpoint()
+        """
+        state = self.engine.to_state()
+        self.clock.advance(seconds)
+        self.engine = TimerEngine(clock=self.clock, log_rows=self._log_rows, get_notes=lambda: self.notes,
+                                  on_day_logged=self._on_day_logged)
+        self.engine.recover(state)
+        self.engine.on_new_day()
+        self.current_date = self.clock.now().date()
+
+
+    def _late_tick(self) -> None:
+        if self.engine.tick(expected_interval=self.tick_seconds + 0.5):
+            # same as TaskTimer._update_timer_display() -> _end_timer()
+            self.end()
+
+
+    def run_script(self, steps) -> list:
+        """
+        Runs the steps of a session
+        :param steps: list of (action, *args) e.g., [("start", "Task"), ("run", 3600), ("pause",), ("end",)]
+                      where action is any method of Simulation
+        :return: list of the rows logged
+        """
+        for action, *args in steps:
+            getattr(self, action)(*args)
+        return self.rows
+
+
+def _hours(hours: float) -> float:
+    return hours * 3600
+
+
+def _check_rows(name, rows, expected) -> None:
+    """
+    Checks the rows logged against the expected rows, only the keys in the expected rows are compared
+    """
+    assert len(rows) == len(expected), f"{name}: {len(rows)} rows logged, expected {len(expected)}\n{rows}"
+    for row_number, (row, expected_row) in enumerate(zip(rows, expected), start=1):
+        for key, value in expected_row.items():
+            assert row[key] == value, f"{name}: row {row_number} {key}={row[key]!r}, expected {value!r}\n{row}"
+
+
+def run_scenarios() -> int:
+    """
+    Runs the scripted sessions and checks the rows logged
+    :return: number of scenarios run
+    """
+    day_1 = dt.date(2025, 3, 10)
+    day_2 = day_1 + dt.timedelta(days=1)
+    day_3 = day_1 + dt.timedelta(days=2)
+
+    def at(day, hour, minute=0):
+        return dt.datetime.combine(day, dt.time(hour, minute))
+
+    # the app is opened at an odd second so that the ticks are not on the minute
+    app_start = at(day_1, 7, 58) + dt.timedelta(seconds=23)
+
+    scenarios = {
+        "same day with a pause": (
+            [("until", at(day_1, 9)), ("start", "Review"), ("run", _hours(1)), ("pause",), ("run", _hours(0.25)),
+             ("resume",), ("run", _hours(0.5)), ("end",)],
+            [dict(Date=day_1, Task="Review", Start_Time="09:00 AM", End_Time="10:45 AM",
+                  Work_Minutes=90, Pause_Minutes=15, Total_Minutes=105, Work_Duration="1h 30m",
+                  Pause_Duration="15m", Multi_day_Start="None")],
+        ),
+        "running across midnight": (
+            [("until", at(day_1, 23)), ("start", "Deploy"), ("run", _hours(2)), ("end",)],
+            [dict(Date=day_1, Start_Time="11:00 PM", End_Time="12:00 AM", Work_Minutes=60, Pause_Minutes=0,
+                  Multi_day_Start=f"{day_1}"),
+             dict(Date=day_2, Start_Time="12:00 AM", End_Time="01:00 AM", Work_Minutes=60, Pause_Minutes=0,
+                  Total_Minutes=60, Multi_day_Start=f"{day_1}")],
+        ),
+        "paused across midnight": (
+            [("until", at(day_1, 22)), ("start", "Report"), ("run", _hours(1)), ("pause",),
+             ("until", at(day_2, 1)), ("resume",), ("run", _hours(0.5)), ("end",)],
+            [dict(Date=day_1, Start_Time="10:00 PM", End_Time="12:00 AM", Work_Minutes=60, Pause_Minutes=60,
+                  Total_Minutes=120),
+             dict(Date=day_2, Start_Time="12:00 AM", End_Time="01:30 AM", Work_Minutes=30, Pause_Minutes=60,
+                  Total_Minutes=90)],
+        ),
+        "paused on the new day": (
+            [("until", at(day_1, 23)), ("start", "Notes"), ("run", _hours(1.5)), ("pause",), ("run", _hours(1)),
+             ("resume",), ("run", _hours(0.5)), ("end",)],
+            [dict(Date=day_1, Work_Minutes=60, Pause_Minutes=0, Total_Minutes=60),
+             dict(Date=day_2, Start_Time="12:00 AM", End_Time="02:00 AM", Work_Minutes=60, Pause_Minutes=60,
+                  Total_Minutes=120)],
+        ),
+        "running for 3 days": (
+            [("until", at(day_1, 20)), ("start", "Migration"), ("run", _hours(50)), ("end",)],
+            [dict(Date=day_1, Work_Minutes=240, Multi_day_Start=f"{day_1}"),
+             dict(Date=day_2, Work_Minutes=1440, Total_Minutes=1440, Multi_day_Start=f"{day_1}"),
+             dict(Date=day_3, Work_Minutes=1320, End_Time="10:00 PM", Multi_day_Start=f"{day_1}")],
+        ),
+        "system sleep ends the task": (
+            [("until", at(day_1, 10)), ("start", "Email"), ("run", _hours(0.5)), ("sleep", _hours(2)),
+             ("run", _hours(1))],
+            [dict(Date=day_1, Start_Time="10:00 AM", End_Time="10:30 AM", Work_Minutes=30, Pause_Minutes=0)],
+        ),
+        "system sleep over midnight": (
+            [("until", at(day_1, 23)), ("start", "Late"), ("run", _hours(0.5)), ("sleep", _hours(8)),
+             ("run", _hours(1))],
+            [dict(Date=day_1, Start_Time="11:00 PM", End_Time="11:30 PM", Work_Minutes=30, Pause_Minutes=0,
+                  Multi_day_Start="None")],
+        ),
+        "busy Tk thread keeps the task": (
+            [("until", at(day_1, 11)), ("start", "Big save"), ("run", _hours(0.5)), ("stall", 45),
+             ("run", _hours(0.5) - 45), ("end",)],
+            [dict(Date=day_1, Start_Time="11:00 AM", End_Time="12:00 PM", Work_Minutes=60, Pause_Minutes=0)],
+        ),
+        "failed log is retried on end": (
+            # the end fails and the task is kept paused, the next end logs it (the retry time counts as pause)
+            [("until", at(day_1, 14)), ("start", "Excel open"), ("run", _hours(1)), ("fail_logs", 1), ("end",),
+             ("run", _hours(0.25)), ("end",)],
+            [dict(Date=day_1, Start_Time="02:00 PM", End_Time="03:15 PM", Work_Minutes=60, Pause_Minutes=15)],
+        ),
+        "crash recovered days later": (
+            # the midnights missed while the app was not running are logged one row per day on the recovery
+            [("until", at(day_1, 9)), ("start", "Thesis"), ("run", _hours(1)), ("crash", _hours(72)),
+             ("resume",), ("run", _hours(1)), ("end",)],
+            [dict(Date=day_1, Start_Time="09:00 AM", End_Time="12:00 AM", Work_Minutes=60, Pause_Minutes=840),
+             dict(Date=day_2, Work_Minutes=0, Pause_Minutes=1440, Multi_day_Start=f"{day_1}"),
+             dict(Date=day_3, Work_Minutes=0, Pause_Minutes=1440, Multi_day_Start=f"{day_1}"),
+             dict(Date=day_3 + dt.timedelta(days=1), Start_Time="12:00 AM", End_Time="11:00 AM", Work_Minutes=60,
+                  Pause_Minutes=600, Multi_day_Start=f"{day_1}")],
+        ),
+        "crash recovered days later and ended": (
+            # ended without resuming, the task ends on the day it was recovered on, not before its day started
+            [("until", at(day_1, 9)), ("start", "Thesis"), ("run", _hours(1)), ("crash", _hours(48)), ("end",)],
+            [dict(Date=day_1, Work_Minutes=60, Pause_Minutes=840),
+             dict(Date=day_2, Work_Minutes=0, Pause_Minutes=1440),
+             dict(Date=day_3, Start_Time="12:00 AM", End_Time="12:00 AM", Work_Minutes=0, Pause_Minutes=0)],
+        ),
+        "failed split is logged whole on end": (
+            # the log of the previous day fails at midnight, the end logs both days in one go
+            [("until", at(day_1, 23)), ("start", "Backup"), ("run", _hours(0.5)), ("fail_logs", 1),
+             ("run", _hours(1.5)), ("end",)],
+            [dict(Date=day_1, Start_Time="11:00 PM", End_Time="12:00 AM", Work_Minutes=60, Multi_day_Start=f"{day_1}"),
+             dict(Date=day_2, Start_Time="12:00 AM", End_Time="01:00 AM", Work_Minutes=60, Multi_day_Start=f"{day_1}")],
+        ),
+    }
+
+    for name, (steps, expected) in scenarios.items():
+        simulation = Simulation(app_start)
+        simulation.run_script(steps)
+        _check_rows(name, simulation.rows, expected)
+        assert simulation.engine.status == TimerStatus.STOPPED, f"{name}: timer not stopped"
+        print(f"ok  {name}")
+
+    return len(scenarios)
+
+
+def run_crash_scenarios() -> int:
+    """
+    Crashes of the app in the middle of writing the journal to a real (temporary) Excel file
+    :return: number of scenarios run
+    """
+    import os
+    import tempfile
+
+    from storage import ExcelStorage
+    from workbook import iter_records
+
+    class _Crash(Exception):
+        pass
+
+    def crash_after_save(storage):
+        write_rows = storage._write_rows
+
+        def write_rows_and_crash(rows, batch=None):
+            write_rows(rows, batch)
+            # the app dies here, before the journal is cleared
+            raise _Crash()
+        return write_rows_and_crash
+
+    name = "crash after the save does not write the rows twice"
+    with tempfile.TemporaryDirectory() as folder:
+        excel_file = os.path.join(folder, "Time_Keeper.xlsx")
+        storage = ExcelStorage(excel_file)
+        storage.append_rows([("Time", dict(Date=dt.date(2025, 3, 10), Task="Study", Work_Minutes=30))])
+        try:
+            storage.journal.compact(crash_after_save(storage))
+        except _Crash:
+            pass
+        assert storage.journal.has_pending(), f"{name}: journal cleared before the crash"
+
+        # next start of the app: the rows left in the journal are already in the Excel file
+        storage = ExcelStorage(excel_file)
+        storage.append_rows([("Time", dict(Date=dt.date(2025, 3, 10), Task="Study", Work_Minutes=15))])
+        assert storage.flush(), f"{name}: journal not written"
+        rows = list(iter_records(excel_file, "Time"))
+        _check_rows(name, rows, [dict(Task="Study", Work_Minutes=30), dict(Task="Study", Work_Minutes=15)])
+        assert storage.day_work_minutes(dt.date(2025, 3, 10)) == 45, f"{name}: day total"
+    print(f"ok  {name}")
+
+    return 1
+
+
+def run_storage_scenarios() -> int:
+    """
+    Queries and caches of the Time sheet on real (temporary) Excel/SQLite files
+    :return: number of scenarios run
+    """
+    import os
+    import tempfile
+
+    import shards
+    from openpyxl import load_workbook
+    from query import TimeIndex
+    from storage import ExcelStorage, SQLiteStorage, open_storage
+    from workbook import iter_records
+
+    scenarios_count = 0
+
+    name = "totals grouped by day, week and month"
+    # Fri 2025-01-31 and Sat 2025-02-01 are in the same week (Monday 2025-01-27) but not in the same month
+    index = TimeIndex([dict(Date=dt.date(2025, 1, 31), Task="Study", Work_Minutes=30, Pause_Minutes=5, Total_Minutes=35),
+                       dict(Date=dt.date(2025, 2, 1), Task="Work", Work_Minutes=60, Pause_Minutes=0, Total_Minutes=60),
+                       dict(Date=dt.date(2025, 2, 1), Task="Study", Work_Minutes=15, Pause_Minutes=0, Total_Minutes=15),
+                       # added out of the date order, as after an import
+                       dict(Date=dt.date(2025, 1, 27), Task="Work", Work_Minutes=45, Pause_Minutes=15, Total_Minutes=60),
+                       dict(Date=dt.date(2025, 2, 3), Task="Work", Work_Minutes=20, Pause_Minutes=0, Total_Minutes=20),
+                       dict(Date="not a date", Task="Work", Work_Minutes=999)])
+    assert index.totals(group_by="day") == {
+        dt.date(2025, 1, 27): dict(work=45, pause=15, total=60), dt.date(2025, 1, 31): dict(work=30, pause=5, total=35),
+        dt.date(2025, 2, 1): dict(work=75, pause=0, total=75), dt.date(2025, 2, 3): dict(work=20, pause=0, total=20),
+    }, f"{name}: day"
+    assert index.totals(group_by="week") == {
+        dt.date(2025, 1, 27): dict(work=150, pause=20, total=170), dt.date(2025, 2, 3): dict(work=20, pause=0, total=20),
+    }, f"{name}: week"
+    assert index.totals(group_by="month") == {
+        dt.date(2025, 1, 1): dict(work=75, pause=20, total=95), dt.date(2025, 2, 1): dict(work=95, pause=0, total=95),
+    }, f"{name}: month"
+    assert index.totals(dt.date(2025, 1, 28), dt.date(2025, 2, 1), group_by="month", task="Study") == {
+        dt.date(2025, 1, 1): dict(work=30, pause=5, total=35), dt.date(2025, 2, 1): dict(work=15, pause=0, total=15),
+    }, f"{name}: month of a task from start to end"
+    print(f"ok  {name}")
+    scenarios_count += 1
+
+    name = "Excel file edited outside the app rebuilds the columns and the day index"
+    with tempfile.TemporaryDirectory() as folder:
+        excel_file = os.path.join(folder, "Time_Keeper.xlsx")
+        storage = ExcelStorage(excel_file)
+        storage.append_rows([("Time", dict(Date=dt.date(2025, 3, 10), Task="Study", Work_Minutes=30)),
+                             ("Time", dict(Date=dt.date(2025, 3, 11), Task="Work", Work_Minutes=60))])
+        assert storage.flush(), f"{name}: journal not written"
+        assert storage.day_work_minutes(dt.date(2025, 3, 10)) == 30, f"{name}: day total before the edit"
+
+        # edited in Excel: the first row's minutes changed (not a row added at the end) and saved over the file
+        wb = load_workbook(excel_file)
+        sheet = wb["Time"]
+        headers = [cell.value for cell in sheet[1]]
+        sheet.cell(row=2, column=headers.index("Work_Minutes") + 1, value=90)
+        wb.save(excel_file + ".tmp")
+        wb.close()
+        os.replace(excel_file + ".tmp", excel_file)
+
+        assert storage.day_work_minutes(dt.date(2025, 3, 10)) == 90, f"{name}: day total after the edit"
+        assert [row["Work_Minutes"] for row in storage.time_columns.iter_rows()] == [90, 60], f"{name}: columns"
+        assert storage.time_index().totals(group_by="task") == {
+            "Study": dict(work=90, pause=0, total=0), "Work": dict(work=60, pause=0, total=0)}, f"{name}: time index"
+        # a new session trusts the saved index and columns, as they are in sync with the edited file
+        storage = ExcelStorage(excel_file)
+        assert storage.day_work_minutes(dt.date(2025, 3, 10)) == 90, f"{name}: day total on the next start"
+    print(f"ok  {name}")
+    scenarios_count += 1
+
+    name = "crash during the archival does not archive the rows twice"
+    with tempfile.TemporaryDirectory() as folder:
+        excel_file = os.path.join(folder, "Time_Keeper.xlsx")
+        storage = ExcelStorage(excel_file)
+        storage.append_rows([("Time", dict(Date=dt.date(2022, 5, 1), Task="Study", Work_Minutes=10)),
+                             ("Time", dict(Date=dt.date(2022, 6, 1), Task="Study", Work_Minutes=20)),
+                             ("Time", dict(Date=dt.date(2024, 6, 1), Task="Work", Work_Minutes=40)),
+                             ("Time", dict(Date=dt.date(2025, 3, 10), Task="Work", Work_Minutes=50))])
+        assert storage.flush(), f"{name}: journal not written"
+        policy = shards.ShardPolicy(period="year", keep_closed=1)
+        today = dt.date(2025, 3, 10)
+
+        # the app dies after the archive and the manifest are saved, before the Excel file without the rows is saved
+        save_workbook = shards._save_workbook
+
+        def save_and_crash(wb, file_name):
+            if file_name == excel_file:
+                raise OSError("crash")
+            save_workbook(wb, file_name)
+        shards._save_workbook = save_and_crash
+        try:
+            shards.archive_closed_periods(excel_file, policy, today=today)
+        except OSError:
+            pass
+        finally:
+            shards._save_workbook = save_workbook
+        assert shards.load_manifest(excel_file)["pending_cleanup"] == {"2022": 2}, f"{name}: pending cleanup"
+        assert len(list(iter_records(excel_file, "Time"))) == 4, f"{name}: rows removed before the crash"
+
+        # next run: the rows already in the archive are only removed from the Excel file
+        assert shards.archive_closed_periods(excel_file, policy, today=today) == {}, f"{name}: archived again"
+        manifest = shards.load_manifest(excel_file)
+        assert manifest["pending_cleanup"] == {}, f"{name}: pending cleanup not cleared"
+        assert manifest["periods"]["2022"]["rows"] == 2, f"{name}: manifest rows"
+        archive_file = os.path.join(shards.archive_dir(excel_file), "Time_2022.xlsx")
+        _check_rows(name, list(iter_records(archive_file, "Time")),
+                    [dict(Date=dt.date(2022, 5, 1), Work_Minutes=10), dict(Date=dt.date(2022, 6, 1), Work_Minutes=20)])
+        _check_rows(name, list(iter_records(excel_file, "Time")),
+                    [dict(Date=dt.date(2024, 6, 1), Work_Minutes=40), dict(Date=dt.date(2025, 3, 10), Work_Minutes=50)])
+        # reports still see the archived rows
+        assert ExcelStorage(excel_file).time_index().totals(group_by="task") == {
+            "Study": dict(work=30, pause=0, total=0), "Work": dict(work=90, pause=0, total=0)}, f"{name}: report"
+    print(f"ok  {name}")
+    scenarios_count += 1
+
+    name = "SQLite reads Date and Multi_day_Start back as they were logged"
+    with tempfile.TemporaryDirectory() as folder:
+        excel_file = os.path.join(folder, "Time_Keeper.xlsx")
+        database_file = os.path.join(folder, "Time_Keeper.db")
+        rows = [dict(Date=dt.date(2025, 3, 9), Task="Study", Work_Minutes=30, Multi_day_Start=dt.date(2025, 3, 8)),
+                # as logged by the engine, Multi_day_Start is text
+                dict(Date=dt.date(2025, 3, 10), Task="Work", Work_Minutes=60, Multi_day_Start="None"),
+                # a datetime at midnight (imported from Excel) is a date
+                dict(Date=dt.datetime(2025, 3, 11), Task="Work", Work_Minutes=15, Multi_day_Start=dt.datetime(2025, 3, 10))]
+        database = SQLiteStorage(database_file, excel_file)
+        assert database.append_rows([("Time", row) for row in rows]), f"{name}: rows not written"
+        database.close()
+
+        # read back by a new session, from the declared column types
+        database = SQLiteStorage(database_file, excel_file)
+        _check_rows(name, database._records("Time"),
+                    [dict(Date=dt.date(2025, 3, 9), Multi_day_Start=dt.date(2025, 3, 8)),
+                     dict(Date=dt.date(2025, 3, 10), Multi_day_Start="None"),
+                     dict(Date=dt.date(2025, 3, 11), Multi_day_Start=dt.date(2025, 3, 10))])
+        assert database.day_work_minutes(dt.date(2025, 3, 10)) == 60, f"{name}: day total"
+        assert list(database.time_index(dt.date(2025, 3, 10), dt.date(2025, 3, 11)).totals(group_by="day")) == [
+            dt.date(2025, 3, 10), dt.date(2025, 3, 11)], f"{name}: date range"
+        database.close()
+    print(f"ok  {name}")
+    scenarios_count += 1
+
+    name = "moving to SQLite keeps the dates of the Excel file as dates"
+    with tempfile.TemporaryDirectory() as folder:
+        excel_file = os.path.join(folder, "Time_Keeper.xlsx")
+        storage = ExcelStorage(excel_file)
+        storage.append_rows([("Time", dict(Date=dt.date(2025, 3, 9), Task="Study", Work_Minutes=30,
+                                           Multi_day_Start=dt.date(2025, 3, 8))),
+                             ("Time", dict(Date=dt.date(2025, 3, 10), Task="Work", Work_Minutes=60,
+                                           Multi_day_Start="None"))])
+        assert storage.flush(), f"{name}: journal not written"
+        # openpyxl reads the dates back as datetimes at midnight, iter_records() and the import keep them dates
+        database = open_storage(excel_file, "sqlite")
+        assert isinstance(database, SQLiteStorage), f"{name}: database not created"
+        _check_rows(name, database._records("Time"),
+                    [dict(Date=dt.date(2025, 3, 9), Multi_day_Start=dt.date(2025, 3, 8)),
+                     dict(Date=dt.date(2025, 3, 10), Multi_day_Start="None")])
+        assert all(type(row["Date"]) is dt.date for row in database._records("Time")), f"{name}: datetime stored"
+        database.close()
+    print(f"ok  {name}")
+    scenarios_count += 1
+
+    return scenarios_count
+
+
+def run_years(years: int) -> None:
+    """
+    Benchmark: work days (with a break) and an overnight task every Friday for the years
+    Prints the rows logged and how much faster than real time the engine ran
+    """
+    start = dt.datetime(2025, 1, 1, 8, 30, 17)
+    simulation = Simulation(start)
+    day = start.date()
+    end_day = day + dt.timedelta(days=365 * years)
+
+    perf_start = time.perf_counter()
+    while day < end_day:
+        if day.weekday() < 5:
+            simulation.until(dt.datetime.combine(day, dt.time(9)))
+            simulation.start("Work")
+            simulation.run(_hours(3))
+            simulation.pause()
+            simulation.run(_hours(1))
+            simulation.resume()
+            simulation.run(_hours(4.5))
+            simulation.end()
+            if day.weekday() == 4:
+                simulation.until(dt.datetime.combine(day, dt.time(22)))
+                simulation.start("Overnight")
+                simulation.run(_hours(5))
+                simulation.end()
+        day += dt.timedelta(days=1)
+    perf_seconds = time.perf_counter() - perf_start
+
+    simulated_seconds = (simulation.clock.now() - start).total_seconds()
+    work_minutes = sum(row["Work_Minutes"] for row in simulation.rows)
+    print(f"{years} simulated year(s): {len(simulation.rows)} rows, {work_minutes / 60:.0f} work hours "
+          f"in {perf_seconds:.2f}s -> {simulated_seconds / perf_seconds:,.0f}x real time")
+
+
+if __name__ == "__main__":
+    scenarios_count = run_scenarios() + run_crash_scenarios() + run_storage_scenarios()
+    print(f"{scenarios_count} scenarios passed")
+    if "--years" in sys.argv:
+        run_years(int(sys.argv[sys.argv.index("--years") + 1]))
@@ -0,0 +1,83 @@
+# Shared, parsed copy of the sheets of the Excel file
+# Every reader of the Excel file (task list, day index, ...) goes through this, so each sheet
+# is parsed at most once for each version of the file instead of once per reader/call
+import threading
+
+from metrics import metrics
+from workbook import file_fingerprint, iter_records
+
+
+class WorkbookSnapshot:
+    def __init__(self, excel_file) -> None:
+        self.excel_file = excel_file
+        # version of the Excel file ([mtime_ns, size, inode]) the cached sheets belong to
+        self.fingerprint = None
+        # sheet name -> list of row dicts (header -> cell value)
+        self.sheets = {}
+        # the snapshot is updated from the background compaction thread and read from the UI thread
+        self.lock = threading.Lock()
+
+
+    def records(self, sheet_name):
+        """
+        Rows of the sheet as dicts, parsed from the Excel file only if the file changed since the last parse
+        The returned list and dicts are shared between the readers, so they must not be modified
+        :param sheet_name: str
+        :return: list of dicts, empty if the file or the sheet does not exist
+        """
+        fingerprint = file_fingerprint(self.excel_file)
+        with self.lock:
+            if fingerprint != self.fingerprint:
+                # the file was saved (by the app or in Excel) or deleted, drop all the cached sheets
+                self.sheets = {}
+                self.fingerprint = fingerprint
+
+            if sheet_name not in self.sheets:
+                with metrics.timer("snapshot.parse"):
+                    self.sheets[sheet_name] = list(iter_records(self.excel_file, sheet_name))
+            else:
+                metrics.count("snapshot.hits")
+            return self.sheets[sheet_name]
+
+
+    def cached_records(self, sheet_name, fingerprint=None):
+        """
+        Rows of the sheet as parsed before, without reading the Excel file
+        :param fingerprint: version of the Excel file the rows must be of, None for the last version parsed
+                            (e.g., while the app is saving the file)
+        :return: list of dicts as records() or None if the sheet is not parsed (for that version)
+        """
+        with self.lock:
+            if self.fingerprint is None or (fingerprint is not None and fingerprint != self.fingerprint):
+                return None
+            return self.sheets.get(sheet_name)
+
+
+    def apply_write(self, old_fingerprint, new_fingerprint, appended_rows=(), updated_rows=None) -> None:
+        """
+        Updates the cached sheets with a write done by the app, so that the app's own saves don't force a re-parse
+        If the snapshot was not of the file version before the write, it is just dropped
+        :param old_fingerprint: file_fingerprint() before the write
+        :param new_fingerprint: file_fingerprint() after the write
+        :param appended_rows: list of (sheet_name, row_dict) appended by the write
+        :param updated_rows: dict sheet name -> (key column, {key value: {column: new value}}), for workbook.update_cells()
+        """
+        with self.lock:
+            if old_fingerprint != self.fingerprint:
+                self.sheets = {}
+                self.fingerprint = None
+                return
+
+            new_sheets = {}
+            for sheet_name, row in appended_rows:
+                if sheet_name in self.sheets:
+                    # a new list, as the readers may still be holding the old one
+                    new_sheets.setdefault(sheet_name, list(self.sheets[sheet_name])).append(row)
+            self.sheets.update(new_sheets)
+            for sheet_name, (key_column, updates) in (updated_rows or {}).items():
+                if sheet_name in self.sheets:
+                    # new dicts for the changed rows only, the readers may still be holding the old ones
+                    self.sheets[sheet_name] = [
+                        {**row, **updates[str(row.get(key_column))]} if str(row.get(key_column)) in updates else row
+                        for row in self.sheets[sheet_name]]
+            self.fingerprint = new_fingerprint
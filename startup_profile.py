@@ -0,0 +1,42 @@
+# Measures the time taken by each phase of the app startup (imports -> first rendered frame)
+# Enabled by running the app with --startup-profile, e.g., python main.py --startup-profile
+import sys
+import time
+
+
+class StartupProfile:
+    def __init__(self, enabled=False) -> None:
+        self.enabled = enabled
+        # list of (phase name, seconds taken by the phase)
+        self.phases = []
+        self.start_time = time.perf_counter()
+        self.last_mark_time = self.start_time
+
+
+    def mark(self, phase: str) -> None:
+        """
+        Records the time since the previous mark as the duration of the phase
+        :param phase: str name of the phase that just finished
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark_time))
+        self.last_mark_time = now
+
+
+    def report(self) -> str:
+        """
+        :return: str table of phase durations in ms, with the heavy modules that got imported during the startup
+        """
+        lines = ["Startup profile", "-" * 44]
+        for phase, seconds in self.phases:
+            lines.append(f"{phase:<32}{seconds * 1000:>9.1f} ms")
+        lines.append("-" * 44)
+        lines.append(f"{'Total':<32}{(self.last_mark_time - self.start_time) * 1000:>9.1f} ms")
+
+        # to catch a heavy module getting imported on the startup path again
+        heavy_modules = ["pandas", "numpy", "openpyxl", "PIL", "pystray"]
+        loaded = [module for module in heavy_modules if module in sys.modules]
+        lines.append(f"Heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+        return "\n".join(lines)
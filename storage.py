@@ -0,0 +1,812 @@
+# Storage backends of the app, i.e., where the tasks and the time logs live
+# ExcelStorage  -> Time_Keeper.xlsx is the live store: rows go to the journal and are written by the excel_writer thread,
+#                  the day's total and the task list come from the caches next to the Excel file (day index, columns, snapshot)
+# SQLiteStorage -> Time_Keeper.db (sqlite3) is the live store: each log is an indexed insert, each lookup an indexed query,
+#                  whatever the size of the history, and Time_Keeper.xlsx is only written on demand (export_to_excel())
+# TaskTimer and cli.py only use the methods of Storage, the backend is picked once by open_storage()
+import datetime as dt
+import itertools
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from columnar import ColumnarCache
+from day_index import DayIndex
+from journal import Journal
+from metrics import metrics
+from shards import ShardPolicy, archive_closed_periods, needs_archival
+from snapshot import WorkbookSnapshot
+from workbook import append_rows, file_fingerprint, iter_records, sheet_info, update_cells
+from writer import ExcelWriter
+
+BACKENDS = ("excel", "sqlite")
+
+
+class Storage(ABC):
+    """
+    Methods every backend has, the rows are dicts column header -> cell value, same as the rows of the Excel sheets
+    """
+    def __init__(self, excel_file, tasks_sheet="Tasks", time_sheet="Time") -> None:
+        self.excel_file = excel_file
+        self.tasks_sheet = tasks_sheet
+        self.time_sheet = time_sheet
+
+
+    def start(self) -> None:
+        """
+        Starts the background work of the backend, if any, called once the app is up (not by cli.py)
+        """
+
+
+    @abstractmethod
+    def append_rows(self, rows) -> bool:
+        """
+        Appends the rows to one or more sheets, all or nothing
+        :param rows: list of (sheet_name, row_dict) in the order they have to be written
+        :return: True if all the rows are safely on the disk, False otherwise
+        """
+        raise NotImplementedError
+
+
+    @abstractmethod
+    def task_records(self, strict=False) -> list:
+        """
+        :param strict: raise the read errors instead of listing the tasks that could be read,
+                       e.g., on a reload, so that a file being saved in Excel does not empty the task list
+        :return: list of the rows of the Tasks sheet as new dicts (safe to change), in the order they were added
+        """
+        raise NotImplementedError
+
+
+    def watch_file(self):
+        """
+        File that can be edited outside the app while it is open (e.g., in Excel), watched by watcher.py
+        :return: str path, or None if the app's data can't be changed outside the app
+        """
+        return None
+
+
+    @abstractmethod
+    def day_work_minutes(self, date) -> int:
+        """
+        Total work minutes logged for the date
+        :param date: dt.date
+        """
+        raise NotImplementedError
+
+
+    @abstractmethod
+    def update_cells(self, sheet_name, key_column, updates):
+        """
+        Changes only the given cells of the rows matched by their key, same as workbook.update_cells()
+        Raises IOError if the rows logged so far could not be written first
+        :param updates: dict key value -> {column header: new value}
+        :return: int number of rows updated, None if the sheet or the key column does not exist
+        """
+        raise NotImplementedError
+
+
+    def update_cells_in_background(self, sheet_name, key_column, updates, on_result) -> None:
+        """
+        update_cells() on the thread of the backend that writes its store, if it has one (so that the UI does not wait
+        for the save), else right away on the calling thread
+        :param on_result: callable(updated_count, error) called once done, error is the exception raised or None,
+                          on the thread it ran on, the UI must hand it over to the Tk thread (it's not thread safe)
+        """
+        try:
+            updated_count = self.update_cells(sheet_name, key_column, updates)
+        except Exception as e:
+            on_result(None, e)
+            return
+        on_result(updated_count, None)
+
+
+    @abstractmethod
+    def time_index(self, start=None, end=None, task=None):
+        """
+        :return: query.TimeIndex with (at least) the Time rows from start to end (both included), of the task if given
+        """
+        raise NotImplementedError
+
+
+    def flush(self) -> bool:
+        """
+        Writes the rows held back by the backend (if any) to its store
+        :return: True if all the rows logged so far are in the store
+        """
+        return True
+
+
+    @abstractmethod
+    def export(self, export_file, on_progress=None) -> int:
+        """
+        Writes the Tasks and the Time sheets with all the rows logged so far to an xlsx file, streamed (export.py)
+        e.g., a single file with the whole history for Power BI
+        :param on_progress: callable(rows_done, rows_total) called on the calling thread, see export.export_workbook()
+        :return: int number of rows exported
+        :raises OSError: if the export file could not be written, e.g., it is open in Excel
+        """
+        raise NotImplementedError
+
+
+    @abstractmethod
+    def export_to_excel(self, on_progress=None) -> bool:
+        """
+        Brings the Excel file up to date with all the rows logged so far, e.g., before it is opened in Excel
+        Can take a while for a big history, the app runs it on a background thread
+        :param on_progress: see export()
+        :return: True if the Excel file is up to date
+        """
+        raise NotImplementedError
+
+
+    def has_periods_to_archive(self) -> bool:
+        """
+        Cheap check if archive_old_periods() has something to do
+        """
+        return False
+
+
+    def archive_old_periods(self) -> dict:
+        """
+        Moves the closed periods out of the live store, see shards.py
+        :return: dict period -> rows archived
+        """
+        return {}
+
+
+    def close(self, timeout=None) -> None:
+        """
+        Stops the background work and releases the store, the rows held back are not written (see flush())
+        """
+
+
+class ExcelStorage(Storage):
+    def __init__(self, excel_file, tasks_sheet="Tasks", time_sheet="Time", on_write_result=None) -> None:
+        """
+        :param on_write_result: callable(is_saved, rows_count, retry_in) called on the excel_writer thread after each save
+        """
+        super().__init__(excel_file, tasks_sheet, time_sheet)
+        base_name = os.path.splitext(excel_file)[0]
+        # rows are appended to this journal and written to the Excel file later on idle, as saving the Excel is slow
+        self.journal = Journal(base_name + ".journal")
+        # day -> work minutes index saved next to the Excel file, synced in day_work_minutes()
+        self.day_index = DayIndex(base_name + ".dayindex.json")
+        # Time sheet columns saved next to the Excel file, synced in day_work_minutes() and the day index is built from it
+        self.time_columns = ColumnarCache(base_name + ".columns")
+        # every read of the Excel file goes through this so that each sheet is parsed once per file version
+        self.workbook_snapshot = WorkbookSnapshot(excel_file)
+        # the Time sheet keeps this year and last year, older years are moved to Time_Keeper_archive/Time_<year>.xlsx
+        self.shard_policy = ShardPolicy(period="year", keep_closed=1)
+        # writes the journal to the Excel file on a separate thread, retries if the Excel file is open/locked
+        self.excel_writer = ExcelWriter(self.journal, self._write_rows,
+                                        on_result=on_write_result or (lambda is_saved, rows_count, retry_in: None))
+
+
+    def start(self) -> None:
+        self.excel_writer.start()
+        # write any rows left in the journal from the last session (e.g., app crashed or Excel was open on quit)
+        if self.journal.has_pending():
+            self.excel_writer.submit()
+
+
+    def append_rows(self, rows) -> bool:
+        """
+        The rows are appended to the journal as one batch (a single line), so either all of them or none are logged,
+        and are written to the Excel file with a single load and save by the excel_writer thread
+        """
+        append_status = self.journal.append_rows(rows)
+        if append_status:
+            # keep the day index up-to-date so that the day's total never needs a read of the Time sheet
+            for sheet_name, row in rows:
+                if sheet_name == self.time_sheet:
+                    self.day_index.add_pending(row)
+                    self.time_columns.append(row)
+            self.excel_writer.submit(rows)
+        return append_status
+
+
+    def _write_rows(self, rows, batch=None):
+        """
+        Writes the rows from the journal to the Excel file with a single load and save
+        :param rows: list of (sheet_name, row_dict)
+        :param batch: str id of the journal batch, see Journal.compact()
+        :returns: callable() that updates the caches to the saved file, called by the journal, or None on failure
+        """
+        old_fingerprint = file_fingerprint(self.excel_file)
+        with metrics.timer("excel_write"):
+            if not append_rows(self.excel_file, rows, batch=batch):
+                return None
+        new_fingerprint = file_fingerprint(self.excel_file)
+
+        def commit():
+            # unchanged file -> the batch was saved before a crash, the caches are synced from the file as it changed since
+            if new_fingerprint == old_fingerprint:
+                return
+            # the Time rows are already in the day index (as pending), mark them as written
+            # along with the new fingerprint so that the index stays valid for the saved file
+            time_rows = [row for sheet_name, row in rows if sheet_name == self.time_sheet]
+            self.day_index.mark_written(time_rows, old_fingerprint, new_fingerprint)
+            self.time_columns.mark_written(time_rows, old_fingerprint, new_fingerprint)
+            # add the rows to the parsed sheets so that our own save does not need a re-parse
+            self.workbook_snapshot.apply_write(old_fingerprint, new_fingerprint, appended_rows=rows)
+        return commit
+
+
+    def task_records(self, strict=False) -> list:
+        """
+        Tasks sheet rows from the Excel file (parsed only if the file changed since the last read)
+        and the tasks still in the journal
+        """
+        # the tasks parsed before, if the file is unchanged or the app is saving it right now (the save is not waited for)
+        # under the journal's lock, so that a task being written to the Excel is not listed twice (journal + Excel)
+        with self.journal.lock:
+            fingerprint = None if self.journal.is_saving else file_fingerprint(self.excel_file)
+            task_records = self.workbook_snapshot.cached_records(self.tasks_sheet, fingerprint=fingerprint)
+            if task_records is not None:
+                # copy the dicts as the snapshot is shared and the task status is changed in the Manage Tasks window
+                return [dict(task_item) for task_item in task_records] + self.journal.pending_rows(self.tasks_sheet)
+
+        task_records = []
+        # the file changed outside the app (or is not parsed yet), hold the compaction lock so that it is not saved
+        # while it is parsed
+        with self.journal.compact_lock:
+            if os.path.exists(self.excel_file) and os.path.getsize(self.excel_file) > 0:
+                try:
+                    # copy the dicts as the snapshot is shared and the task status is changed in the Manage Tasks window
+                    task_records = [dict(task_item) for task_item in self.workbook_snapshot.records(self.tasks_sheet)]
+                    if not task_records:
+                        print(f"{self.excel_file} exists but contains no data.")
+                except Exception as e:
+                    if strict:
+                        raise
+                    # the tasks in the journal are still listed
+                    print(f"An unexpected error occurred while getting the task list: {e}")
+            else:
+                print(f"{self.excel_file} doesn't exist or is empty.")
+
+            return task_records + self.journal.pending_rows(self.tasks_sheet)
+
+
+    def watch_file(self):
+        # the tasks can be edited in the Excel file, e.g., a task renamed while the app is open
+        return self.excel_file
+
+
+    def day_work_minutes(self, date) -> int:
+        """
+        From the day index, the Time sheet is read only if the Excel was changed outside the app
+        Rows logged to the journal but not yet written to the Excel are also counted
+        """
+        # the index is up-to-date with the file, or the app is saving it right now and the index is as of before the save
+        # (its rows are still pending in the journal), under the journal's lock so that a row is not counted twice
+        with self.journal.lock:
+            if self.day_index.fingerprint is not None and (
+                    self.journal.is_saving or self.day_index.fingerprint == file_fingerprint(self.excel_file)):
+                return self.day_index.day_total(date)
+
+        # the file changed outside the app (or the index is not loaded yet), hold the compaction lock
+        # so that the file is not saved while it is read
+        with self.journal.compact_lock:
+            fingerprint = file_fingerprint(self.excel_file)
+            pending_rows = self.journal.pending_rows(self.time_sheet)
+            # streamed and not cached in the workbook_snapshot as the Time sheet can be huge
+            # and the columns/index are the cache of the Time sheet
+            read_rows = lambda: iter_records(self.excel_file, self.time_sheet)
+            try:
+                # reads the Time sheet only if it was changed outside the app
+                self.time_columns.sync(fingerprint=fingerprint, read_rows=read_rows, pending_rows=pending_rows)
+                # the day index is then synced from the columns and not from the Excel file
+                read_rows = self.time_columns.iter_rows
+            except Exception as e:
+                print(f"An unexpected error occurred while syncing the Time sheet columns: {e}")
+            try:
+                self.day_index.sync(fingerprint=fingerprint, read_rows=read_rows, pending_rows=pending_rows)
+            except Exception as e:
+                # catch any errors on reading the Excel file, index will be synced on the next call
+                print(f"An unexpected error occurred while getting the Time list: {e}")
+
+        return self.day_index.day_total(date)
+
+
+    def update_cells(self, sheet_name, key_column, updates):
+        # the rows still in the journal are not in the Excel yet,
+        # so write them to the Excel first, else their change would not find a row to update
+        if not self.flush():
+            raise IOError(f"Could not write the journal to '{self.excel_file}'")
+
+        # no background compaction saves the file in between, and the readers use their caches meanwhile
+        with self.journal.saving():
+            old_fingerprint = file_fingerprint(self.excel_file)
+            updated_count = update_cells(self.excel_file, sheet_name, key_column, updates)
+            if updated_count is None:
+                return None
+
+            new_fingerprint = file_fingerprint(self.excel_file)
+            with self.journal.lock:
+                # the rows and columns of the Time sheet are unchanged unless it was the sheet updated
+                time_rows_changed = sheet_name == self.time_sheet and updated_count > 0
+                if not time_rows_changed:
+                    self.day_index.mark_written([], old_fingerprint, new_fingerprint)
+                    self.time_columns.mark_written([], old_fingerprint, new_fingerprint)
+                self.workbook_snapshot.apply_write(old_fingerprint, new_fingerprint,
+                                                   updated_rows={sheet_name: (key_column, updates)})
+        return updated_count
+
+
+    def update_cells_in_background(self, sheet_name, key_column, updates, on_result) -> None:
+        """
+        On the excel_writer thread, after the journal rows queued before it, as the Excel file is loaded and saved
+        Right away if the thread is not running, e.g., cli.py
+        """
+        update = lambda: super(ExcelStorage, self).update_cells_in_background(sheet_name, key_column, updates, on_result)
+        if not self.excel_writer.submit_call(update):
+            update()
+
+
+    def time_index(self, start=None, end=None, task=None):
+        from query import load_time_index
+        # under the compaction lock, so that a save in progress (e.g., cli.py's query answered by the app while its
+        # excel_writer thread saves) is not read half written and a row is not counted twice (journal + Excel file)
+        with self.journal.compact_lock:
+            # only the archives (shards.py) overlapping start to end are read
+            return load_time_index(self.excel_file, self.time_sheet,
+                                   pending_rows=self.journal.pending_rows(self.time_sheet), start=start, end=end)
+
+
+    def flush(self) -> bool:
+        # waits if the excel_writer thread is saving right now, as both hold the journal's compact_lock
+        return self.journal.compact(self._write_rows)
+
+
+    def export(self, export_file, on_progress=None) -> int:
+        """
+        The Time sheet has the rows of the archives (shards.py) first, then of the Excel file, then of the journal
+        The columns are those of the Excel file, followed by the ones only the archives/journal rows have
+        """
+        import shutil
+        import tempfile
+        from export import ExportSheet, export_workbook
+        from shards import shard_sources
+
+        if os.path.abspath(export_file) == os.path.abspath(self.excel_file):
+            raise ValueError(f"{self.excel_file} is the store, export to another file")
+
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            # the Excel file and the archives are copied under the compaction lock, so that a save (or an archival)
+            # in progress is not read half written and a row is not exported twice (journal + Excel file)
+            # the copies are then read without the lock, so logging and the task list don't wait for the export
+            copies = {}
+            with self.journal.compact_lock:
+                archive_sources = shard_sources(self.excel_file, self.time_sheet)[1:]
+                for source_file in [self.excel_file] + [source_file for source_file, _ in archive_sources]:
+                    if source_file not in copies and os.path.exists(source_file):
+                        copies[source_file] = os.path.join(snapshot_dir, f"{len(copies)}.xlsx")
+                        shutil.copyfile(source_file, copies[source_file])
+                pending_rows = self.journal.pending_rows()
+
+            excel_copy = copies.get(self.excel_file)
+            sources = {self.tasks_sheet: [(excel_copy, self.tasks_sheet)] if excel_copy else [],
+                       self.time_sheet: [(copies[source_file], sheet_name) for source_file, sheet_name in archive_sources
+                                         if source_file in copies] +
+                                        ([(excel_copy, self.time_sheet)] if excel_copy else [])}
+
+            sheets = []
+            for sheet_name in (self.tasks_sheet, self.time_sheet):
+                headers, rows_count = [], 0
+                sheet_sources = []
+                for source_file, source_sheet in sources[sheet_name]:
+                    info = sheet_info(source_file, source_sheet)
+                    if info is None:
+                        continue
+                    source_headers, source_rows = info
+                    headers += [header for header in source_headers if header is not None and header not in headers]
+                    rows_count = rows_count + source_rows if rows_count is not None and source_rows is not None else None
+                    sheet_sources.append((source_file, source_sheet))
+
+                sheet_pending_rows = [row for pending_sheet, row in pending_rows if pending_sheet == sheet_name]
+                for row in sheet_pending_rows:
+                    headers += [header for header in row if header not in headers]
+                if rows_count is not None:
+                    rows_count += len(sheet_pending_rows)
+                if not headers:
+                    continue
+
+                # read on the export, one row at a time
+                rows = lambda sheet_sources=sheet_sources, sheet_pending_rows=sheet_pending_rows: itertools.chain(
+                    *(iter_records(source_file, source_sheet) for source_file, source_sheet in sheet_sources),
+                    sheet_pending_rows)
+                sheets.append(ExportSheet(sheet_name, headers, rows, rows_count))
+
+            return export_workbook(export_file, sheets, on_progress)
+
+
+    def export_to_excel(self, on_progress=None) -> bool:
+        # the Excel file is the store, it only misses the rows still in the journal
+        return self.flush()
+
+
+    def has_periods_to_archive(self) -> bool:
+        return needs_archival(self.time_columns.oldest_date(), self.shard_policy)
+
+
+    def archive_old_periods(self) -> dict:
+        # the journal rows are written to the Excel file first, so the rows of a closed period are archived with the rest
+        if not self.flush():
+            print("Could not write the journal to the Excel file, archiving on the next start")
+            return {}
+        # the excel_writer thread does not save the file while it is rewritten, and the readers use their caches meanwhile
+        with self.journal.saving():
+            return archive_closed_periods(self.excel_file, self.shard_policy, sheet_name=self.time_sheet)
+
+
+    def close(self, timeout=None) -> None:
+        # the rows not yet written stay in the journal and are written on the next start
+        self.excel_writer.stop(timeout=timeout)
+
+
+def _quote(name) -> str:
+    """
+    Sheet/column name as an SQL identifier, any name typed in Excel is allowed
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_sql(value):
+    """
+    Cell value as an SQLite value, dates are stored as ISO text so that they sort and compare by date
+    """
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def _from_sql_date(value):
+    """
+    ISO text of a date/datetime column back as dt.date/dt.datetime, text typed into a date cell is kept as it is
+    A datetime at midnight is a date, e.g., imported from Excel before workbook.iter_records() read dates as dates
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        if len(value) == 10 or (len(value) == 19 and value.endswith("T00:00:00")):
+            return dt.date.fromisoformat(value[:10])
+        return dt.datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, database_file, excel_file, tasks_sheet="Tasks", time_sheet="Time", tasks_col_name="Task") -> None:
+        """
+        A table per sheet with a column per header, created/extended as the rows come in, so any column added
+        to the rows (or to the Excel file before the import) is kept
+        :param database_file: str e.g., Time_Keeper.db
+        :param excel_file: str Excel file the tables are exported to
+        """
+        super().__init__(excel_file, tasks_sheet, time_sheet)
+        # not imported at the top so that the Excel backend does not load it
+        import sqlite3
+
+        self.database_file = database_file
+        # autocommit, the transactions are explicit (_transaction()), so that the new columns are all or nothing too
+        # check_same_thread=False as the app may export from a background thread, the lock serializes the calls
+        self.connection = sqlite3.connect(database_file, isolation_level=None, check_same_thread=False)
+        self.lock = threading.RLock()
+        # the log is not held in memory or in a journal first, it's on the disk once the commit returns
+        # WAL -> a commit is an append to the write-ahead log, and the readers don't wait for a writer
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL")
+        # sheet -> indexes as tuples of columns, created once the table has those columns
+        # Time(Date) for the day's total and the date range reports, Time(Task, Date) for the per task reports,
+        # Tasks(Task) for the Manage Tasks save
+        self.indexes = {time_sheet: (("Date",), (tasks_col_name, "Date")), tasks_sheet: ((tasks_col_name,),)}
+        # table -> {column: declared type} in the order of the columns, "DATE" for the date/datetime columns
+        self.columns = {}
+        self._load_columns()
+
+
+    def _load_columns(self) -> None:
+        self.columns = {}
+        tables = [name for (name,) in self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid")]
+        for table in tables:
+            self.columns[table] = {name: declared_type for _, name, declared_type, *_ in
+                                   self.connection.execute(f"PRAGMA table_info({_quote(table)})")}
+
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Runs the block in a write transaction, the table/column changes of a failed block are rolled back too
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                self._load_columns()
+                raise
+            self.connection.execute("COMMIT")
+
+
+    def _add_columns(self, table, row) -> None:
+        """
+        Creates the table with the columns of the row, or adds the columns of the row it does not have yet
+        A column is declared "DATE" if its first value is a date/datetime, so it is read back as dates
+        """
+        table_columns = self.columns.get(table)
+        new_columns = {column: ("DATE" if isinstance(value, (dt.date, dt.datetime)) else "")
+                       for column, value in row.items() if table_columns is None or column not in table_columns}
+        if not new_columns:
+            return
+
+        definitions = [f"{_quote(column)} {declared_type}".strip() for column, declared_type in new_columns.items()]
+        if table_columns is None:
+            self.connection.execute(f"CREATE TABLE {_quote(table)} ({', '.join(definitions)})")
+            table_columns = self.columns[table] = {}
+        else:
+            for definition in definitions:
+                self.connection.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {definition}")
+        table_columns.update(new_columns)
+
+        for index_columns in self.indexes.get(table, ()):
+            if all(column in table_columns for column in index_columns):
+                index_name = _quote("_".join((table,) + index_columns))
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {_quote(table)} "
+                                        f"({', '.join(_quote(column) for column in index_columns)})")
+
+
+    def append_rows(self, rows) -> bool:
+        try:
+            with metrics.timer("sqlite.append"), self._transaction():
+                for sheet_name, row in rows:
+                    # blank headers of a sheet imported from Excel have no column
+                    row = {str(column): value for column, value in row.items() if column is not None}
+                    self._add_columns(sheet_name, row)
+                    # the same statement text for the rows with the same columns, so it is prepared once
+                    # and reused from the sqlite3 statement cache
+                    self.connection.execute(
+                        f"INSERT INTO {_quote(sheet_name)} ({', '.join(_quote(column) for column in row)}) "
+                        f"VALUES ({', '.join('?' * len(row))})",
+                        [_to_sql(value) for value in row.values()])
+            metrics.count("sqlite.rows_written", len(rows))
+            return True
+        except Exception as e:
+            print(f"Error on appending data to the database: {e}")
+            metrics.count("sqlite.write_failures")
+            return False
+
+
+    def _records(self, table, where="", parameters=(), columns=None):
+        """
+        Rows of the table as dicts in the order they were added, dates decoded
+        :param where: SQL condition on the quoted columns, with ? for the parameters
+        :param columns: list of the columns to read, all the columns by default (the ones missing in the table are skipped)
+        """
+        table_columns = self.columns.get(table)
+        if table_columns is None:
+            return []
+        columns = [column for column in (columns or table_columns) if column in table_columns]
+        date_positions = [position for position, column in enumerate(columns) if table_columns[column] == "DATE"]
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(_quote(column) for column in columns)} FROM {_quote(table)}"
+                f"{' WHERE ' + where if where else ''} ORDER BY rowid", parameters).fetchall()
+
+        records = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            for position in date_positions:
+                record[columns[position]] = _from_sql_date(row[position])
+            records.append(record)
+        return records
+
+
+    def task_records(self, strict=False) -> list:
+        # the errors are always raised, as the database is read in one go
+        # and the Excel file is only an export (its edits are not read back), so there is no file to watch
+        with metrics.timer("sqlite.read"):
+            return self._records(self.tasks_sheet)
+
+
+    def day_work_minutes(self, date) -> int:
+        """
+        Sum over the rows of the day, found with the Time(Date) index
+        """
+        table_columns = self.columns.get(self.time_sheet, {})
+        if "Date" not in table_columns or "Work_Minutes" not in table_columns:
+            return 0
+        # dates are ISO text, a date 'YYYY-MM-DD' or a datetime 'YYYY-MM-DDTHH:MM:SS' imported from Excel,
+        # so the day is the range [day, next day) which both forms fall in
+        with metrics.timer("sqlite.read"), self.lock:
+            (minutes,) = self.connection.execute(
+                f'SELECT COALESCE(SUM(CAST("Work_Minutes" AS INTEGER)), 0) FROM {_quote(self.time_sheet)} '
+                f'WHERE "Date" >= ? AND "Date" < ?',
+                (date.isoformat(), (date + dt.timedelta(days=1)).isoformat())).fetchone()
+        return minutes
+
+
+    def update_cells(self, sheet_name, key_column, updates):
+        table_columns = self.columns.get(sheet_name)
+        if table_columns is None or key_column not in table_columns:
+            return None
+
+        updated = 0
+        with metrics.timer("sqlite.update"), self._transaction():
+            for key, new_values in updates.items():
+                self._add_columns(sheet_name, new_values)
+                cursor = self.connection.execute(
+                    f"UPDATE {_quote(sheet_name)} SET {', '.join(_quote(column) + ' = ?' for column in new_values)} "
+                    f"WHERE {_quote(key_column)} = ?",
+                    [_to_sql(value) for value in new_values.values()] + [key])
+                updated += cursor.rowcount
+        return updated
+
+
+    def time_index(self, start=None, end=None, task=None):
+        """
+        Only the rows from start to end (of the task) are read, found with the Time(Date) or Time(Task, Date) index
+        """
+        from query import TimeIndex
+
+        conditions, parameters = [], []
+        if task is not None:
+            conditions.append('"Task" = ?')
+            parameters.append(str(task))
+        if start is not None:
+            conditions.append('"Date" >= ?')
+            parameters.append(start.isoformat())
+        if end is not None:
+            conditions.append('"Date" < ?')
+            parameters.append((end + dt.timedelta(days=1)).isoformat())
+        return TimeIndex(self._records(self.time_sheet, " AND ".join(conditions), parameters,
+                                       columns=["Date", "Task", "Work_Minutes", "Pause_Minutes", "Total_Minutes"]))
+
+
+    def export(self, export_file, on_progress=None) -> int:
+        """
+        The sheets have the columns of the tables, in the order they were added (same as the Excel file as the store)
+        """
+        import sqlite3
+        from export import ExportSheet, export_workbook
+
+        with self.lock:
+            table_columns = {table: dict(columns) for table, columns in self.columns.items()}
+        # a connection of its own on the calling (export) thread, reading in one transaction, i.e., a snapshot of the database
+        # WAL -> the app goes on logging with self.connection meanwhile, the reader and the writer don't wait for each other
+        connection = sqlite3.connect(self.database_file, isolation_level=None)
+        try:
+            connection.execute("BEGIN")
+            sheets = []
+            for table in (self.tasks_sheet, self.time_sheet):
+                columns = table_columns.get(table)
+                if not columns:
+                    continue
+                (rows_count,) = connection.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()
+
+                def rows(table=table, columns=columns):
+                    # the cursor steps through the table, only the current row is in the memory
+                    cursor = connection.execute(f"SELECT {', '.join(_quote(column) for column in columns)} "
+                                                f"FROM {_quote(table)} ORDER BY rowid")
+                    for row in cursor:
+                        yield {column: (_from_sql_date(value) if declared_type == "DATE" else value)
+                               for (column, declared_type), value in zip(columns.items(), row)}
+
+                sheets.append(ExportSheet(table, list(columns), rows, rows_count))
+            return export_workbook(export_file, sheets, on_progress)
+        finally:
+            connection.close()
+
+
+    def export_to_excel(self, on_progress=None) -> bool:
+        """
+        Rewrites the Excel file from the database, edits made to the Excel file are overwritten as the database is the store
+        (the Excel file as it was before the move to SQLite is kept by _create_database())
+        """
+        try:
+            self.export(self.excel_file, on_progress)
+            return True
+        except Exception as e:
+            # e.g., the Excel file is open in Excel (Windows), the last export is kept as it is
+            print(f"Error on exporting the database to excel: {e}")
+            return False
+
+
+    def close(self, timeout=None) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def _free_file_name(file_name) -> str:
+    """
+    The file name, or with a number added if the file exists e.g., Time_Keeper.pre-sqlite-2.xlsx
+    """
+    base_name, extension = os.path.splitext(file_name)
+    number = 1
+    while os.path.exists(file_name):
+        number += 1
+        file_name = f"{base_name}-{number}{extension}"
+    return file_name
+
+
+def _create_database(excel_file, database_file, tasks_sheet, time_sheet, batch_size=10000) -> bool:
+    """
+    Creates the database with the rows of the Excel file (and its journal) and of the archived periods (shards.py),
+    so that moving to SQLite keeps the whole history
+    A copy of the Excel file is kept (e.g., Time_Keeper.pre-sqlite.xlsx) as it is only an export from then on
+    The rows are imported into a temporary file that becomes the database only once all of them are in
+    :return: False if the rows could not be imported, e.g., the journal could not be written to the Excel file
+    """
+    excel_storage = ExcelStorage(excel_file, tasks_sheet, time_sheet)
+    if not excel_storage.flush():
+        print(f"Could not write the journal to {excel_file} (is it open in Excel?), staying on the Excel file")
+        return False
+
+    # the Excel file becomes an export of the database (export_to_excel() rewrites it with only the Tasks and Time sheets),
+    # so the original, with any other sheets, formatting and formulas, is kept aside
+    if os.path.exists(excel_file):
+        import shutil
+        backup_file = _free_file_name(os.path.splitext(excel_file)[0] + ".pre-sqlite.xlsx")
+        try:
+            shutil.copy2(excel_file, backup_file)
+        except OSError as e:
+            print(f"Could not copy {excel_file} to {backup_file}: {e}, staying on the Excel file")
+            return False
+        print(f"Kept a copy of {excel_file} as {backup_file}")
+
+    temp_file = database_file + ".tmp"
+    for leftover_file in (temp_file, temp_file + "-wal", temp_file + "-shm"):
+        if os.path.exists(leftover_file):
+            os.remove(leftover_file)
+
+    from shards import shard_sources
+    # the archived periods first, then the Excel file, the same order as ExcelStorage.export()
+    sources = {tasks_sheet: [(excel_file, tasks_sheet)],
+               time_sheet: shard_sources(excel_file, time_sheet)[1:] + [(excel_file, time_sheet)]}
+
+    database = SQLiteStorage(temp_file, excel_file, tasks_sheet, time_sheet)
+    try:
+        for sheet_name, sheet_sources in sources.items():
+            batch = []
+            rows = itertools.chain(*(iter_records(source_file, source_sheet) for source_file, source_sheet in sheet_sources))
+            for row in rows:
+                batch.append((sheet_name, row))
+                if len(batch) == batch_size:
+                    if not database.append_rows(batch):
+                        return False
+                    batch = []
+            if batch and not database.append_rows(batch):
+                return False
+    finally:
+        # the write-ahead log is merged into the file on close
+        database.close()
+
+    os.replace(temp_file, database_file)
+    print(f"Moved the rows of {excel_file} and its archives to {database_file}")
+    return True
+
+
+def open_storage(excel_file, backend=None, tasks_sheet="Tasks", time_sheet="Time", on_write_result=None) -> Storage:
+    """
+    Opens the backend for the Excel file
+    Example usage:
+        open_storage("Time_Keeper.xlsx")            -> SQLite if Time_Keeper.db exists, else the Excel file
+        open_storage("Time_Keeper.xlsx", "sqlite")  -> creates Time_Keeper.db from the Excel file on the first run
+    :param backend: "excel", "sqlite" or None to use the database if there is one
+    :param on_write_result: see ExcelStorage
+    """
+    database_file = os.path.splitext(excel_file)[0] + ".db"
+    if backend is None:
+        backend = "sqlite" if os.path.exists(database_file) else "excel"
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, not {backend!r}")
+
+    if backend == "sqlite":
+        if os.path.exists(database_file) or _create_database(excel_file, database_file, tasks_sheet, time_sheet):
+            return SQLiteStorage(database_file, excel_file, tasks_sheet, time_sheet)
+    return ExcelStorage(excel_file, tasks_sheet, time_sheet, on_write_result=on_write_result)
@@ -0,0 +1,83 @@
+# Index of the task names for the task_list_menu combobox
+# - a set of the casefolded names of all the tasks (active and inactive) to check if a new task already exists
+# - the casefolded active task names sorted, to find the tasks starting with the typed text with a binary search
+# - trigrams (3 letter pieces) of the active task names, to find the tasks containing the typed text
+#   without going over all the tasks
+from bisect import bisect_left
+
+
+def _trigrams(text: str) -> set:
+    return {text[i: i + 3] for i in range(len(text) - 2)}
+
+
+class TaskIndex:
+    def __init__(self, all_tasks=(), active_tasks=()) -> None:
+        """
+        :param all_tasks: names of all the tasks in the Tasks sheet (active and inactive)
+        :param active_tasks: names of the active tasks, in the order they are shown in the combobox
+        """
+        self.rebuild(all_tasks, active_tasks)
+
+
+    def rebuild(self, all_tasks, active_tasks) -> None:
+        # casefold() and not lower() so that e.g., 'Straße' and 'STRASSE' are the same task
+        self.all_keys = {str(task).casefold() for task in all_tasks}
+        self.active_tasks = [str(task) for task in active_tasks]
+        self.active_keys = [task.casefold() for task in self.active_tasks]
+        # (casefolded name, position in active_tasks) sorted, for the prefix search
+        self.sorted_keys = sorted((key, position) for position, key in enumerate(self.active_keys))
+        # trigram -> set of positions in active_tasks
+        self.trigram_postings = {}
+        for position, key in enumerate(self.active_keys):
+            for trigram in _trigrams(key):
+                self.trigram_postings.setdefault(trigram, set()).add(position)
+
+
+    def exists(self, task: str) -> bool:
+        """
+        Checks if the task exists (active or inactive), ignoring the case
+        """
+        return task.casefold() in self.all_keys
+
+
+    def search(self, text: str, limit=30) -> list:
+        """
+        Active tasks matching the typed text, ignoring the case
+        Tasks starting with the text come first (in the alphabetical order), then the tasks containing it
+        :param text: str typed text, "" for the first tasks in the order of active_tasks
+        :param limit: int maximum number of tasks returned
+        :return: list of task names
+        """
+        key = text.strip().casefold()
+        if not key:
+            return self.active_tasks[:limit]
+
+        matches = []
+        seen = set()
+        # tasks starting with the text are next to each other in sorted_keys, from the first key >= text
+        start = bisect_left(self.sorted_keys, (key, -1))
+        for task_key, position in self.sorted_keys[start: start + limit]:
+            if not task_key.startswith(key):
+                break
+            matches.append(position)
+            seen.add(position)
+
+        if len(matches) < limit:
+            if len(key) >= 3:
+                # only the tasks having all the trigrams of the text can contain it
+                candidates = None
+                for trigram in _trigrams(key):
+                    postings = self.trigram_postings.get(trigram, set())
+                    candidates = postings if candidates is None else candidates & postings
+                    if not candidates:
+                        break
+                candidates = sorted(candidates or ())
+            else:
+                candidates = range(len(self.active_tasks))
+            for position in candidates:
+                if position not in seen and key in self.active_keys[position]:
+                    matches.append(position)
+                    if len(matches) == limit:
+                        break
+
+        return [self.active_tasks[position] for position in matches]
@@ -0,0 +1,154 @@
+# Scrollable list of the tasks with a checkbox each (checked = Active), for the Manage Tasks window
+# Only the rows that fit in the view have widgets (checkboxes), which are reused for the other tasks on scroll,
+# so the window opens at the same speed with 10 or 10,000 tasks
+# The checked state of the tasks is kept in a list and not in the widgets
+import customtkinter as ctk
+
+
+class TaskListView(ctk.CTkFrame):
+    def __init__(self, master, tasks, visible_rows=10, row_height=36, width=240, **kwargs) -> None:
+        """
+        :param master: window/frame the view is placed in
+        :param tasks: list of (task name, is_active) in the order to be shown
+        :param visible_rows: number of rows (checkboxes) in the view
+        :param row_height: height of a row in pixels
+        """
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.tasks = [str(task) for task, _ in tasks]
+        # casefolded names for the filter
+        self.keys = [task.casefold() for task in self.tasks]
+        self.is_active = [bool(is_active) for _, is_active in tasks]
+        # states when the window was opened, to save only the tasks changed
+        self.initial_is_active = list(self.is_active)
+        # positions (in tasks) of the tasks that pass the filters, in the order shown
+        self.shown = list(range(len(self.tasks)))
+        # index in shown of the task in the first row of the view
+        self.first_row = 0
+        self.visible_rows = visible_rows
+        self.row_height = row_height
+        # rows moved per notch of the mouse wheel
+        self.wheel_rows = 3
+
+        # filters - text typed and inactive tasks only
+        self.filter_entry = ctk.CTkEntry(self, placeholder_text="Filter tasks", height=28)
+        self.filter_entry.grid(row=1, column=1, columnspan=2, padx=10, pady=(0, 6), sticky="we")
+        self.filter_entry.bind("<KeyRelease>", lambda event: self._apply_filters())
+        self.inactive_only_var = ctk.StringVar(value="off")
+        inactive_only_switch = ctk.CTkSwitch(self, text="Show inactive only", variable=self.inactive_only_var,
+                                             onvalue="on", offvalue="off", command=self._apply_filters,
+                                             font=("Segoe UI", 12), progress_color="#085bbe")
+        inactive_only_switch.grid(row=2, column=1, columnspan=2, padx=10, pady=(0, 6), sticky="w")
+
+        # rows are placed at fixed positions inside this frame, so its size does not depend on the rows
+        self.rows_frame = ctk.CTkFrame(self, width=width, height=visible_rows * row_height)
+        self.rows_frame.grid(row=3, column=1, sticky="nswe")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar, height=visible_rows * row_height)
+        self.scrollbar.grid(row=3, column=2, sticky="ns")
+
+        # pool of checkboxes, one per visible row, and the task position each one shows now
+        self.row_checkboxes = []
+        self.row_variables = []
+        self.row_positions = [None] * visible_rows
+        for row in range(visible_rows):
+            checked_state_var = ctk.StringVar(value="off")
+            task_checkbox = ctk.CTkCheckBox(self.rows_frame, text="", variable=checked_state_var,
+                                            onvalue="on", offvalue="off", width=width - 20,
+                                            corner_radius=4, border_width=2, fg_color="#085bbe",
+                                            hover_color="#05428b", font=("Segoe UI", 14),
+                                            command=lambda row=row: self._on_checkbox_toggle(row))
+            self._bind_mouse_wheel(task_checkbox)
+            self.row_checkboxes.append(task_checkbox)
+            self.row_variables.append(checked_state_var)
+        self._bind_mouse_wheel(self.rows_frame)
+
+        self._render()
+
+
+    def _bind_mouse_wheel(self, widget) -> None:
+        # Windows/macOS send <MouseWheel>, Linux (X11) sends Button-4 (up) and Button-5 (down)
+        widget.bind("<MouseWheel>", lambda event: self.scroll(-self.wheel_rows if event.delta > 0 else self.wheel_rows))
+        widget.bind("<Button-4>", lambda event: self.scroll(-self.wheel_rows))
+        widget.bind("<Button-5>", lambda event: self.scroll(self.wheel_rows))
+
+
+    def _apply_filters(self) -> None:
+        """
+        Shows only the tasks containing the text in the filter_entry (ignoring the case),
+        and only the inactive ones if the switch is on
+        """
+        text = self.filter_entry.get().strip().casefold()
+        inactive_only = self.inactive_only_var.get() == "on"
+        self.shown = [position for position, key in enumerate(self.keys)
+                      if (not text or text in key) and not (inactive_only and self.is_active[position])]
+        self.first_row = 0
+        self._render()
+
+
+    def _on_checkbox_toggle(self, row) -> None:
+        position = self.row_positions[row]
+        if position is not None:
+            self.is_active[position] = self.row_variables[row].get() == "on"
+
+
+    def _on_scrollbar(self, *args) -> None:
+        """
+        Scrollbar command, args are ('moveto', fraction) on drag or ('scroll', number, 'units'/'pages') on clicks/wheel
+        """
+        if args[0] == "moveto":
+            self.first_row = round(float(args[1]) * len(self.shown))
+            self._render()
+        elif args[0] == "scroll":
+            rows = int(args[1]) * (self.visible_rows if args[2] == "pages" else 1)
+            self.scroll(rows)
+
+
+    def scroll(self, rows: int) -> None:
+        """
+        Moves the view up (negative) or down (positive) by the rows
+        """
+        self.first_row += rows
+        self._render()
+
+
+    def _render(self) -> None:
+        """
+        Shows the tasks from first_row in the checkboxes of the view, only the checkboxes showing a different task are changed
+        """
+        self.first_row = max(0, min(self.first_row, len(self.shown) - self.visible_rows))
+
+        for row, task_checkbox in enumerate(self.row_checkboxes):
+            index = self.first_row + row
+            if index >= len(self.shown):
+                if self.row_positions[row] is not None:
+                    task_checkbox.place_forget()
+                    self.row_positions[row] = None
+                continue
+
+            position = self.shown[index]
+            if self.row_positions[row] is None:
+                task_checkbox.place(x=10, y=row * self.row_height + 6)
+            if self.row_positions[row] != position:
+                task_checkbox.configure(text=self._display_name(self.tasks[position]))
+                self.row_positions[row] = position
+            self.row_variables[row].set("on" if self.is_active[position] else "off")
+
+        # visible fraction of the list for the scrollbar
+        if len(self.shown) > self.visible_rows:
+            self.scrollbar.set(self.first_row / len(self.shown),
+                               (self.first_row + self.visible_rows) / len(self.shown))
+        else:
+            self.scrollbar.set(0, 1)
+
+
+    @staticmethod
+    def _display_name(task: str, max_length=28) -> str:
+        # rows have a fixed height, so lengthy task names are cut instead of wrapped
+        return task if len(task) <= max_length else task[:max_length - 1] + "…"
+
+
+    def changed_tasks(self) -> dict:
+        """
+        :return: dict task name -> is_active, of the tasks checked/unchecked since the window was opened
+        """
+        return {task: is_active for task, is_active, was_active in zip(self.tasks, self.is_active, self.initial_is_active)
+                if is_active != was_active}
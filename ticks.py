@@ -0,0 +1,190 @@
+# Schedules the perpetual tick of the app (sleep/freeze detection, heartbeat, timer display) with Tk's .after()
+# The tick runs every second while the app window is visible, as the timer display has to be updated every second
+# While the window is hidden (in the system tray, which is most of the day), nothing has to be drawn,
+# so the tick only does the bookkeeping (sleep detection, checkpoint heartbeat) at a slower rate to save CPU/battery
+# The day change is not checked on the tick but by MidnightScheduler, a single timer armed for the next local midnight
+import sys
+import time
+
+from metrics import metrics
+
+
+class TickScheduler:
+    def __init__(self, app, on_tick, visible_interval_ms=1000, hidden_interval_ms=5000) -> None:
+        """
+        :param app: ctk.CTk window whose .after() runs the tick
+        :param on_tick: callable run on every tick, reads is_visible to decide whether to render
+        :param visible_interval_ms: tick interval while the window is visible (render + bookkeeping)
+        :param hidden_interval_ms: tick interval while the window is hidden (bookkeeping only)
+        """
+        self.app = app
+        self.on_tick = on_tick
+        self.intervals_ms = {"visible": visible_interval_ms, "hidden": hidden_interval_ms}
+        self.is_visible = True
+        # interval the pending tick was scheduled with, to detect the ticks that came late (sleep/freeze)
+        self.armed_interval_ms = visible_interval_ms
+        # to store the after() ID and to cancel the pending tick
+        self.tick_queue = None
+        # when the pending tick was scheduled, to measure how late it runs (jitter)
+        self.armed_mono = time.monotonic()
+
+        # wakeups per mode and the seconds spent in each mode, to verify the idle cost of the app
+        self.wakeups = {"visible": 0, "hidden": 0}
+        self.seconds_in_mode = {"visible": 0.0, "hidden": 0.0}
+        self.mode_start_mono = time.monotonic()
+
+
+    @property
+    def mode(self) -> str:
+        return "visible" if self.is_visible else "hidden"
+
+
+    def start(self) -> None:
+        self._arm()
+
+
+    def stop(self) -> None:
+        if self.tick_queue is not None:
+            self.app.after_cancel(self.tick_queue)
+            self.tick_queue = None
+
+
+    def _arm(self) -> None:
+        self.armed_interval_ms = self.intervals_ms[self.mode]
+        self.armed_mono = time.monotonic()
+        self.tick_queue = self.app.after(self.armed_interval_ms, self._tick)
+
+
+    def _tick(self) -> None:
+        self.wakeups[self.mode] += 1
+        # time_since_last_ui_update beyond the interval the tick was scheduled with, i.e., how late the Tk loop ran it
+        # a busy Tk thread (e.g., a slow Excel read) shows up here, a system sleep shows up as the last bucket
+        time_since_last_ui_update = time.monotonic() - self.armed_mono
+        metrics.observe("tick.jitter", max(0.0, time_since_last_ui_update * 1000 - self.armed_interval_ms))
+        with metrics.timer("tick"):
+            self.on_tick()
+        self._arm()
+
+
+    def set_visible(self, is_visible: bool) -> None:
+        """
+        Switches between the visible and hidden rates
+        On becoming visible, the tick runs right away so that the timer display is in sync without waiting for a tick
+        """
+        if is_visible == self.is_visible:
+            return
+
+        now = time.monotonic()
+        self.seconds_in_mode[self.mode] += now - self.mode_start_mono
+        self.mode_start_mono = now
+        self.is_visible = is_visible
+
+        if is_visible:
+            # the pending (slow) tick is replaced by an immediate one, armed_interval_ms is still the slow one
+            # so the immediate tick is not taken as a late tick
+            self.stop()
+            self._tick()
+
+
+    def wakeups_per_second(self) -> dict:
+        """
+        :return: dict mode -> average tick wakeups per second spent in that mode
+        """
+        seconds_in_mode = dict(self.seconds_in_mode)
+        seconds_in_mode[self.mode] += time.monotonic() - self.mode_start_mono
+        return {mode: (self.wakeups[mode] / seconds if seconds else 0.0)
+                for mode, seconds in seconds_in_mode.items()}
+
+
+def reload_timezone() -> None:
+    """
+    Re-reads the timezone of the system, so that the local time (time.localtime(), dt.datetime.now()) follows
+    a timezone changed while the app is running
+    POSIX -> time.tzset(), Windows -> _tzset() of the C runtime (ucrtbase) Python's localtime() goes through,
+    as Python has no time.tzset() there
+    """
+    if hasattr(time, "tzset"):
+        time.tzset()
+    elif sys.platform == "win32":
+        try:
+            import ctypes
+            ctypes.cdll.ucrtbase._tzset()
+        except (OSError, AttributeError) as e:
+            # the app keeps the timezone it started with, the midnight timer still follows DST
+            print(f"Could not reload the timezone: {e}")
+
+
+class MidnightScheduler:
+    def __init__(self, app, on_new_day, clock_jump_seconds=2.0, timezone_check_seconds=60.0) -> None:
+        """
+        Runs on_new_day at the next local midnight with a single Tk .after() timer, armed again after each midnight,
+        instead of checking the date every minute
+        The timer is armed on the wall-clock time of the next midnight, so it is armed again when that moves:
+        the wall clock jumps (clock changed, time synced, resume from suspend where the monotonic clock stops)
+        or the local UTC offset changes (DST, timezone changed/travelled), see check()
+        :param app: ctk.CTk window whose .after() runs the timer
+        :param on_new_day: callable run on the Tk thread once the local date has changed
+        :param clock_jump_seconds: a change of the wall clock against the monotonic clock beyond this is a jump
+        :param timezone_check_seconds: how often the system's timezone is re-read (reload_timezone()), it reads
+                                       the zoneinfo file, so not on every tick, and right away on a clock jump
+        """
+        self.app = app
+        self.on_new_day = on_new_day
+        self.clock_jump_seconds = clock_jump_seconds
+        self.timezone_check_seconds = timezone_check_seconds
+        # monotonic time the timezone was last re-read
+        self.timezone_checked_mono = time.monotonic()
+        # to store the after() ID and to cancel the pending timer
+        self.timer_queue = None
+        # local date, wall clock - monotonic clock and local UTC offset when the timer was armed
+        self.armed_date = None
+        self.armed_clock_offset = None
+        self.armed_utc_offset = None
+
+
+    def start(self) -> None:
+        self._arm()
+
+
+    def stop(self) -> None:
+        if self.timer_queue is not None:
+            self.app.after_cancel(self.timer_queue)
+            self.timer_queue = None
+
+
+    def _arm(self) -> None:
+        now = time.time()
+        local_time = time.localtime(now)
+        self.armed_date = local_time[:3]
+        self.armed_clock_offset = now - time.monotonic()
+        self.armed_utc_offset = local_time.tm_gmtoff
+        # mktime() rolls the day over to the next month/year and picks the DST of that midnight (isdst=-1)
+        next_midnight = time.mktime((local_time.tm_year, local_time.tm_mon, local_time.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+        # a timer firing a little early finds the same date and is just armed again for the rest
+        self.timer_queue = self.app.after(max(0, int((next_midnight - now) * 1000)), self._fire)
+
+
+    def _fire(self) -> None:
+        self.timer_queue = None
+        if time.localtime()[:3] != self.armed_date:
+            metrics.count("midnight.new_day")
+            with metrics.timer("day_change"):
+                self.on_new_day()
+        self._arm()
+
+
+    def check(self) -> None:
+        """
+        Arms the timer again if the next midnight moved since it was armed, called on every tick (no wakeups of its own)
+        A date that changed in the jump (e.g., resumed on the next day) runs on_new_day right away
+        A changed timezone of the system is picked up within timezone_check_seconds
+        """
+        now, now_mono = time.time(), time.monotonic()
+        has_clock_jumped = abs(now - now_mono - self.armed_clock_offset) > self.clock_jump_seconds
+        if has_clock_jumped or now_mono - self.timezone_checked_mono >= self.timezone_check_seconds:
+            self.timezone_checked_mono = now_mono
+            reload_timezone()
+        if has_clock_jumped or time.localtime(now).tm_gmtoff != self.armed_utc_offset:
+            metrics.count("midnight.rearm")
+            self.stop()
+            self._fire()
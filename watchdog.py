@@ -0,0 +1,85 @@
+# Watchdog of the Tk (main) thread, on a side thread
+# A gap between two ticks is either the system sleeping or the Tk thread being busy (e.g., a slow Excel load/save,
+# building a huge Manage Tasks window), and only a sleep must end the running task (engine.tick() tells them apart
+# with the suspend clock, clock.py)
+# This records the other case: how long the Tk thread was blocked, as latency in the metrics (debug panel/metrics file)
+# - beat() on every tick measures the stall that just ended
+# - the side thread wakes every few seconds and reports a stall still going on (e.g., a hang that never ends),
+#   which the Tk thread itself can't report, and counts the system suspends it sees
+import threading
+import time
+
+from clock import SystemClock
+from metrics import metrics
+
+
+class Watchdog(threading.Thread):
+    def __init__(self, clock=None, stall_seconds=1.0, check_every_seconds=5.0, min_suspend_seconds=1.0) -> None:
+        """
+        :param clock: SystemClock, for its suspend clock
+        :param stall_seconds: a tick later than its expected interval by this much is a stall
+        :param check_every_seconds: wake up interval of the side thread
+        :param min_suspend_seconds: a suspend shorter than this is ignored, same as engine.min_suspend_seconds
+        """
+        # daemon so that the watchdog never keeps the app from exiting
+        super().__init__(name="watchdog", daemon=True)
+        self.clock = clock or SystemClock()
+        self.stall_seconds = stall_seconds
+        self.check_every_seconds = check_every_seconds
+        self.min_suspend_seconds = min_suspend_seconds
+        # set by beat() on the Tk thread and read by the side thread, plain floats so no lock is needed
+        self.last_beat_mono = time.monotonic()
+        self.last_beat_suspended = self.clock.suspended_seconds()
+        self.expected_interval = check_every_seconds
+        # the stall going on was already reported by the side thread
+        self.is_stall_reported = False
+        self.stop_event = threading.Event()
+
+
+    def _suspended_since(self, suspended_seconds) -> bool:
+        current_suspended = self.clock.suspended_seconds()
+        if current_suspended is None or suspended_seconds is None:
+            return False
+        return current_suspended - suspended_seconds >= self.min_suspend_seconds
+
+
+    def beat(self, expected_interval) -> None:
+        """
+        Called on every tick from the Tk thread, records the stall before this tick if it came late
+        :param expected_interval: float seconds till the next tick is due, including the buffer for scheduling delays
+        """
+        now = time.monotonic()
+        late_seconds = now - self.last_beat_mono - self.expected_interval
+        # a late tick with a suspend in between is a sleep, the engine ends the task for it
+        if late_seconds >= self.stall_seconds and not self._suspended_since(self.last_beat_suspended):
+            metrics.count("main_thread.stalls")
+            metrics.observe("main_thread.stall", late_seconds * 1000)
+        self.last_beat_mono = now
+        self.last_beat_suspended = self.clock.suspended_seconds()
+        self.expected_interval = expected_interval
+        self.is_stall_reported = False
+
+
+    def stop(self, timeout=None) -> None:
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+    def run(self) -> None:
+        last_suspended = self.clock.suspended_seconds()
+        while not self.stop_event.wait(self.check_every_seconds):
+            suspended_seconds = self.clock.suspended_seconds()
+            if self._suspended_since(last_suspended):
+                metrics.count("system.suspends")
+                metrics.observe("system.suspend", (suspended_seconds - last_suspended) * 1000)
+                last_suspended = suspended_seconds
+                continue
+            last_suspended = suspended_seconds
+
+            blocked_seconds = time.monotonic() - self.last_beat_mono - self.expected_interval
+            if blocked_seconds >= self.stall_seconds and not self.is_stall_reported:
+                # reported once per stall, only in the metrics (debug panel/metrics file),
+                # its length is recorded by beat() when the Tk thread is back
+                self.is_stall_reported = True
+                metrics.count("main_thread.stalls_ongoing")
@@ -0,0 +1,185 @@
+# Watches the Excel file (Time_Keeper.xlsx) for the changes saved outside the app, e.g., a task renamed in Excel
+# while the app is open, so that the task list is refreshed without restarting the app
+# - Linux: inotify on the folder of the file (Excel saves by renaming a temp file over it, so a watch on the file
+#   itself would be lost on the first save in Excel, while the app's own openpyxl saves rewrite it in place),
+#   the thread sleeps in select() till something in the folder changes
+# - elsewhere: the file's fingerprint (mtime, size, inode) is polled every few seconds
+# A save is a burst of events (temp file, rename, ...), so on_change is called once the file is quiet
+# for debounce_seconds, and only if its fingerprint changed since the last call
+# on_change runs on the watcher thread, the UI must hand its results over to the Tk thread (it's not thread safe)
+import os
+import select
+import struct
+import sys
+import threading
+
+from metrics import metrics
+from workbook import file_fingerprint
+
+# inotify events of a file being written, created, replaced or deleted (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+# struct inotify_event: wd, mask, cookie, len, followed by len bytes of the null padded name
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    def __init__(self, directory) -> None:
+        """
+        :raises OSError: if inotify is not available (e.g., out of watches)
+        """
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, os.strerror(error))
+
+
+    def read_names(self) -> set:
+        """
+        :return: names of the files in the folder with events since the last read, empty if there are none
+        """
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                names.add(os.fsdecode(data[offset:offset + name_length].rstrip(b"\0")))
+                offset += name_length
+
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileWatcher(threading.Thread):
+    def __init__(self, file_path, on_change, debounce_seconds=1.0, poll_interval_seconds=2.0) -> None:
+        """
+        :param file_path: str file to watch, it may not exist yet
+        :param on_change: callable() run on the watcher thread once the file was changed and is quiet
+        :param debounce_seconds: quiet time after the last event before on_change is called (inotify)
+        :param poll_interval_seconds: time between two checks of the fingerprint (polling, no inotify),
+                                      a change is reported once the fingerprint is the same on two checks in a row
+        """
+        # daemon so that a watcher never keeps the app from exiting
+        super().__init__(name="file_watcher", daemon=True)
+        self.file_path = os.path.abspath(file_path)
+        self.on_change = on_change
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        # fingerprint on the last on_change (or on the start), the events that don't change it are ignored
+        self.fingerprint = file_fingerprint(self.file_path)
+        self.stop_event = threading.Event()
+        # written to on stop() to wake the thread from select(), so that it sleeps without a timeout
+        self.wake_read_fd, self.wake_write_fd = os.pipe()
+
+
+    def stop(self, timeout=None) -> None:
+        self.stop_event.set()
+        if self.is_alive():
+            # only wakes a running thread, the pipe is closed here and not by the thread, so it is never written once closed
+            os.write(self.wake_write_fd, b"x")
+            self.join(timeout)
+            if self.is_alive():
+                # still in _check()/on_change, the pipe is left open for it, the daemon thread ends with the app
+                return
+        if self.wake_read_fd is not None:
+            os.close(self.wake_read_fd)
+            os.close(self.wake_write_fd)
+            self.wake_read_fd = self.wake_write_fd = None
+
+
+    def run(self) -> None:
+        inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                inotify = _Inotify(os.path.dirname(self.file_path))
+            except (OSError, AttributeError) as e:
+                print(f"File watcher falls back to polling: {e}")
+        try:
+            if inotify is not None:
+                self._watch(inotify)
+            else:
+                self._poll()
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+
+    def _watch(self, inotify) -> None:
+        file_name = os.path.basename(self.file_path)
+        # None -> sleep till an event, else the time to wait for more events before the change is reported
+        timeout = None
+        while not self.stop_event.is_set():
+            ready, _, _ = select.select([inotify.fd, self.wake_read_fd], [], [], timeout)
+            if self.stop_event.is_set():
+                return
+            if ready:
+                if file_name in inotify.read_names():
+                    # (re)start the quiet time
+                    timeout = self.debounce_seconds
+            elif timeout is not None:
+                # quiet for debounce_seconds since the last event on the file
+                timeout = None
+                self._check()
+
+
+    def _poll(self) -> None:
+        last_fingerprint = self.fingerprint
+        while not self.stop_event.wait(self.poll_interval_seconds):
+            fingerprint = file_fingerprint(self.file_path)
+            # same on two checks in a row, i.e., the file is not being saved right now
+            if fingerprint == last_fingerprint:
+                self._check(fingerprint)
+            last_fingerprint = fingerprint
+
+
+    def _check(self, fingerprint=None) -> None:
+        """
+        Calls on_change if the file is there and changed since the last call
+        """
+        if fingerprint is None:
+            fingerprint = file_fingerprint(self.file_path)
+        if fingerprint == self.fingerprint:
+            return
+        self.fingerprint = fingerprint
+        if fingerprint is None:
+            # deleted, e.g., the first half of a save by replacing the file, reported once it is back
+            return
+        metrics.count("watcher.changes")
+        try:
+            self.on_change()
+        except Exception as e:
+            # the watcher keeps running, the next change is reported again
+            print(f"An unexpected error occurred while handling a change of {self.file_path}: {e}")
+
+
+def diff_records(old_records, new_records, key) -> tuple:
+    """
+    Changes between two lists of rows, matched on the key column (e.g., 'Task')
+    A renamed row is a removed and an added row
+    :return: (added keys, removed keys, changed keys), each a list in the order of the rows
+    """
+    old_by_key = {record.get(key): record for record in old_records}
+    new_by_key = {record.get(key): record for record in new_records}
+    added = [record.get(key) for record in new_records if record.get(key) not in old_by_key]
+    removed = [record.get(key) for record in old_records if record.get(key) not in new_by_key]
+    changed = [record.get(key) for record in new_records
+               if record.get(key) in old_by_key and old_by_key[record.get(key)] != record]
+    return added, removed, changed
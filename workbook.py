@@ -0,0 +1,273 @@
+# Excel (Time_Keeper.xlsx) read/write helpers
+# kept out of the TaskTimer class so that they can also run on a background thread
+# openpyxl is imported inside the functions as it is slow to import, so it is loaded only when the Excel file is read/written
+import datetime as dt
+import os
+
+from metrics import metrics
+
+# columns of dates, written as dates (e.g., Date=dt.date) but read back by openpyxl as datetimes at midnight,
+# as Excel stores a date as a number of days
+DATE_COLUMNS = ("Date", "Multi_day_Start")
+
+
+def file_fingerprint(excel_file):
+    """
+    Identifies the version of the Excel file, changes whenever the file is saved (by the app or by the user in Excel)
+    openpyxl's wb.save() (append_rows(), update_cells()) rewrites the file in place, same inode, new mtime/size
+    inode is included as Excel (and the archival, shards.py) save by renaming a temp file over the file,
+    a new file that may have the same mtime/size as the one it replaced
+    :return: list [mtime_ns, size, inode] or None if the file does not exist
+    """
+    try:
+        stat = os.stat(excel_file)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def cell_to_ordinal(value):
+    """
+    Date cell value as a day number (dt.date.toordinal()), for the caches and indexes of the Time sheet
+    Excel returns datetime, the journal returns date, hand typed cells may be 'YYYY-MM-DD' text
+    :return: int or None if the cell is blank or not a date
+    """
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.toordinal()
+    if value is None:
+        return None
+    try:
+        return dt.date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def cell_to_int(value) -> int:
+    """
+    Minutes cell value (e.g., Work_Minutes) as int, 0 for blanks/text typed into the cell
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_date(value):
+    """
+    A datetime at midnight of a date column as a date, so that it is exported/stored as a date and not as a date-time
+    """
+    if isinstance(value, dt.datetime) and value.time() == dt.time():
+        return value.date()
+    return value
+
+
+def iter_records(excel_file, sheet_name):
+    """
+    Reads the rows of a sheet one by one as dicts, header -> cell value
+    Uses the openpyxl read-only mode, so only the current row is in the memory and not the whole sheet
+    Yields nothing if the file or the sheet does not exist
+    The dates of the DATE_COLUMNS are read back as dt.date, the same as they were logged
+    Example usage:
+        iter_records("Time_Keeper.xlsx", "Time")
+    """
+    if not os.path.exists(excel_file) or os.path.getsize(excel_file) == 0:
+        return
+
+    from openpyxl import load_workbook
+    with metrics.timer("excel.read_open"):
+        wb = load_workbook(excel_file, read_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            return
+        sheet = wb[sheet_name]
+        headers = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if headers is None:
+            return
+
+        date_positions = [position for position, header in enumerate(headers) if header in DATE_COLUMNS]
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            record = dict(zip(headers, row))
+            for position in date_positions:
+                if position < len(row):
+                    record[headers[position]] = _as_date(row[position])
+            yield record
+            metrics.count("excel.rows_read")
+    finally:
+        wb.close()
+
+
+def sheet_info(excel_file, sheet_name):
+    """
+    Headers and number of data rows of a sheet, without reading its rows
+    The rows are counted from the dimension saved in the sheet (read-only mode), so this is quick for any size
+    :return: (list of headers, int rows or None if the sheet has no dimension) or None if the file or the sheet does not exist
+    """
+    if not os.path.exists(excel_file) or os.path.getsize(excel_file) == 0:
+        return None
+
+    from openpyxl import load_workbook
+    with metrics.timer("excel.read_open"):
+        wb = load_workbook(excel_file, read_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            return None
+        sheet = wb[sheet_name]
+        headers = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None) or ())
+        rows_count = sheet.max_row - 1 if sheet.max_row else None
+        return headers, max(rows_count, 0) if rows_count is not None else None
+    finally:
+        wb.close()
+
+
+def new_workbook():
+    """
+    Creates a new workbook without the default sheet e.g., 'Sheet'
+    :return: Workbook
+    """
+    from openpyxl import Workbook
+    wb = Workbook()
+    # remove default sheets created e.g., 'Sheet1'
+    if len(wb.sheetnames) > 0:
+        for s in wb.sheetnames:
+            wb.remove(wb[s])
+    return wb
+
+
+# custom document property of the Excel file with the id of the last journal batch (journal.py) saved to it
+JOURNAL_BATCH_PROPERTY = "TimeKeeperJournalBatch"
+
+
+def _journal_batch(wb):
+    props = wb.custom_doc_props
+    return props[JOURNAL_BATCH_PROPERTY].value if JOURNAL_BATCH_PROPERTY in props.names else None
+
+
+def _set_journal_batch(wb, batch) -> None:
+    from openpyxl.packaging.custom import StringProperty
+
+    props = wb.custom_doc_props
+    if JOURNAL_BATCH_PROPERTY in props.names:
+        props[JOURNAL_BATCH_PROPERTY].value = batch
+    else:
+        props.append(StringProperty(name=JOURNAL_BATCH_PROPERTY, value=batch))
+
+
+def append_rows(excel_file, rows, batch=None) -> bool:
+    """
+    Appends rows of data to the Excel file with a single load and save
+    Creates the Excel file/new sheets if they don't exist
+    An existing file that can't be loaded (e.g., being saved in Excel, locked or corrupt) is not replaced by a new one,
+    as that would lose the history, False is returned and the rows stay in the journal to be written on a retry
+    The keys of the first row written to a new sheet become its headers
+    Example usage:
+        append_rows("Time_Keeper.xlsx", [("Tasks", {"Task": "Study Python", "Status": "Active"})])
+    :param excel_file: str path of the Excel file
+    :param rows: list of (sheet_name, row_dict) tuples, in the order they have to be written
+    :param batch: str id of the journal batch of the rows, saved with the rows, the rows are not written again
+                  if the file already has it (the app crashed after the save but before the journal was cleared)
+    :returns bool: True if successful (or the batch was already in the file), False otherwise
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        # 1. check if the file exists or to be created
+        if os.path.exists(excel_file) and os.path.getsize(excel_file) > 0:
+            try:
+                # Attempt to load the workbook. This will fail for corrupted files or files being saved
+                with metrics.timer("excel.write_load"):
+                    wb = load_workbook(excel_file)
+            except (InvalidFileException, Exception) as e:
+                # not replaced with a new file, this runs on the excel_writer thread with nobody watching
+                print(f"Error with existing file: {e}. Not writing to it, retrying later.")
+                metrics.count("excel.write_failures")
+                return False
+        else:
+            # file does not exist (or is an empty file, no history to lose), so creating a new file
+            wb = new_workbook()
+
+        if batch is not None and _journal_batch(wb) == batch:
+            print(f"The journal batch {batch} is already in {excel_file}, not writing it again")
+            wb.close()
+            return True
+
+        for sheet_name, row in rows:
+            # 2. check if the sheet exists or to be created
+            if sheet_name not in wb.sheetnames:
+                sheet = wb.create_sheet(sheet_name)
+                # set the headings for the sheet
+                sheet.append(list(row.keys()))
+            else:
+                # sheet exists in the Excel file
+                sheet = wb[sheet_name]
+
+            # 3. append the new data
+            sheet.append(list(row.values()))
+
+        # in the same save as the rows, so the file has either both or neither
+        if batch is not None:
+            _set_journal_batch(wb, batch)
+
+        # 4. save and close the Excel file
+        with metrics.timer("excel.write_save"):
+            wb.save(excel_file)
+        wb.close()
+        metrics.count("excel.rows_written", len(rows))
+        return True
+    except Exception as e:
+        # This outer catch is for errors during sheet creation, appending, or saving
+        print(f"Error on appending data to excel: {e}")
+        metrics.count("excel.write_failures")
+        return False
+
+
+def update_cells(excel_file, sheet_name, key_column, updates):
+    """
+    Changes only the given cells of the rows matched by their key, the other rows/cells/columns are left as they are
+    Only the key column is read to find the rows, instead of rewriting the whole sheet
+    A column in the updates that is not in the sheet is added after the last column
+    Example usage:
+        update_cells("Time_Keeper.xlsx", "Tasks", "Task", {"Study Python": {"Status": ""}})
+    :param key_column: str header of the column identifying the rows e.g., 'Task'
+    :param updates: dict key value -> {column header: new value}, every row with the key is updated
+    :return: int number of rows updated, None if the sheet or the key column does not exist
+    """
+    from openpyxl import load_workbook
+
+    with metrics.timer("excel.write_load"):
+        wb = load_workbook(excel_file)
+    try:
+        if sheet_name not in wb.sheetnames:
+            return None
+        sheet = wb[sheet_name]
+        headers = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None) or ())
+        if key_column not in headers:
+            return None
+
+        # column number (1 based) of each column updated
+        column_numbers = {}
+        for new_values in updates.values():
+            for column in new_values:
+                if column not in column_numbers:
+                    if column not in headers:
+                        headers.append(column)
+                        sheet.cell(row=1, column=len(headers), value=column)
+                    column_numbers[column] = headers.index(column) + 1
+
+        key_column_number = headers.index(key_column) + 1
+        updated = 0
+        for row_number, (key,) in enumerate(sheet.iter_rows(min_row=2, min_col=key_column_number,
+                                                            max_col=key_column_number, values_only=True), start=2):
+            new_values = updates.get(str(key)) if key is not None else None
+            if new_values is None:
+                continue
+            for column, value in new_values.items():
+                sheet.cell(row=row_number, column=column_numbers[column], value=value)
+            updated += 1
+
+        if updated:
+            with metrics.timer("excel.write_save"):
+                wb.save(excel_file)
+        return updated
+    finally:
+        wb.close()
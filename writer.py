@@ -0,0 +1,170 @@
+# Background thread that writes the logged rows (from the journal) to the Excel file
+# so that the UI (Tk main thread) never waits for the Excel file to be loaded and saved
+# If the Excel file is locked (e.g., open in Excel), the write is retried with a backoff till it goes through
+# Other saves of the Excel file (e.g., the Manage Tasks statuses) are run on the same thread with submit_call(),
+# so they never freeze the UI either and are never run at the same time as a write of the journal
+import queue
+import threading
+import time
+
+
+class ExcelWriter(threading.Thread):
+    def __init__(self, journal, write_rows, on_result, coalesce_seconds=2.0, max_queue_size=256) -> None:
+        """
+        :param journal: Journal the rows are logged to, the rows are written from here
+        :param write_rows: callable(rows, batch) that writes a list of (sheet_name, row_dict) to the Excel file,
+                           see Journal.compact()
+        :param on_result: callable(is_saved: bool, rows_count: int, retry_in: float) called on the writer thread
+                          after every attempt, the UI must hand it over to the Tk thread (it's not thread safe)
+        :param coalesce_seconds: wait for this long after a request so that back-to-back logs end up in one save
+        :param max_queue_size: requests beyond this are dropped, which is safe as the rows are already in the journal
+        """
+        # daemon so that a stuck save (e.g., network drive) never keeps the app from exiting
+        super().__init__(name="excel_writer", daemon=True)
+        self.journal = journal
+        self.write_rows = write_rows
+        self.on_result = on_result
+        self.coalesce_seconds = coalesce_seconds
+        # each request is a list of (sheet_name, row_dict) logged to the journal, a callable (submit_call())
+        # or None to stop the thread
+        self.requests = queue.Queue(maxsize=max_queue_size)
+        # seconds to wait before the next attempt if the save fails, the last one is repeated
+        self.retry_delays = (1, 2, 5, 10, 30, 60)
+        self.stop_event = threading.Event()
+
+
+    def submit(self, rows=()) -> bool:
+        """
+        Asks the writer to write the journal to the Excel file, returns immediately
+        :param rows: list of (sheet_name, row_dict) that were just logged to the journal
+        :return: False if the queue is full (the rows are still written along with the queued requests)
+        """
+        try:
+            self.requests.put_nowait(list(rows))
+            return True
+        except queue.Full:
+            return False
+
+
+    def submit_call(self, function) -> bool:
+        """
+        Runs the function on the writer thread, returns immediately, the function reports its own result
+        :param function: callable() e.g., a save of the Excel file other than the journal
+        :return: False if the queue is full or the thread is not running, the function is not run
+        """
+        if not self.is_alive() or self.stop_event.is_set():
+            return False
+        try:
+            self.requests.put_nowait(function)
+            return True
+        except queue.Full:
+            return False
+
+
+    def _run_call(self, function) -> None:
+        try:
+            function()
+        except Exception as e:
+            # the function reports its own errors, the thread must stay alive
+            print(f"An unexpected error occurred on the excel_writer thread: {e}")
+
+
+    def stop(self, timeout=None) -> None:
+        """
+        Stops the writer thread after the current attempt, the rows not yet written stay in the journal
+        """
+        self.stop_event.set()
+        try:
+            self.requests.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.is_alive():
+            self.join(timeout)
+
+
+    def _take(self, request) -> int:
+        """
+        Takes a request that came in while a write is pending, a call is run right away and not held back
+        till the journal is written (e.g., while the Excel file is locked)
+        :return: number of rows in the request, served by the pending write
+        """
+        if request is None:
+            self.stop_event.set()
+            return 0
+        if callable(request):
+            self._run_call(request)
+            return 0
+        return len(request)
+
+
+    def _drain_requests(self) -> int:
+        """
+        Takes all the queued requests off the queue, they are all served by the same save
+        :return: number of rows in the drained requests
+        """
+        rows_count = 0
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                return rows_count
+            rows_count += self._take(request)
+
+
+    def _wait_to_retry(self, seconds) -> int:
+        """
+        Waits before the next attempt of a failed write, returns early on stop
+        The calls (submit_call()) that come in meanwhile are run right away and not after the backoff
+        :return: number of rows in the requests that came in while waiting
+        """
+        rows_count = 0
+        deadline = time.monotonic() + seconds
+        while not self.stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            rows_count += self._take(request)
+        return rows_count
+
+
+    def _compact(self) -> bool:
+        """
+        :return: True if the journal was written to the Excel file, False (retried) if the write failed or raised
+        """
+        try:
+            return self.journal.compact(self.write_rows)
+        except Exception as e:
+            # e.g., a corrupt Excel file or a full disk, the thread must stay alive, the rows are still in the journal
+            print(f"An unexpected error occurred while writing the journal to the Excel file: {e}")
+            return False
+
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            request = self.requests.get()
+            if request is None:
+                break
+            if callable(request):
+                self._run_call(request)
+                continue
+            rows_count = len(request)
+
+            # wait for more logs (e.g., the second row of a multi-day task) to save them together
+            self.stop_event.wait(self.coalesce_seconds)
+            rows_count += self._drain_requests()
+
+            attempt = 0
+            while not self._compact():
+                retry_in = self.retry_delays[min(attempt, len(self.retry_delays) - 1)]
+                attempt += 1
+                self.on_result(False, rows_count, retry_in)
+                # the requests that came in while waiting are served by the next attempt
+                rows_count += self._wait_to_retry(retry_in)
+                if self.stop_event.is_set():
+                    return
+
+            self.on_result(True, rows_count, 0)